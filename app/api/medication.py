@@ -1,17 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import re
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.core.config import settings
 from app.db.session import get_db
 from app.models.medication import Medication
-from app.schemas.medication import MedicationCreate, MedicationUpdate, Medication as MedicationSchema
+from app.schemas.medication import (
+    MedicationCreate, MedicationUpdate, MedicationSuggestion, MedicationImportResult,
+    MedicationChanges, Medication as MedicationSchema
+)
 from app.dependencies.auth import get_current_user
 from app.models.user import User
 from app.services.medication import (
     create_medication, get_medications, get_medication, 
     update_medication, delete_medication, get_low_stock_medications,
-    get_expired_medications, auto_remove_empty_medications
+    get_expired_medications, auto_remove_empty_medications, on_stock_changed,
+    get_medication_changes
 )
+from app.services.stock_policy import calculate_days_until_empty, is_low_stock
 from app.services.notification import NotificationService
+from app.services.search import typeahead_medications, typeahead_cache
+from app.services.sync import collection_version
+from app.utils.cache import read_cache, MEDICATIONS, NOTIFICATIONS, SHOPPING
+from app.utils.etag import check_etag, make_etag
+from app.utils.responses import cached_json_response
+from app.services.medication_bulk import (
+    iter_csv_rows, iter_ndjson_rows, import_medications, ImportLimitExceeded,
+    export_medications_csv, export_medications_ndjson
+)
 from app.models.notification import Notification, NotificationType
 from app.schemas.notification import NotificationCreate
 
@@ -27,7 +44,6 @@ def create_medication_endpoint(
     db_medication = create_medication(db, medication, current_user.id)
     if db_medication is None:
         raise HTTPException(status_code=409, detail="Já existe um medicamento com este nome e dosagem para o usuário.")
-    from app.services.medication import calculate_days_until_empty, is_low_stock
     days_until_empty = calculate_days_until_empty(
         db_medication.frequency, 
         db_medication.stock, 
@@ -36,14 +52,15 @@ def create_medication_endpoint(
     db_medication.days_until_empty = days_until_empty
     db_medication.is_low_stock = is_low_stock(
         db_medication.stock, 
-        db_medication.pills_per_box, 
-        days_until_empty or 0
+        days_until_empty
     )
     
     return db_medication
 
 @router.get("/", response_model=List[MedicationSchema])
 def get_medications_endpoint(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -51,11 +68,97 @@ def get_medications_endpoint(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Lista medicamentos do usuário com cálculos de estoque."""
-    from app.services.medication import notify_critical_stock, auto_remove_empty_medications
-    notify_critical_stock(db, current_user.id)
-    auto_remove_empty_medications(db, current_user.id)
-    return get_medications(db, current_user.id, skip, limit, search, category)
+    """
+    Lista medicamentos do usuário com cálculos de estoque.
+    Responde 304 (sem corpo) quando o If-None-Match traz a ETag atual da coleção.
+    """
+    # Os limites entram na ETag porque mudam o is_low_stock calculado
+    etag = make_etag(
+        MEDICATIONS, current_user.id, *collection_version(db, current_user.id, Medication),
+        settings.LOW_STOCK_DAYS_THRESHOLD, settings.LOW_STOCK_UNITS_THRESHOLD
+    )
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+
+    def load():
+        return [
+            MedicationSchema.model_validate(medication).model_dump(mode="json")
+            for medication in get_medications(db, current_user.id, skip, limit, search, category)
+        ]
+
+    # Com a ETag na chave, o cache nunca devolve uma versão anterior à do banco
+    return cached_json_response(
+        read_cache.get_or_load(MEDICATIONS, current_user.id, ("list", skip, limit, search, category, etag), load),
+        response
+    )
+
+@router.get("/search/", response_model=List[MedicationSuggestion])
+def search_medications_endpoint(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto digitado"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Autocomplete de medicamentos por nome (prefixo, substring e aproximado, sem acentos)."""
+    return typeahead_medications(db, current_user.id, q, limit)
+
+@router.post("/import/", response_model=MedicationImportResult)
+def import_medications_endpoint(
+    file: UploadFile = File(..., description="Arquivo CSV ou NDJSON"),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Padrão: extensão do arquivo"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Importa medicamentos em lote a partir de CSV ou NDJSON.
+    Linhas inválidas ou duplicadas são reportadas individualmente; as demais são inseridas.
+    Um arquivo acima do limite de linhas é rejeitado por inteiro (413).
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        format = "ndjson" if filename.endswith((".ndjson", ".jsonl")) else "csv"
+
+    rows = iter_ndjson_rows(file.file) if format == "ndjson" else iter_csv_rows(file.file)
+    try:
+        return import_medications(db, current_user.id, rows)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="O arquivo deve estar em UTF-8")
+    except ImportLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.get("/export/")
+def export_medications_endpoint(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Exporta os medicamentos do usuário (CSV ou NDJSON) em streaming."""
+    if format == "ndjson":
+        return StreamingResponse(
+            export_medications_ndjson(db, current_user.id),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="medicamentos.ndjson"'}
+        )
+    return StreamingResponse(
+        export_medications_csv(db, current_user.id),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="medicamentos.csv"'}
+    )
+
+@router.get("/changes", response_model=MedicationChanges)
+def get_medication_changes_endpoint(
+    since: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Delta sync: medicamentos criados/alterados e ids excluídos desde `since`
+    (o "version" da resposta anterior). Sem `since`, devolve todos.
+    """
+    version, upserts, deleted = get_medication_changes(db, current_user.id, since)
+    return {"version": version, "upserts": upserts, "deleted": deleted}
 
 @router.get("/{medication_id}", response_model=MedicationSchema)
 def get_medication_endpoint(
@@ -64,11 +167,6 @@ def get_medication_endpoint(
     current_user: User = Depends(get_current_user),
 ):
     """Busca um medicamento específico."""
-    
-    from app.services.medication import notify_critical_stock, auto_remove_empty_medications
-    notify_critical_stock(db, current_user.id)
-    auto_remove_empty_medications(db, current_user.id)
-
     medication = get_medication(db, medication_id, current_user.id)
     if not medication:
         raise HTTPException(status_code=404, detail="Medicamento não encontrado")
@@ -119,17 +217,28 @@ def delete_medication_endpoint(
     )
 
     db.delete(medication)
+    read_cache.invalidate(db, [current_user.id], MEDICATIONS, NOTIFICATIONS, SHOPPING)
     db.commit()
+    typeahead_cache.invalidate_user(current_user.id)
     
     return {"message": "Medicamento excluído com sucesso"}
 
 @router.get("/low-stock/", response_model=List[MedicationSchema])
 def get_low_stock_medications_endpoint(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Lista medicamentos com estoque baixo."""
-    return get_low_stock_medications(db, current_user.id)
+    return cached_json_response(read_cache.get_or_load(
+        MEDICATIONS,
+        current_user.id,
+        ("low_stock",),
+        lambda: [
+            MedicationSchema.model_validate(medication).model_dump(mode="json")
+            for medication in get_low_stock_medications(db, current_user.id)
+        ]
+    ), response)
 
 @router.get("/expired/", response_model=List[MedicationSchema])
 def get_expired_medications_endpoint(
@@ -169,10 +278,10 @@ def update_medication_stock(
         raise HTTPException(status_code=404, detail="Medicamento não encontrado")
     
     medication.stock = new_stock
+    on_stock_changed(db, [medication])
     db.commit()
     db.refresh(medication)
     
-    from app.services.medication import calculate_days_until_empty, is_low_stock
     days_until_empty = calculate_days_until_empty(
         medication.frequency, 
         medication.stock, 
@@ -181,8 +290,7 @@ def update_medication_stock(
     medication.days_until_empty = days_until_empty
     medication.is_low_stock = is_low_stock(
         medication.stock, 
-        medication.pills_per_box, 
-        days_until_empty or 0
+        days_until_empty
     )
     
     return medication
@@ -208,7 +316,6 @@ def consume_medication(
     if medication.stock <= 0:
         raise HTTPException(status_code=400, detail="Medicamento sem estoque")
     
-    import re
     match = re.search(r'(\d+)x', medication.frequency.lower())
     if not match:
         raise HTTPException(status_code=400, detail="Frequência inválida")
@@ -217,10 +324,10 @@ def consume_medication(
     pills_to_consume = times_per_day
     
     medication.stock = max(0, medication.stock - pills_to_consume)
+    on_stock_changed(db, [medication])
     db.commit()
     db.refresh(medication)
     
-    from app.services.medication import calculate_days_until_empty, is_low_stock
     days_until_empty = calculate_days_until_empty(
         medication.frequency, 
         medication.stock, 
@@ -229,8 +336,7 @@ def consume_medication(
     medication.days_until_empty = days_until_empty
     medication.is_low_stock = is_low_stock(
         medication.stock, 
-        medication.pills_per_box, 
-        days_until_empty or 0
+        days_until_empty
     )
     
     return medication
@@ -251,9 +357,9 @@ def daily_medication_consumption(
     
     consumed_medications = []
     empty_medications = []
+    changed_medications = []
     
     for medication in medications:
-        import re
         match = re.search(r'(\d+)x', medication.frequency.lower())
         if match:
             times_per_day = int(match.group(1))
@@ -261,6 +367,7 @@ def daily_medication_consumption(
             
             old_stock = medication.stock
             medication.stock = max(0, medication.stock - pills_to_consume)
+            changed_medications.append(medication)
             
             consumed_medications.append({
                 "id": medication.id,
@@ -273,6 +380,7 @@ def daily_medication_consumption(
             if medication.stock == 0:
                 empty_medications.append(medication.name)
     
+    on_stock_changed(db, changed_medications)
     db.commit()
     
     return {
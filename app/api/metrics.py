@@ -0,0 +1,63 @@
+import secrets
+import threading
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.notification import NotificationStatus
+from app.services.notification import NotificationService
+from app.utils import metrics
+
+# Montado na raiz (GET /metrics), fora de API_V1_PREFIX: ver create_app
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+_queue_depth_lock = threading.Lock()
+_queue_depth_refreshed_at: Optional[float] = None
+
+def require_metrics_token(authorization: Optional[str] = Header(None)):
+    """
+    Coleta autenticada por Authorization: Bearer <METRICS_TOKEN>.
+    Sem METRICS_TOKEN configurado o endpoint não existe (404).
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não autorizado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+def _refresh_queue_depth():
+    """
+    Atualiza o gauge de fila no máximo a cada METRICS_QUEUE_DEPTH_TTL_SECONDS
+    (o GROUP BY varre a tabela de notificações). Com o worker embutido, o
+    próprio ciclo do worker mantém o gauge.
+    """
+    global _queue_depth_refreshed_at
+    if settings.EMBEDDED_NOTIFICATION_WORKER:
+        return
+    with _queue_depth_lock:
+        now = time.monotonic()
+        if (
+            _queue_depth_refreshed_at is not None
+            and now - _queue_depth_refreshed_at < settings.METRICS_QUEUE_DEPTH_TTL_SECONDS
+        ):
+            return
+        _queue_depth_refreshed_at = now
+    db = SessionLocal()
+    try:
+        metrics.set_queue_depth(
+            NotificationService.count_by_status(db),
+            [status.value for status in NotificationStatus]
+        )
+    finally:
+        db.close()
+
+@router.get("", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+def get_metrics():
+    """Métricas do processo da API no formato texto do Prometheus"""
+    _refresh_queue_depth()
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
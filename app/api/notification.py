@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+import asyncio
+import json
+import time
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from app.core.config import settings
 from app.db.session import get_db, SessionLocal
-from app.dependencies.auth import get_current_user, get_user_from_token
+from app.dependencies.auth import Principal, authenticate_token, get_current_user, get_stream_principal
+from app.models.medication import Medication
+from app.models.notification import Notification as NotificationModel
 from app.models.user import User
 from app.schemas.notification import (
     NotificationCreate, 
@@ -12,21 +20,170 @@ from app.schemas.notification import (
     NotificationStatus
 )
 from app.services.notification import NotificationService
-from app.utils.websocket_manager import manager
+from app.services.sync import collection_version
+from app.utils.cache import read_cache, NOTIFICATIONS
+from app.utils.etag import check_etag, make_etag
+from app.utils.responses import cached_json_response
+from app.utils.metrics import sse_evictions
+from app.utils.websocket_manager import SYSTEM_TOPIC, manager
 
 
 router = APIRouter(prefix="/notification", tags=["notification"])
 
+def _load_missed_notifications(user_id: int, since: datetime) -> List:
+    db = SessionLocal()
+    try:
+        return NotificationService.get_notifications_since(db, user_id, since, settings.WS_RESUME_DB_LIMIT)
+    finally:
+        db.close()
+
+def _websocket_token(websocket: WebSocket, token: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Token do handshake: subprotocolo "bearer, <token>" (preferido: não aparece
+    em logs de URL) ou ?token=. Retorna (token, subprotocolo a aceitar).
+    """
+    protocols = [item.strip() for item in websocket.headers.get("sec-websocket-protocol", "").split(",") if item.strip()]
+    if len(protocols) >= 2 and protocols[0].lower() == "bearer":
+        return protocols[1], protocols[0]
+    return token, None
+
+def _owns_medication(user_id: int, medication_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Medication.id).filter(
+            Medication.id == medication_id,
+            Medication.user_id == user_id
+        ).first() is not None
+    finally:
+        db.close()
+
+async def _can_subscribe(user_id: int, topic: str) -> bool:
+    """Tópicos que o cliente pode assinar: "system" e "medication:{id}" dos próprios medicamentos"""
+    if topic == SYSTEM_TOPIC:
+        return True
+    prefix, _, medication_id = topic.partition(":")
+    if prefix == "medication" and medication_id.isdigit():
+        try:
+            return await asyncio.to_thread(_owns_medication, user_id, int(medication_id))
+        except Exception:
+            return False
+    return False
+
+async def _handle_topic_request(websocket: WebSocket, user_id: int, message: dict):
+    topic = str(message.get("topic", ""))
+    if message["type"] == "unsubscribe":
+        manager.unsubscribe(websocket, topic)
+        reply = {"type": "unsubscribed", "topic": topic}
+    elif await _can_subscribe(user_id, topic) and manager.subscribe(websocket, topic):
+        reply = {"type": "subscribed", "topic": topic}
+    else:
+        reply = {"type": "error", "topic": topic, "message": "Tópico não permitido"}
+    await websocket.send_text(json.dumps(reply))
+
 @router.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int):
-    await manager.connect(websocket, user_id)
+async def websocket_endpoint(
+    websocket: WebSocket,
+    user_id: int,
+    last_seq: Optional[int] = None,
+    token: Optional[str] = None
+):
+    # Autentica pelo JWT do handshake; tokens já vistos vêm do cache, sem banco
+    token, subprotocol = _websocket_token(websocket, token)
+    try:
+        principal = await authenticate_token(token)
+    except HTTPException:
+        principal = None
+    if principal is None or principal.user_id != user_id:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # last_seq: maior "seq" recebida antes de cair; os eventos perdidos são reenviados
+    await manager.connect(
+        websocket,
+        user_id,
+        resuming=last_seq is not None,
+        subprotocol=subprotocol,
+        expires_at=principal.expires_at
+    )
+    if last_seq is not None:
+        await manager.resume(
+            websocket,
+            user_id,
+            last_seq,
+            lambda since: asyncio.to_thread(_load_missed_notifications, user_id, since)
+        )
     # print("CHEGOU NO HANDLER! user_id:", user_id)
     try:
         while True:
             data = await websocket.receive_text()
+            # Pong do heartbeat ou mensagem do cliente: mantém a conexão viva
+            message = manager.record_message(websocket, data)
+            if message is not None and message.get("type") in ("subscribe", "unsubscribe"):
+                await _handle_topic_request(websocket, user_id, message)
     except WebSocketDisconnect:
         manager.disconnect(websocket, user_id)
 
+def _format_event(seq: int, text: str) -> str:
+    return f"id: {seq}\ndata: {text}\n\n"
+
+@router.get("/stream")
+async def notification_stream(
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID"),
+    last_seq: Optional[int] = None,
+    principal: Principal = Depends(get_stream_principal)
+):
+    """
+    Notificações em tempo real via Server-Sent Events (text/event-stream).
+    Recebe os mesmos eventos do WebSocket; o id de cada evento é a sua "seq",
+    e a reconexão com Last-Event-ID (ou ?last_seq=) reenvia o que foi perdido.
+    """
+    user_id = principal.user_id
+    resume_from = last_event_id if last_event_id is not None else last_seq
+    
+    async def events():
+        # Assina antes da foto dos eventos perdidos (sem await entre as duas),
+        # para não perder nem duplicar eventos emitidos durante a retomada
+        subscriber = manager.subscribe_stream(user_id)
+        try:
+            replayed_seq = resume_from or 0
+            missed = []
+            if resume_from is not None:
+                missed = await manager.missed_events(
+                    user_id,
+                    resume_from,
+                    lambda since: asyncio.to_thread(_load_missed_notifications, user_id, since)
+                )
+            # Intervalo de reconexão sugerido ao EventSource (ms)
+            yield "retry: 3000\n\n"
+            for message in missed:
+                replayed_seq = max(replayed_seq, message["seq"])
+                yield _format_event(message["seq"], json.dumps(message))
+            
+            while True:
+                if principal.expires_at <= time.time():
+                    # Token expirou: o cliente reconecta com um token novo e o Last-Event-ID
+                    sse_evictions.inc(reason="expired")
+                    break
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comentário de keepalive: mantém proxies e o cliente com a conexão aberta
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None or subscriber.closed:
+                    break
+                seq, text = item
+                if seq > replayed_seq:
+                    yield _format_event(seq, text)
+        finally:
+            manager.unsubscribe_stream(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/", response_model=Notification)
 async def create_notification(
     notification_data: NotificationCreate,
@@ -60,18 +217,11 @@ async def create_notification(
 
     return notification
 
-@router.get("/", response_model=List[NotificationResponse])
-def get_notifications(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    status: Optional[NotificationStatus] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Lista notificações do usuário"""
-    notifications = NotificationService.get_user_notifications(
-        db, current_user.id, skip, limit, status
-    )
+def _load_notifications(
+    db: Session, user_id: int, skip: int, limit: int, status: Optional[NotificationStatus]
+) -> List[dict]:
+    """Listagem já serializada (o que vai para o cache de leitura)"""
+    notifications = NotificationService.get_user_notifications(db, user_id, skip, limit, status)
     
     result = []
     for notification in notifications:
@@ -93,10 +243,71 @@ def get_notifications(
             notification_dict["medication_name"] = notification.medication.name
             notification_dict["medication_dosage"] = str(notification.medication.dosage)
         
-        result.append(NotificationResponse(**notification_dict))
+        result.append(NotificationResponse(**notification_dict).model_dump(mode="json"))
     
     return result
 
+@router.get("/", response_model=List[NotificationResponse])
+def get_notifications(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[NotificationStatus] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lista notificações do usuário (304 quando o If-None-Match traz a ETag atual)"""
+    # Os medicamentos entram na versão: a listagem mostra o nome e a dosagem atuais
+    etag = make_etag(
+        NOTIFICATIONS, current_user.id, *collection_version(db, current_user.id, NotificationModel, Medication)
+    )
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return cached_json_response(read_cache.get_or_load(
+        NOTIFICATIONS,
+        current_user.id,
+        (skip, limit, status.value if status else None, etag),
+        lambda: _load_notifications(db, current_user.id, skip, limit, status)
+    ), response)
+
+@router.get("/dead-letter/", response_model=List[Notification])
+def get_dead_letter_notifications(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lista notificações que esgotaram as tentativas de envio"""
+    return NotificationService.get_dead_letters(db, current_user.id, skip, limit)
+
+@router.post("/dead-letter/requeue")
+def requeue_dead_letter_notifications(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Devolve todas as notificações em dead letter para a fila de envio"""
+    count = NotificationService.requeue_dead_letters(db, current_user.id)
+    return {
+        "message": f"{count} notificação(ões) devolvida(s) para a fila",
+        "notifications_requeued": count
+    }
+
+@router.post("/{notification_id}/requeue", response_model=Notification)
+def requeue_notification(
+    notification_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Devolve uma notificação com falha (FAILED ou DEAD_LETTER) para a fila de envio"""
+    notification = NotificationService.requeue_notification(db, notification_id, current_user.id)
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notificação com falha não encontrada")
+    
+    return notification
+
 @router.get("/{notification_id}", response_model=NotificationResponse)
 def get_notification(
     notification_id: int,
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.schemas.shopping import ShoppingItemCreate, ShoppingItemOut, ShoppingItemUpdate
+from app.models.shopping import ShoppingItem
+from app.schemas.shopping import (
+    ShoppingItemCreate, ShoppingItemOut, ShoppingItemUpdate, ShoppingRefillResult, ShoppingChanges,
+    ShoppingBatchRequest, ShoppingBatchResponse
+)
 from app.services.shopping import (
-    create_shopping_item, get_shopping_list, delete_shopping_item, update_shopping_item
+    create_shopping_item, get_shopping_list, delete_shopping_item, update_shopping_item,
+    refill_shopping_lists, get_shopping_changes, apply_shopping_batch
 )
+from app.services.sync import collection_version
 from app.dependencies.auth import get_current_user
+from app.utils.cache import read_cache, SHOPPING
+from app.utils.etag import check_etag, make_etag
+from app.utils.responses import cached_json_response
 
 router = APIRouter(prefix="/shopping", tags=["shopping"])
 
@@ -19,10 +29,60 @@ def add_item(
 
 @router.get("/", response_model=list[ShoppingItemOut])
 def list_items(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """Lista os itens (304 quando o If-None-Match traz a ETag atual)"""
+    etag = make_etag(SHOPPING, user.id, *collection_version(db, user.id, ShoppingItem))
+    not_modified = check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    
+    return cached_json_response(read_cache.get_or_load(
+        SHOPPING,
+        user.id,
+        (etag,),
+        lambda: [ShoppingItemOut.model_validate(item).model_dump(mode="json") for item in get_shopping_list(db, user.id)]
+    ), response)
+
+@router.post("/batch", response_model=ShoppingBatchResponse)
+def batch_items(
+    batch: ShoppingBatchRequest,
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Várias operações (create, check, uncheck, delete) em uma requisição e uma
+    transação. Itens inexistentes não derrubam o lote: voltam como not_found.
+    """
+    return {"results": apply_shopping_batch(db, user.id, batch.operations)}
+
+@router.get("/changes", response_model=ShoppingChanges)
+def list_changes(
+    since: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+    user=Depends(get_current_user)
+):
+    """
+    Delta sync: itens criados/alterados e ids excluídos desde `since`
+    (o "version" da resposta anterior). Sem `since`, devolve todos.
+    """
+    version, upserts, deleted = get_shopping_changes(db, user.id, since)
+    return {"version": version, "upserts": upserts, "deleted": deleted}
+
+@router.post("/refill", response_model=ShoppingRefillResult)
+def refill_items(
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
-    return get_shopping_list(db, user.id)
+    """
+    Adiciona à lista os medicamentos com estoque baixo, zerados ou que acabaram,
+    com as caixas sugeridas, e devolve a lista completa.
+    """
+    created, updated = refill_shopping_lists(db, user.id)
+    return {"created": created, "updated": updated, "items": get_shopping_list(db, user.id)}
 
 @router.delete("/{item_id}", response_model=ShoppingItemOut)
 def remove_item(
@@ -0,0 +1,95 @@
+"""
+Relógio da aplicação
+Todo código de agendamento lê a hora por aqui, para que testes e benchmarks
+possam trocar o relógio real por um simulado
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterator, Optional
+from zoneinfo import ZoneInfo
+from app.core.config import settings
+
+class SystemClock:
+    """Relógio real (UTC sem tzinfo, como o restante do código)"""
+
+    def now(self) -> datetime:
+        return datetime.utcnow()
+
+    async def sleep(self, seconds: float, interrupt: Optional[asyncio.Event] = None):
+        """Espera `seconds`; retorna antes se `interrupt` for acionado"""
+        if interrupt is None:
+            await asyncio.sleep(seconds)
+            return
+        try:
+            await asyncio.wait_for(interrupt.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+class SimulatedClock:
+    """
+    Relógio simulado: o tempo só anda com advance() ou sleep(), que
+    retorna na hora. Permite rodar um dia de agendamentos em segundos.
+    """
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._now = start or datetime(2024, 1, 1)
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds: float) -> datetime:
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+            return self._now
+
+    async def sleep(self, seconds: float, interrupt: Optional[asyncio.Event] = None):
+        self.advance(seconds)
+        # Devolve o controle ao loop, como um sleep real faria
+        await asyncio.sleep(0)
+
+_clock = SystemClock()
+
+def get_clock():
+    """Relógio em uso no processo"""
+    return _clock
+
+def set_clock(clock):
+    """Troca o relógio do processo; retorna o anterior"""
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+@contextmanager
+def use_clock(clock) -> Iterator:
+    """Usa `clock` dentro do bloco (testes e benchmarks)"""
+    previous = set_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_clock(previous)
+
+def utcnow() -> datetime:
+    """Hora atual (UTC) do relógio em uso"""
+    return _clock.now()
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+def app_timezone() -> ZoneInfo:
+    """Fuso dos horários informados pelos usuários (APP_TIMEZONE)"""
+    return _zone(settings.APP_TIMEZONE)
+
+def to_local(value: datetime) -> datetime:
+    """UTC sem tzinfo -> horário local (com tzinfo) no fuso da aplicação"""
+    return value.replace(tzinfo=timezone.utc).astimezone(app_timezone())
+
+def to_utc(value: datetime) -> datetime:
+    """Horário com tzinfo -> UTC sem tzinfo, como o restante do código"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
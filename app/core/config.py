@@ -1,4 +1,5 @@
-from typing import List
+import threading
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl
 
@@ -12,16 +13,121 @@ class Settings(BaseSettings):
         "http://192.168.0.108:9000",    # Frontend Quasar (alternativa)
     ]
     
+    # Respostas HTTP: JSON com orjson (sem o pacote, json da stdlib) e compressão
+    # negociada (brotli se instalado, senão gzip) a partir de COMPRESSION_MINIMUM_SIZE bytes
+    FAST_JSON_ENABLED: bool = True
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    
+    # Aquecimento no lifespan, antes da primeira requisição (pool, bcrypt, JWT, consultas e caches)
+    WARMUP_ENABLED: bool = True
+    # Conexões abertas no pool durante o aquecimento (no máximo DB_POOL_SIZE)
+    WARMUP_DB_CONNECTIONS: int = 5
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Medications
+    MEDICATION_IMPORT_MAX_ROWS: int = 5000
+    # Estoque baixo: dias de duração restantes, ou unidades quando a frequência é desconhecida
+    LOW_STOCK_DAYS_THRESHOLD: int = 7
+    LOW_STOCK_UNITS_THRESHOLD: int = 5
+    
+    # Lista de compras: reposição automática (endpoint /shopping/refill e job diário do worker)
+    SHOPPING_REFILL_TARGET_DAYS: int = 30
+    # Medicamentos que acabaram (e foram removidos) entram na lista por este número de dias
+    SHOPPING_REFILL_EXPIRED_DAYS: int = 7
+    SHOPPING_AUTO_REFILL_ENABLED: bool = True
+    # POST /shopping/batch
+    SHOPPING_BATCH_MAX_OPERATIONS: int = 500
+    
+    # Cache de leitura das listagens por usuário (invalidado pelas escritas nos services)
+    READ_CACHE_ENABLED: bool = True
+    READ_CACHE_BACKEND: str = "memory"
+    READ_CACHE_TTL_SECONDS: int = 30
+    READ_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Notification worker
+    WORKER_SCAN_CHUNK_SIZE: int = 1000
+    WORKER_TRACE_MEMORY: bool = False
+    WORKER_PENDING_BATCH_SIZE: int = 500
+    # Cada ciclo processa lotes até esvaziar a fila ou passar deste tempo
+    WORKER_PENDING_DRAIN_SECONDS: int = 30
+    # Lembretes: criados a partir de REMINDER_LEAD_MINUTES antes do horário; horários que
+    # passaram há mais de REMINDER_MAX_DELAY_MINUTES (ex.: medicamento cadastrado à noite) são pulados
+    REMINDER_LEAD_MINUTES: int = 5
+    REMINDER_MAX_DELAY_MINUTES: int = 60
+    # Fuso (IANA) dos horários dos medicamentos ("HH:MM"); o banco e o relógio continuam em UTC
+    APP_TIMEZONE: str = "America/Sao_Paulo"
+    # Vários workers: cada instância processa os usuários dos shards que possui
+    WORKER_SHARDING_ENABLED: bool = False
+    WORKER_SHARD_COUNT: int = 64
+    # Reenvio de notificações com falha (backoff exponencial com jitter)
+    NOTIFICATION_MAX_ATTEMPTS: int = 5
+    NOTIFICATION_RETRY_BASE_SECONDS: int = 30
+    NOTIFICATION_RETRY_MAX_SECONDS: int = 3600
+    # Endpoint /metrics (formato Prometheus) do worker; 0 desativa. Só local por padrão
+    WORKER_METRICS_HOST: str = "127.0.0.1"
+    WORKER_METRICS_PORT: int = 9101
+    # GET /metrics da API (fora de /api/v1): exige Authorization: Bearer <METRICS_TOKEN>; vazio desativa
+    METRICS_TOKEN: str = ""
+    # Intervalo mínimo entre as contagens da fila de notificações feitas pela API
+    METRICS_QUEUE_DEPTH_TTL_SECONDS: int = 60
+    # Executa o worker de notificações dentro do processo da API (instalações de um nó só)
+    EMBEDDED_NOTIFICATION_WORKER: bool = False
+    WORKER_INTERVAL_SECONDS: int = 60
+    
+    # WebSockets: heartbeat (ping da aplicação), desconexão de sockets mortos/ociosos e limite por usuário
+    WS_HEARTBEAT_INTERVAL_SECONDS: int = 25
+    WS_HEARTBEAT_TIMEOUT_SECONDS: int = 60
+    WS_IDLE_TIMEOUT_SECONDS: int = 1800  # 0 desativa
+    WS_SEND_TIMEOUT_SECONDS: int = 10
+    WS_MAX_CONNECTIONS_PER_USER: int = 5
+    WS_MAX_TOPICS_PER_CONNECTION: int = 50
+    # Retomada após reconexão: últimos eventos de cada usuário em memória
+    WS_RESUME_BUFFER_SIZE: int = 50
+    WS_RESUME_MAX_USERS: int = 10000
+    WS_RESUME_DB_LIMIT: int = 200
+    # Server-Sent Events: fila por cliente (cheia = cliente lento, desconectado) e keepalive
+    SSE_QUEUE_SIZE: int = 100
+    SSE_KEEPALIVE_SECONDS: int = 15
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
 
-settings = Settings() 
\ No newline at end of file
+class _LazySettings:
+    """
+    Settings() (leitura do ambiente e do .env) só no primeiro acesso a um atributo,
+    não no import dos módulos que fazem `from app.core.config import settings`
+    """
+    _settings: Optional[Settings] = None
+    _lock = threading.Lock()
+
+    def _load(self) -> Settings:
+        if _LazySettings._settings is None:
+            with _LazySettings._lock:
+                if _LazySettings._settings is None:
+                    _LazySettings._settings = Settings()
+        return _LazySettings._settings
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._load(), name, value)
+
+def get_settings() -> Settings:
+    """Instância única de Settings (criada no primeiro uso)"""
+    return settings._load()
+
+settings = _LazySettings()
@@ -0,0 +1,89 @@
+"""
+Aquecimento da API no lifespan, antes de aceitar requisições
+
+Sem isso, a primeira requisição de cada processo paga: conexão com o banco,
+configuração dos mappers do SQLAlchemy, compilação das consultas, carga do
+backend do bcrypt e do JWT. Cada etapa é medida; uma falha (ex.: banco ainda
+indisponível) é registrada e não impede a API de subir.
+"""
+
+import logging
+import time
+from typing import Dict
+from jose import jwt
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from app.core.config import settings
+from app.core.security import create_access_token, pwd_context
+from app.db.session import SessionLocal, get_engine
+from app.models.medication import Medication
+from app.models.notification import Notification
+from app.models.shopping import ShoppingItem
+from app.services.medication import get_medications
+from app.services.notification import NotificationService
+from app.services.shopping import get_shopping_list
+from app.services.sync import collection_version
+from app.utils.cache import read_cache
+from app.utils.responses import json_response_class
+
+logger = logging.getLogger(__name__)
+
+# Usuário inexistente: as consultas compilam e executam sem devolver linhas
+WARMUP_USER_ID = 0
+
+def _open_pool():
+    # Abre as conexões juntas e devolve todas ao pool, que as mantém abertas
+    connections = []
+    try:
+        for _ in range(min(settings.WARMUP_DB_CONNECTIONS, settings.DB_POOL_SIZE)):
+            connection = get_engine().connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+
+def _prime_security():
+    # Carrega o backend do bcrypt (autoteste do passlib, custo baixo) e o do JWT;
+    # um hash completo (~0,4 s) não deixaria o login seguinte mais rápido
+    pwd_context.handler("bcrypt").get_backend()
+    token = create_access_token({"sub": str(WARMUP_USER_ID)})
+    jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+def _prime_queries():
+    # Consultas das listagens e das ETags no cache de compilação do SQLAlchemy
+    db = SessionLocal()
+    try:
+        get_medications(db, WARMUP_USER_ID)
+        NotificationService.get_user_notifications(db, WARMUP_USER_ID)
+        get_shopping_list(db, WARMUP_USER_ID)
+        collection_version(db, WARMUP_USER_ID, Medication)
+        collection_version(db, WARMUP_USER_ID, Notification, Medication)
+        collection_version(db, WARMUP_USER_ID, ShoppingItem)
+    finally:
+        db.close()
+
+def _prime_caches():
+    read_cache.backend
+    json_response_class()([{"warm": "up"}])
+
+STEPS = [
+    ("mappers", configure_mappers),
+    ("db_pool", _open_pool),
+    ("security", _prime_security),
+    ("queries", _prime_queries),
+    ("caches", _prime_caches),
+]
+
+def warm_up() -> Dict[str, float]:
+    """Executa as etapas em ordem e devolve a duração de cada uma em ms"""
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Aquecimento: etapa {name} falhou: {str(e)}")
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Aquecimento concluído em {sum(timings.values()):.1f} ms: {timings}")
+    return timings
@@ -0,0 +1,24 @@
+from sqlalchemy import DDL, event, func
+from app.db.base_class import Base
+
+# Extensões e funções do PostgreSQL usadas pelos índices de busca.
+# unaccent() não é IMMUTABLE, então não pode ser usada direto em um índice;
+# f_unaccent() é o wrapper imutável recomendado pela documentação do Postgres.
+SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS "
+    "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT",
+]
+
+for statement in SEARCH_DDL:
+    event.listen(
+        Base.metadata,
+        "before_create",
+        DDL(statement).execute_if(dialect="postgresql")
+    )
+
+def search_key(expression):
+    """Expressão normalizada (minúsculas, sem acentos) usada na busca por nome."""
+    return func.f_unaccent(func.lower(expression))
@@ -1,10 +1,10 @@
 from app.db.base_class import Base
-from app.db.session import engine
-from app.models import user, medication, shopping, notification
+from app.db.session import get_engine
+from app.models import user, medication, shopping, notification, sync
 
 def init_db():
     print("Criando tabelas no banco de dados...")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
     print("Tabelas criadas com sucesso.")
     
     
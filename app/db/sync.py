@@ -0,0 +1,53 @@
+from sqlalchemy import DDL, event, text
+from sqlalchemy.orm import Session
+from app.db.base_class import Base
+
+# Sincronização incremental (delta sync).
+# Cada linha rastreada guarda em "version" o id da transação (xid8) que a
+# gravou por último; exclusões viram tombstones com o mesmo tipo de versão.
+# O cursor devolvido ao cliente é o xmin do snapshot: toda transação com id
+# menor já terminou, então nenhuma mudança abaixo dele pode aparecer depois.
+# Um contador (sequence) não garante isso: transações que commitam fora de
+# ordem deixariam versões menores visíveis só depois do cursor passar por elas.
+SYNC_DDL = [
+    "CREATE OR REPLACE FUNCTION sync_set_version() RETURNS trigger AS $$ "
+    "BEGIN NEW.version := pg_current_xact_id()::text::bigint; RETURN NEW; END "
+    "$$ LANGUAGE plpgsql",
+    "CREATE OR REPLACE FUNCTION sync_record_tombstone() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO sync_tombstones (entity, entity_id, user_id, version) "
+    "VALUES (TG_ARGV[0], OLD.id, OLD.user_id, pg_current_xact_id()::text::bigint); "
+    "RETURN OLD; END "
+    "$$ LANGUAGE plpgsql",
+]
+
+for statement in SYNC_DDL:
+    event.listen(
+        Base.metadata,
+        "before_create",
+        DDL(statement).execute_if(dialect="postgresql")
+    )
+
+def _create_trigger(table, statement: str):
+    event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+def track_versions(table):
+    """Cria o trigger que grava a versão de cada linha (ETags das listagens; precisa de version)"""
+    _create_trigger(
+        table,
+        f"CREATE TRIGGER {table.name}_sync_version BEFORE INSERT OR UPDATE ON {table.name} "
+        "FOR EACH ROW EXECUTE FUNCTION sync_set_version()"
+    )
+
+def track_changes(table, entity: str):
+    """Cria os triggers de versão e de tombstone junto com a tabela (precisa de id, user_id e version)"""
+    track_versions(table)
+    _create_trigger(
+        table,
+        f"CREATE TRIGGER {table.name}_sync_tombstone AFTER DELETE ON {table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION sync_record_tombstone('{entity}')"
+    )
+
+def current_sync_version(db: Session) -> int:
+    """Cursor para o próximo ?since=: xmin do snapshot (leia antes de buscar as mudanças)"""
+    return db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
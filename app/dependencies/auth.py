@@ -1,13 +1,19 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session as DBSession
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
@@ -49,3 +55,104 @@ def get_user_from_token(token: str, db: DBSession) -> User:
     if user is None:
         raise credentials_exception
     return user
+
+class Principal:
+    """Usuário autenticado por um token, validado só pelos claims"""
+    
+    __slots__ = ("user_id", "expires_at")
+    
+    def __init__(self, user_id: int, expires_at: float):
+        self.user_id = user_id
+        # Expiração do token (epoch, segundos)
+        self.expires_at = expires_at
+
+class PrincipalCache:
+    """
+    Cache de tokens já validados, até a expiração de cada token.
+    Reconexões em massa (WebSocket/SSE) reaproveitam a validação: no máximo
+    uma consulta ao banco por token durante a vida dele.
+    """
+    
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            principal = self._entries.get(token)
+            if principal is None:
+                return None
+            if principal.expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return principal
+    
+    def put(self, token: str, principal: Principal):
+        with self._lock:
+            self._entries[token] = principal
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Instância global do cache de tokens
+principal_cache = PrincipalCache()
+
+def get_principal_from_token(token: str) -> Principal:
+    """
+    Valida o token pelos claims (assinatura, exp, sub) e confirma uma única vez
+    que o usuário existe; o resultado fica no cache até o token expirar.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Não autorizado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    if not token:
+        raise credentials_exception
+    
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+    
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise credentials_exception
+    expires_at = payload.get("exp") or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    
+    db = SessionLocal()
+    try:
+        exists = db.query(User.id).filter(User.id == user_id).first() is not None
+    finally:
+        db.close()
+    if not exists:
+        raise credentials_exception
+    
+    principal = Principal(user_id, float(expires_at))
+    principal_cache.put(token, principal)
+    return principal
+
+async def authenticate_token(token: Optional[str]) -> Principal:
+    """Versão para handlers async: só vai para uma thread (banco) se o token não estiver no cache"""
+    principal = principal_cache.get(token) if token else None
+    if principal is not None:
+        return principal
+    return await asyncio.to_thread(get_principal_from_token, token or "")
+
+def get_stream_principal(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    token: Optional[str] = Query(None)
+) -> Principal:
+    """
+    Autenticação de conexões longas (SSE). Aceita o token no header ou em
+    ?token= (EventSource não envia headers; mesmo nome do WebSocket); não
+    segura uma sessão do banco durante o stream.
+    """
+    return get_principal_from_token(header_token or token or "")
@@ -1,26 +1,69 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.warmup import warm_up
 from app.api import router as api_router
+from app.api.metrics import router as metrics_router
+from app.utils.compression import CompressionMiddleware
+from app.utils.notification_worker import notification_worker
+from app.utils.responses import json_response_class
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Aquecimento antes da primeira requisição (em thread: é trabalho síncrono de banco e bcrypt)
+    if settings.WARMUP_ENABLED:
+        app.state.warmup = await asyncio.to_thread(warm_up)
+    # Modo embutido: o worker roda no mesmo event loop e envia direto para os
+    # WebSockets abertos nesta API (mesmo `manager`)
+    if settings.EMBEDDED_NOTIFICATION_WORKER:
+        notification_worker.start_background(settings.WORKER_INTERVAL_SECONDS)
+    yield
+    await notification_worker.shutdown()
+
+def create_app() -> FastAPI:
+    """Monta a API (uvicorn --factory app.main:create_app, ou uvicorn app.main:app)"""
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
+        default_response_class=json_response_class(),
+        lifespan=lifespan
+    )
+
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:9000", "http://192.168.0.108:9000"], 
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS","WebSocket"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=3600,
+    )
+
+    app.include_router(api_router, prefix=settings.API_V1_PREFIX)
+    # Coleta do Prometheus fora da API pública, com token próprio (METRICS_TOKEN)
+    app.include_router(metrics_router)
+
+    @app.get("/")
+    async def root():
+        return { "Bem-vindo à API da Minha Farmacinha. Por Ivan Martins"}
+
+    return app
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_PREFIX}/openapi.json"
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:9000", "http://192.168.0.108:9000"], 
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS","WebSocket"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=3600,
-)
-
-app.include_router(api_router, prefix=settings.API_V1_PREFIX)
-
-@app.get("/")
-async def root():
-    return { "Bem-vindo à API da Minha Farmacinha. Por Ivan Martins"} 
\ No newline at end of file
+def __getattr__(name: str):
+    # `app.main:app` é montado só quando pedido: com --factory o import não monta a API
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
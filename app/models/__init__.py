@@ -4,4 +4,5 @@ Database Models
 from app.models.user import User
 from app.models.medication import Medication
 from app.models.notification import Notification, NotificationType, NotificationStatus
-from app.models.shopping import ShoppingItem 
\ No newline at end of file
+from app.models.shopping import ShoppingItem 
+from app.models.sync import SyncTombstone
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, ARRAY, Text, DateTime,Float
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, ARRAY, Text, DateTime,Float, Index, FetchedValue
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
+from app.db.extensions import search_key
+from app.db.sync import track_changes
 
 class Medication(Base):
     __tablename__ = "medications"
@@ -17,6 +19,26 @@ class Medication(Base):
     notes = Column(Text, nullable=True)
     pills_per_box = Column(Integer, nullable=False, default=1) 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Delta sync: transação da última gravação (preenchida por trigger)
+    version = Column(BigInteger, nullable=False, server_default="0", server_onupdate=FetchedValue())
     
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user = relationship("User", back_populates="medications")
+
+    __table_args__ = (
+        # Checagem de duplicidade em create_medication (user_id + lower(name))
+        Index("ix_medications_user_id_lower_name", "user_id", func.lower(name)),
+        # Busca por substring/aproximada, insensível a acentos
+        Index(
+            "ix_medications_name_trgm",
+            search_key(name).label("name_search"),
+            postgresql_using="gin",
+            postgresql_ops={"name_search": "gin_trgm_ops"},
+        ),
+        # Delta sync: GET /medication/changes?since=
+        Index("ix_medications_user_id_version", "user_id", "version"),
+        # Remoção dos zerados pelo worker: só as poucas linhas com estoque <= 0
+        Index("ix_medications_user_id_empty", "user_id", postgresql_where=stock <= 0),
+    )
+
+track_changes(Medication.__table__, "medication")
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Enum, Index, FetchedValue
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
 from app.db.base_class import Base
+from app.db.sync import track_versions
 
 class NotificationType(enum.Enum):
     MEDICATION_REMINDER = "MEDICATION_REMINDER"
@@ -16,6 +17,7 @@ class NotificationStatus(enum.Enum):
     SENT = "SENT"
     READ = "READ"
     FAILED = "FAILED"
+    DEAD_LETTER = "DEAD_LETTER"
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -29,11 +31,36 @@ class Notification(Base):
     sent_at = Column(DateTime(timezone=True), nullable=True)
     read_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Reenvio: tentativas feitas, próxima tentativa (backoff) e último erro
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
     
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    medication_id = Column(Integer, ForeignKey("medications.id"), nullable=True)
+    # Medicamentos removidos (ex.: estoque zerado) não apagam o histórico
+    medication_id = Column(Integer, ForeignKey("medications.id", ondelete="SET NULL"), nullable=True)
     
     user = relationship("User", back_populates="notifications")
     medication = relationship("Medication")
     medication_name = Column(String, nullable=True)
-    medication_dosage = Column(String, nullable=True) 
\ No newline at end of file
+    medication_dosage = Column(String, nullable=True)
+    # Chave determinística (tipo + medicamento + dia/horário) para evitar duplicatas
+    dedup_key = Column(String, nullable=True)
+    # Versão da linha (id da transação que gravou por último): ETag da listagem
+    version = Column(BigInteger, nullable=False, server_default="0", server_onupdate=FetchedValue())
+
+    __table_args__ = (
+        # Por usuário: a chave de um usuário nunca descarta notificações de outro
+        Index(
+            "uq_notifications_user_id_dedup_key",
+            user_id,
+            dedup_key,
+            unique=True,
+            postgresql_where=dedup_key.isnot(None),
+        ),
+        # Busca de falhas com nova tentativa vencida
+        Index("ix_notifications_status_next_attempt_at", status, next_attempt_at),
+        Index("ix_notifications_user_id_version", user_id, version),
+    )
+
+track_versions(Notification.__table__) 
@@ -1,6 +1,8 @@
 # app/models/shopping.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, Index, FetchedValue
+from sqlalchemy.sql import func
 from app.db.base_class import Base
+from app.db.sync import track_changes
 
 class ShoppingItem(Base):
     __tablename__ = "shopping_items"
@@ -8,4 +10,18 @@ class ShoppingItem(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     checked = Column(Boolean, default=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
\ No newline at end of file
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Reposição automática: medicamento de origem e caixas sugeridas
+    medication_id = Column(Integer, ForeignKey("medications.id", ondelete="SET NULL"), nullable=True)
+    suggested_boxes = Column(Integer, nullable=True)
+    # Delta sync: transação da última gravação (preenchida por trigger)
+    version = Column(BigInteger, nullable=False, server_default="0", server_onupdate=FetchedValue())
+
+    __table_args__ = (
+        # Um item por nome (sem diferenciar maiúsculas) por usuário; alvo do upsert da reposição
+        Index("uq_shopping_items_user_id_lower_name", user_id, func.lower(name), unique=True),
+        # Delta sync: GET /shopping/changes?since=
+        Index("ix_shopping_items_user_id_version", user_id, version),
+    )
+
+track_changes(ShoppingItem.__table__, "shopping_item")
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Index
+from app.db.base_class import Base
+
+class SyncTombstone(Base):
+    """Exclusão registrada pelos triggers de app.db.sync, para o delta sync"""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(BigInteger, primary_key=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    version = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_entity_version", user_id, entity, version),
+    )
@@ -2,7 +2,15 @@
 Pydantic Schemas
 """
 from app.schemas.user import UserCreate, UserOut
-from app.schemas.medication import Medication, MedicationCreate, MedicationUpdate
+from app.schemas.medication import (
+    Medication,
+    MedicationCreate,
+    MedicationUpdate,
+    MedicationChanges,
+    MedicationSuggestion,
+    MedicationImportError,
+    MedicationImportResult
+)
 from app.schemas.notification import (
     Notification, 
     NotificationCreate, 
@@ -11,4 +19,12 @@ from app.schemas.notification import (
     NotificationType,
     NotificationStatus
 )
-from app.schemas.shopping import ShoppingItemCreate, ShoppingItemUpdate, ShoppingItemOut 
\ No newline at end of file
+from app.schemas.shopping import (
+    ShoppingItemCreate,
+    ShoppingItemUpdate,
+    ShoppingItemOut,
+    ShoppingRefillResult,
+    ShoppingChanges,
+    ShoppingBatchRequest,
+    ShoppingBatchResponse
+) 
\ No newline at end of file
@@ -28,3 +28,22 @@ class Medication(MedicationBase):
 
     class Config:
         from_attributes = True
+
+class MedicationChanges(BaseModel):
+    version: int
+    upserts: List[Medication]
+    deleted: List[int]
+
+class MedicationSuggestion(BaseModel):
+    id: int
+    name: str
+    dosage: float
+
+class MedicationImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+class MedicationImportResult(BaseModel):
+    imported: int
+    duplicates: int
+    errors: List[MedicationImportError]
@@ -15,6 +15,7 @@ class NotificationStatus(str, Enum):
     SENT = "SENT"
     READ = "READ"
     FAILED = "FAILED"
+    DEAD_LETTER = "DEAD_LETTER"
 
 class NotificationBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
@@ -28,6 +29,10 @@ class NotificationCreate(NotificationBase):
     medication_name: Optional[str] = None
     medication_dosage: Optional[str] = None
 
+class SystemNotificationCreate(NotificationCreate):
+    """Lembretes e alertas criados pelo servidor: a dedup_key nunca vem do cliente"""
+    dedup_key: Optional[str] = Field(None, max_length=200)
+
 class NotificationUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
     message: Optional[str] = Field(None, min_length=1, max_length=1000)
@@ -42,6 +47,9 @@ class Notification(NotificationBase):
     sent_at: Optional[datetime] = None
     read_at: Optional[datetime] = None
     created_at: datetime
+    attempts: int = 0
+    next_attempt_at: Optional[datetime] = None
+    last_error: Optional[str] = None
 
     class Config:
         from_attributes = True
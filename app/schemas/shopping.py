@@ -1,5 +1,7 @@
 # app/schemas/shopping.py
-from pydantic import BaseModel
+from typing import Annotated, List, Literal, Optional, Union
+from pydantic import BaseModel, Field, field_validator
+from app.core.config import settings
 
 class ShoppingItemBase(BaseModel):
     name: str
@@ -13,6 +15,51 @@ class ShoppingItemUpdate(BaseModel):
 class ShoppingItemOut(ShoppingItemBase):
     id: int
     checked: bool
+    medication_id: Optional[int] = None
+    suggested_boxes: Optional[int] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ShoppingRefillResult(BaseModel):
+    created: int
+    updated: int
+    items: List[ShoppingItemOut]
+
+class ShoppingChanges(BaseModel):
+    version: int
+    upserts: List[ShoppingItemOut]
+    deleted: List[int]
+
+class ShoppingBatchCreate(BaseModel):
+    op: Literal["create"]
+    name: str
+
+class ShoppingBatchItemOperation(BaseModel):
+    op: Literal["check", "uncheck", "delete"]
+    id: int
+
+ShoppingBatchOperation = Annotated[
+    Union[ShoppingBatchCreate, ShoppingBatchItemOperation], Field(discriminator="op")
+]
+
+class ShoppingBatchRequest(BaseModel):
+    operations: List[ShoppingBatchOperation] = Field(min_length=1)
+
+    # Limite lido na validação, não na definição da classe (settings é carregado no primeiro uso)
+    @field_validator("operations")
+    @classmethod
+    def limit_operations(cls, operations: list) -> list:
+        if len(operations) > settings.SHOPPING_BATCH_MAX_OPERATIONS:
+            raise ValueError(f"No máximo {settings.SHOPPING_BATCH_MAX_OPERATIONS} operações por lote")
+        return operations
+
+class ShoppingBatchResult(BaseModel):
+    op: str
+    # ok, exists (create de um nome que já está na lista) ou not_found
+    status: str
+    id: Optional[int] = None
+    item: Optional[ShoppingItemOut] = None
+
+class ShoppingBatchResponse(BaseModel):
+    results: List[ShoppingBatchResult]
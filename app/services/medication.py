@@ -1,69 +1,85 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.medication import Medication
 from app.schemas.medication import MedicationCreate, MedicationUpdate
-from typing import List, Optional
-import re
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
+from app.core.clock import utcnow
 from app.services.notification import NotificationService
+from app.services.stock_policy import calculate_days_until_empty, is_low_stock, needs_low_stock_alert
+from app.utils.websocket_manager import manager
 from app.models.notification import NotificationType, NotificationStatus, Notification
 from app.schemas.notification import NotificationCreate
+from app.services.search import medication_search_filter, medication_search_rank, typeahead_cache
+from app.services.sync import get_changes
+from app.utils.cache import read_cache, MEDICATIONS, NOTIFICATIONS, SHOPPING
 
-def calculate_days_until_empty(frequency: str, stock: int, pills_per_box: int) -> Optional[int]:
+def on_stock_changed(db: Session, medications: list, changed: bool = True) -> List[int]:
     """
-    Calcula quantos dias o medicamento vai durar baseado na frequência de uso.
+    Hook chamado sempre que o estoque de medicamentos muda (criação, edição,
+    ajuste de estoque, consumo e importação).
     
-    Args:
-        frequency: Frequência de uso (ex: "1x ao dia", "2x ao dia", "3x ao dia")
-        stock: Quantidade atual em estoque
-        pills_per_box: Quantidade de comprimidos por caixa
+    Avalia a política de estoque baixo apenas para esses medicamentos e emite
+    o alerta na hora: grava a notificação (no máximo uma por medicamento por dia)
+    e envia via WebSocket para os usuários conectados a este processo.
+    Também publica o novo estoque no tópico "medication:{id}" para os inscritos
+    e invalida as listagens em cache dos donos (changed=False quando o estoque
+    não mudou, só a política é reavaliada).
     
-    Returns:
-        Número de dias até o medicamento acabar, ou None se não for possível calcular
+    Não faz commit: a mudança de estoque e os alertas são confirmados juntos pelo
+    commit de quem chama, e só depois dele as mensagens são publicadas e enviadas.
+    Retorna os ids dos alertas criados.
     """
-
-    match = re.search(r'(\d+)x', frequency.lower())
-    if not match:
-        return None
-    
-    times_per_day = int(match.group(1))
-    
-    pills_per_day = times_per_day
-    
-    if stock <= 0:
-        return 0
+    today = utcnow().date()
+    alerts = []
+    messages = []
     
-    days_until_empty = stock // pills_per_day
+    # Atualização de estoque para quem assina o tópico do medicamento
+    if changed:
+        manager.after_commit(db, manager.publish_batch_from_thread, [
+            (manager.medication_topic(medication.id), manager.medication_stock_message(medication.id, medication.stock))
+            for medication in medications
+            if manager.has_subscribers(manager.medication_topic(medication.id))
+        ])
+        read_cache.invalidate(db, {medication.user_id for medication in medications}, MEDICATIONS)
     
-    return days_until_empty
-
-def is_low_stock(stock: int, pills_per_box: int, days_until_empty: int) -> bool:
-    """
-    Determina se o medicamento está com estoque baixo.
+    for medication in medications:
+        needs_alert, days_until_empty = needs_low_stock_alert(
+            medication.frequency, medication.stock, medication.pills_per_box
+        )
+        if needs_alert:
+            alerts.append(NotificationService.build_low_stock_alert(medication, days_until_empty, today))
+            messages.append((
+                medication.user_id,
+                manager.low_stock_alert_message(medication.name, medication.stock)
+            ))
     
-    Args:
-        stock: Quantidade atual em estoque
-        pills_per_box: Quantidade de comprimidos por caixa
-        days_until_empty: Dias até o medicamento acabar
+    if not alerts:
+        return []
     
-    Returns:
-        True se o estoque está baixo (menos de 7 dias ou menos de 1 caixa)
-    """
-    return days_until_empty <= 7 or stock <= pills_per_box
+    notification_ids = NotificationService.create_notifications(db, alerts, commit=False)
+    manager.after_commit(
+        db, manager.send_batch_from_thread, manager.attach_notification_ids(messages, notification_ids)
+    )
+    return [notification_id for notification_id in notification_ids if notification_id is not None]
 
 def create_medication(db: Session, medication: MedicationCreate, user_id: int) -> Medication:
     """Cria um novo medicamento, impedindo duplicidade de nome e dosagem para o mesmo usuário."""
     # Check if it already exists
     existing = db.query(Medication).filter(
         Medication.user_id == user_id,
-        Medication.name.ilike(medication.name),
+        func.lower(Medication.name) == medication.name.lower(),
         Medication.dosage == medication.dosage
     ).first()
     if existing:
         return None
     db_medication = Medication(**medication.model_dump(), user_id=user_id)
     db.add(db_medication)
+    db.flush()
+    on_stock_changed(db, [db_medication])
     db.commit()
     db.refresh(db_medication)
+    typeahead_cache.invalidate_user(user_id)
     return db_medication
 
 def get_medications(
@@ -78,10 +94,13 @@ def get_medications(
     query = db.query(Medication).filter(Medication.user_id == user_id)
     
     if search:
-        query = query.filter(Medication.name.ilike(f"%{search}%"))
+        query = query.filter(medication_search_filter(search))
     
     if category:
         query = query.filter(Medication.category == category)
+
+    if search:
+        query = query.order_by(*medication_search_rank(search))
     
     medications = query.offset(skip).limit(limit).all()
 
@@ -94,12 +113,31 @@ def get_medications(
         medication.days_until_empty = days_until_empty
         medication.is_low_stock = is_low_stock(
             medication.stock, 
-            medication.pills_per_box, 
-            days_until_empty or 0
+            days_until_empty
         )
     
     return medications
 
+def get_medication_changes(
+    db: Session, user_id: int, since: Optional[int]
+) -> Tuple[int, List[Medication], List[int]]:
+    """Delta sync: (novo cursor, medicamentos alterados com cálculos de estoque, ids excluídos)."""
+    version, medications, deleted = get_changes(db, Medication, "medication", user_id, since)
+    
+    for medication in medications:
+        days_until_empty = calculate_days_until_empty(
+            medication.frequency, 
+            medication.stock, 
+            medication.pills_per_box
+        )
+        medication.days_until_empty = days_until_empty
+        medication.is_low_stock = is_low_stock(
+            medication.stock, 
+            days_until_empty
+        )
+    
+    return version, medications, deleted
+
 def get_medication(db: Session, medication_id: int, user_id: int) -> Optional[Medication]:
     """Busca um medicamento específico com cálculos de estoque."""
     medication = db.query(Medication).filter(
@@ -116,8 +154,7 @@ def get_medication(db: Session, medication_id: int, user_id: int) -> Optional[Me
         medication.days_until_empty = days_until_empty
         medication.is_low_stock = is_low_stock(
             medication.stock, 
-            medication.pills_per_box, 
-            days_until_empty or 0
+            days_until_empty
         )
     
     return medication
@@ -140,8 +177,13 @@ def update_medication(
     for key, value in medication.model_dump().items():
         setattr(db_medication, key, value)
     
+    # As notificações listadas mostram o nome e a dosagem atuais do medicamento
+    read_cache.invalidate(db, [user_id], NOTIFICATIONS)
+    db.flush()
+    on_stock_changed(db, [db_medication])
     db.commit()
     db.refresh(db_medication)
+    typeahead_cache.invalidate_user(user_id)
     
     days_until_empty = calculate_days_until_empty(
         db_medication.frequency, 
@@ -151,8 +193,7 @@ def update_medication(
     db_medication.days_until_empty = days_until_empty
     db_medication.is_low_stock = is_low_stock(
         db_medication.stock, 
-        db_medication.pills_per_box, 
-        days_until_empty or 0
+        days_until_empty
     )
     
     return db_medication
@@ -168,7 +209,9 @@ def delete_medication(db: Session, medication_id: int, user_id: int) -> bool:
         return False
     
     db.delete(medication)
+    read_cache.invalidate(db, [user_id], MEDICATIONS, NOTIFICATIONS, SHOPPING)
     db.commit()
+    typeahead_cache.invalidate_user(user_id)
     return True
 
 def get_low_stock_medications(db: Session, user_id: int) -> List[Medication]:
@@ -181,65 +224,56 @@ def get_expired_medications(db: Session, user_id: int) -> List[Medication]:
     medications = get_medications(db, user_id, limit=1000)
     return [med for med in medications if med.stock <= 0]
 
-def auto_remove_empty_medications(db: Session, user_id: int) -> int:
+def remove_empty_medications(db: Session, criteria: Optional[list] = None) -> int:
     """
-    Remove automaticamente medicamentos com estoque zero.
+    Remove os medicamentos com estoque zero (dos usuários que atendem a criteria),
+    avisando cada dono com uma notificação. Usa o índice parcial de estoque zerado.
     Retorna o número de medicamentos removidos.
     """
-    from app.models.notification import Notification  
-
     empty_medications = db.query(Medication).filter(
-        Medication.user_id == user_id,
-        Medication.stock <= 0
+        Medication.stock <= 0,
+        *(criteria or [])
     ).all()
+    if not empty_medications:
+        return 0
     
-    count = len(empty_medications)
-    for medication in empty_medications:
-        NotificationService.create_notification(
-            db,
-            NotificationCreate(
-                title=f"Medicamento acabou: {medication.name}",
-                message=f"O medicamento {medication.name} acabou. Considere repor o estoque.",
-                notification_type=NotificationType.MEDICATION_EXPIRY,
-                user_id=user_id,
-                medication_id=medication.id,
-                medication_name=medication.name,
-                medication_dosage=str(medication.dosage)
-            )
+    NotificationService.create_notifications(db, [
+        NotificationCreate(
+            title=f"Medicamento acabou: {medication.name}",
+            message=f"O medicamento {medication.name} acabou. Considere repor o estoque.",
+            notification_type=NotificationType.MEDICATION_EXPIRY,
+            user_id=medication.user_id,
+            medication_id=medication.id,
+            medication_name=medication.name,
+            medication_dosage=str(medication.dosage)
         )
+        for medication in empty_medications
+    ], commit=False)
+    user_ids = {medication.user_id for medication in empty_medications}
+    for medication in empty_medications:
         db.delete(medication)
+    read_cache.invalidate(db, user_ids, MEDICATIONS, NOTIFICATIONS, SHOPPING)
     
     db.commit()
-    return count
+    for user_id in user_ids:
+        typeahead_cache.invalidate_user(user_id)
+    return len(empty_medications)
 
-def notify_critical_stock(db: Session, user_id: int):
+def auto_remove_empty_medications(db: Session, user_id: int) -> int:
     """
-    Cria uma notificação se algum medicamento estiver a dois dias de acabar.
+    Remove automaticamente medicamentos com estoque zero do usuário.
+    Retorna o número de medicamentos removidos.
     """
-    medications = db.query(Medication).filter(Medication.user_id == user_id).all()
-    for medication in medications:
-        days_until_empty = calculate_days_until_empty(
-            medication.frequency, 
-            medication.stock, 
-            medication.pills_per_box
-        )
+    return remove_empty_medications(db, [Medication.user_id == user_id])
 
-        if days_until_empty is not None and 0 < days_until_empty <= 7:
-            existing = db.query(Notification).filter(
-                Notification.user_id == user_id,
-                Notification.medication_id == medication.id,
-                Notification.notification_type == NotificationType.LOW_STOCK_ALERT,
-                Notification.status == NotificationStatus.PENDING
-            ).first()
-            if not existing:
-                NotificationService.create_notification(
-                    db,
-                    NotificationCreate(
-                        title=f"Medicamento quase acabando: {medication.name}",
-                        message=f"O medicamento {medication.name} está a {days_until_empty} dia(s) de acabar.",
-                        notification_type=NotificationType.LOW_STOCK_ALERT,
-                        user_id=user_id,
-                        medication_id=medication.id
-                    )
-                )
-    db.commit() 
\ No newline at end of file
+def notify_critical_stock(db: Session, user_id: int):
+    """
+    Reavalia a política de estoque baixo para todos os medicamentos do usuário.
+    Alertas já emitidos hoje são descartados pelo índice único de dedup_key.
+    """
+    medications = db.query(Medication).filter(
+        Medication.user_id == user_id,
+        Medication.stock > 0
+    ).all()
+    on_stock_changed(db, medications, changed=False)
+    db.commit()
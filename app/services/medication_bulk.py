@@ -0,0 +1,179 @@
+import codecs
+import csv
+import io
+import json
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.medication import Medication
+from app.schemas.medication import MedicationCreate
+from app.services.medication import on_stock_changed
+from app.services.search import typeahead_cache
+
+# Colunas do CSV, na mesma ordem usada pela exportação
+CSV_COLUMNS = [
+    "name", "dosage", "category", "frequency", "schedules",
+    "stock", "duration", "notes", "pills_per_box",
+]
+# Separador dos horários dentro da coluna "schedules" do CSV ("08:00;20:00")
+SCHEDULES_SEPARATOR = ";"
+INSERT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 500
+
+class ImportLimitExceeded(ValueError):
+    """O arquivo passou de MEDICATION_IMPORT_MAX_ROWS linhas; nada foi importado"""
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Lê o CSV linha a linha, retornando (número da linha, dados, erro de leitura)."""
+    # codecs.iterdecode em vez de io.TextIOWrapper: o SpooledTemporaryFile do upload
+    # não é um stream de E/S completo em todas as versões do Python
+    reader = csv.DictReader(codecs.iterdecode(stream, "utf-8-sig"))
+    for row in reader:
+        data = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+        for optional in ("duration", "notes"):
+            if data.get(optional) == "":
+                data[optional] = None
+        schedules = data.get("schedules")
+        if isinstance(schedules, str):
+            data["schedules"] = [item.strip() for item in schedules.split(SCHEDULES_SEPARATOR) if item.strip()]
+        yield reader.line_num, data, None
+
+def iter_ndjson_rows(stream: BinaryIO) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Lê NDJSON (um objeto JSON por linha), retornando (número da linha, dados, erro de leitura)."""
+    for line_number, raw_line in enumerate(codecs.iterdecode(stream, "utf-8-sig"), start=1):
+        line = raw_line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield line_number, data, None
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in item['loc']) or 'linha'}: {item['msg']}"
+        for item in error.errors()
+    ]
+
+def _insert_returning_stock():
+    """INSERT de várias linhas que devolve só o necessário para avaliar o estoque"""
+    return insert(Medication).returning(
+        Medication.id, Medication.user_id, Medication.name, Medication.dosage,
+        Medication.frequency, Medication.stock, Medication.pills_per_box
+    )
+
+def import_medications(
+    db: Session,
+    user_id: int,
+    rows: Iterable[Tuple[int, Optional[dict], Optional[str]]]
+) -> Dict:
+    """
+    Importa medicamentos em lote.
+
+    Cada linha é validada com MedicationCreate em uma única passada; duplicados
+    (mesmo nome sem diferenciar maiúsculas + mesma dosagem) são descartados em
+    memória contra os medicamentos já existentes do usuário e contra o próprio
+    arquivo. As linhas válidas são inseridas com INSERT de múltiplas linhas,
+    em lotes, e confirmadas em um único commit.
+
+    Um arquivo com mais de MEDICATION_IMPORT_MAX_ROWS linhas é rejeitado por
+    inteiro (ImportLimitExceeded): os lotes já inseridos são desfeitos.
+    """
+    existing = {
+        (name, dosage)
+        for name, dosage in db.query(func.lower(Medication.name), Medication.dosage).filter(
+            Medication.user_id == user_id
+        )
+    }
+
+    imported = 0
+    duplicates = 0
+    errors = []
+    batch = []
+    inserted = []
+
+    for processed, (row_number, data, read_error) in enumerate(rows, start=1):
+        if processed > settings.MEDICATION_IMPORT_MAX_ROWS:
+            db.rollback()
+            raise ImportLimitExceeded(
+                f"Limite de {settings.MEDICATION_IMPORT_MAX_ROWS} linhas por importação excedido; nada foi importado"
+            )
+        if read_error:
+            errors.append({"row": row_number, "errors": [read_error]})
+            continue
+        try:
+            medication = MedicationCreate.model_validate(data)
+        except ValidationError as e:
+            errors.append({"row": row_number, "errors": _validation_messages(e)})
+            continue
+
+        key = (medication.name.lower(), medication.dosage)
+        if key in existing:
+            duplicates += 1
+            errors.append({
+                "row": row_number,
+                "errors": ["Já existe um medicamento com este nome e dosagem para o usuário."]
+            })
+            continue
+        existing.add(key)
+
+        batch.append({**medication.model_dump(), "user_id": user_id})
+        if len(batch) >= INSERT_BATCH_SIZE:
+            inserted.extend(db.execute(_insert_returning_stock(), batch))
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        inserted.extend(db.execute(_insert_returning_stock(), batch))
+        imported += len(batch)
+
+    # Avalia estoque baixo dos importados: os alertas entram na mesma transação
+    # e saem pelo WebSocket só depois do commit
+    on_stock_changed(db, inserted)
+    db.commit()
+    if imported:
+        typeahead_cache.invalidate_user(user_id)
+
+    return {"imported": imported, "duplicates": duplicates, "errors": errors}
+
+def _export_rows(db: Session, user_id: int):
+    columns = [getattr(Medication, column) for column in CSV_COLUMNS]
+    return db.query(*columns).filter(
+        Medication.user_id == user_id
+    ).order_by(Medication.id).yield_per(EXPORT_BATCH_SIZE)
+
+def export_medications_csv(db: Session, user_id: int) -> Iterator[str]:
+    """Gera o CSV dos medicamentos do usuário em blocos, sem carregar tudo na memória."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+
+    for count, row in enumerate(_export_rows(db, user_id), start=1):
+        values = dict(zip(CSV_COLUMNS, row))
+        values["schedules"] = SCHEDULES_SEPARATOR.join(values["schedules"] or [])
+        writer.writerow([values[column] if values[column] is not None else "" for column in CSV_COLUMNS])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+def export_medications_ndjson(db: Session, user_id: int) -> Iterator[str]:
+    """Gera NDJSON (um medicamento por linha) em blocos."""
+    lines = []
+    for row in _export_rows(db, user_id):
+        lines.append(json.dumps(dict(zip(CSV_COLUMNS, row)), ensure_ascii=False))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -1,34 +1,128 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
-from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, insert, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 from app.models.notification import Notification, NotificationType, NotificationStatus
 from app.models.medication import Medication
-from app.schemas.notification import NotificationCreate, NotificationUpdate
+from app.schemas.notification import NotificationCreate, NotificationUpdate, SystemNotificationCreate
+from app.core.config import settings
+from app.core.clock import utcnow
+from app.services.stock_policy import needs_low_stock_alert
+from app.utils.cache import read_cache, NOTIFICATIONS
 import logging
+import random
 
 logger = logging.getLogger(__name__)
 
 class NotificationService:
     
+    @staticmethod
+    def _notification_values(notification_data: NotificationCreate) -> dict:
+        return {
+            "title": notification_data.title,
+            "message": notification_data.message,
+            "notification_type": notification_data.notification_type,
+            "user_id": notification_data.user_id,
+            "medication_id": notification_data.medication_id,
+            "scheduled_for": notification_data.scheduled_for,
+            "medication_name": notification_data.medication_name,
+            "medication_dosage": notification_data.medication_dosage,
+            "dedup_key": getattr(notification_data, "dedup_key", None)
+        }
+    
+    @staticmethod
+    def reminder_dedup_key(medication_id: int, day: date, schedule: str) -> str:
+        """Chave de um lembrete: um por medicamento, dia e horário"""
+        return f"reminder:{medication_id}:{day.isoformat()}:{schedule}"
+    
+    @staticmethod
+    def low_stock_dedup_key(medication_id: int, day: date) -> str:
+        """Chave de um alerta de estoque baixo: um por medicamento por dia"""
+        return f"low_stock:{medication_id}:{day.isoformat()}"
+    
+    @staticmethod
+    def build_low_stock_alert(medication, days_until_empty: Optional[int], day: date) -> SystemNotificationCreate:
+        """Monta o alerta de estoque baixo de um medicamento (um por dia)"""
+        remaining = f"{medication.stock} unidades restantes"
+        if days_until_empty is not None:
+            remaining += f", cerca de {days_until_empty} dia(s)"
+        return SystemNotificationCreate(
+            title=f"Estoque Baixo: {medication.name}",
+            message=f"O medicamento {medication.name} está com estoque baixo ({remaining}). Considere fazer reposição.",
+            notification_type=NotificationType.LOW_STOCK_ALERT,
+            user_id=medication.user_id,
+            medication_id=medication.id,
+            medication_name=medication.name,
+            medication_dosage=str(medication.dosage),
+            dedup_key=NotificationService.low_stock_dedup_key(medication.id, day)
+        )
+    
     @staticmethod
     def create_notification(db: Session, notification_data: NotificationCreate) -> Notification:
         """Cria uma nova notificação"""
-        db_notification = Notification(
-            title=notification_data.title,
-            message=notification_data.message,
-            notification_type=notification_data.notification_type,
-            user_id=notification_data.user_id,
-            medication_id=notification_data.medication_id,
-            scheduled_for=notification_data.scheduled_for,
-            medication_name=notification_data.medication_name,
-            medication_dosage=notification_data.medication_dosage
-        )
+        db_notification = Notification(**NotificationService._notification_values(notification_data))
         db.add(db_notification)
+        read_cache.invalidate(db, [notification_data.user_id], NOTIFICATIONS)
         db.commit()
         db.refresh(db_notification)
         return db_notification
     
+    @staticmethod
+    def create_notifications(
+        db: Session,
+        notifications_data: List[NotificationCreate],
+        commit: bool = True
+    ) -> List[Optional[int]]:
+        """
+        Cria várias notificações com INSERT ... RETURNING e um único commit.
+        Com commit=False as linhas ficam na transação de quem chama, que confirma.
+        
+        Notificações com dedup_key (SystemNotificationCreate) usam ON CONFLICT DO
+        NOTHING no índice único parcial (user_id, dedup_key), então duplicatas são
+        descartadas pelo banco, mesmo com vários workers concorrentes. Retorna os ids na mesma ordem de notifications_data,
+        com None para as que já existiam.
+        """
+        notification_ids: List[Optional[int]] = [None] * len(notifications_data)
+        plain_indexes = []
+        keyed_indexes: Dict[Tuple[int, str], int] = {}
+        for index, data in enumerate(notifications_data):
+            dedup_key = getattr(data, "dedup_key", None)
+            if dedup_key is None:
+                plain_indexes.append(index)
+            else:
+                keyed_indexes.setdefault((data.user_id, dedup_key), index)
+        
+        if plain_indexes:
+            result = db.execute(
+                insert(Notification).returning(Notification.id, sort_by_parameter_order=True),
+                [NotificationService._notification_values(notifications_data[index]) for index in plain_indexes]
+            )
+            for index, notification_id in zip(plain_indexes, result.scalars()):
+                notification_ids[index] = notification_id
+        
+        if keyed_indexes:
+            statement = pg_insert(Notification).on_conflict_do_nothing(
+                index_elements=[Notification.user_id, Notification.dedup_key],
+                index_where=Notification.dedup_key.isnot(None)
+            ).returning(Notification.id, Notification.user_id, Notification.dedup_key)
+            result = db.execute(
+                statement,
+                [NotificationService._notification_values(notifications_data[index]) for index in keyed_indexes.values()]
+            )
+            for notification_id, user_id, dedup_key in result:
+                notification_ids[keyed_indexes[(user_id, dedup_key)]] = notification_id
+        
+        if plain_indexes or keyed_indexes:
+            read_cache.invalidate(db, {
+                data.user_id
+                for data, notification_id in zip(notifications_data, notification_ids)
+                if notification_id is not None
+            }, NOTIFICATIONS)
+            if commit:
+                db.commit()
+        return notification_ids
+    
     @staticmethod
     def get_user_notifications(
         db: Session, 
@@ -45,6 +139,16 @@ class NotificationService:
         
         return query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_notifications_since(db: Session, user_id: int, since: datetime, limit: int) -> List[Notification]:
+        """Notificações do usuário criadas depois de `since`, da mais antiga para a mais nova"""
+        return db.query(Notification).filter(
+            and_(
+                Notification.user_id == user_id,
+                Notification.created_at > since
+            )
+        ).order_by(Notification.created_at, Notification.id).limit(limit).all()
+    
     @staticmethod
     def get_notification(db: Session, notification_id: int, user_id: int) -> Optional[Notification]:
         """Busca uma notificação específica do usuário"""
@@ -68,6 +172,7 @@ class NotificationService:
         for field, value in update_data.items():
             setattr(notification, field, value)
         
+        read_cache.invalidate(db, [user_id], NOTIFICATIONS)
         db.commit()
         db.refresh(notification)
         return notification
@@ -80,7 +185,8 @@ class NotificationService:
             return None
         
         notification.status = NotificationStatus.READ
-        notification.read_at = datetime.utcnow()
+        notification.read_at = utcnow()
+        read_cache.invalidate(db, [user_id], NOTIFICATIONS)
         db.commit()
         db.refresh(notification)
         return notification
@@ -93,78 +199,173 @@ class NotificationService:
             return False
         
         db.delete(notification)
+        read_cache.invalidate(db, [user_id], NOTIFICATIONS)
         db.commit()
         return True
     
     @staticmethod
-    def get_pending_notifications(db: Session) -> List[Notification]:
-        """Busca notificações pendentes para envio"""
-        return db.query(Notification).filter(
-            and_(
-                Notification.status == NotificationStatus.PENDING,
-                or_(
-                    Notification.scheduled_for.is_(None),
-                    Notification.scheduled_for <= datetime.utcnow()
+    def get_pending_notifications(
+        db: Session,
+        criteria: Optional[list] = None,
+        limit: Optional[int] = None,
+        claim: bool = False
+    ) -> List[Notification]:
+        """
+        Busca notificações pendentes para envio.
+        
+        Com claim=True as linhas ficam travadas (FOR UPDATE SKIP LOCKED) até o
+        commit da sessão, então dois workers nunca pegam a mesma notificação.
+        """
+        now = utcnow()
+        query = db.query(Notification).filter(
+            or_(
+                and_(
+                    Notification.status == NotificationStatus.PENDING,
+                    or_(
+                        Notification.scheduled_for.is_(None),
+                        Notification.scheduled_for <= now
+                    )
+                ),
+                # Falhas aguardando nova tentativa
+                and_(
+                    Notification.status == NotificationStatus.FAILED,
+                    Notification.next_attempt_at <= now
                 )
-            )
-        ).all()
+            ),
+            *(criteria or [])
+        )
+        if claim:
+            query = query.order_by(Notification.id).with_for_update(skip_locked=True)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
     
     @staticmethod
-    def create_medication_reminders(db: Session, user_id: int) -> List[Notification]:
+    def create_medication_reminders(db: Session, user_id: int) -> List[int]:
         """Cria lembretes de medicamentos baseados nos horários configurados"""
         medications = db.query(Medication).filter(Medication.user_id == user_id).all()
-        notifications = []
+        scheduled_for = utcnow() + timedelta(minutes=30)
         
-        for medication in medications:
-            if medication.stock <= 0:
-                continue
-            
-            print(f"CRIANDO NOTIFICAÇÃO: {medication.name} para user {user_id}")
-            notification = NotificationService.create_notification(
-                db=db,
-                notification_data=NotificationCreate(
-                    title=f"Lembrete: {medication.name}",
-                    message=f"Horário de tomar {medication.name} - {medication.dosage}mg ({medication.frequency})",
-                    notification_type=NotificationType.MEDICATION_REMINDER,
-                    user_id=user_id,
-                    medication_id=medication.id,
-                    medication_name=medication.name,
-                    medication_dosage=str(medication.dosage),
-                    scheduled_for=datetime.utcnow() + timedelta(minutes=30) 
-                )
+        notifications_data = [
+            NotificationCreate(
+                title=f"Lembrete: {medication.name}",
+                message=f"Horário de tomar {medication.name} - {medication.dosage}mg ({medication.frequency})",
+                notification_type=NotificationType.MEDICATION_REMINDER,
+                user_id=user_id,
+                medication_id=medication.id,
+                medication_name=medication.name,
+                medication_dosage=str(medication.dosage),
+                scheduled_for=scheduled_for
             )
-            notifications.append(notification)
+            for medication in medications
+            if medication.stock > 0
+        ]
         
-        return notifications
+        logger.info(f"Criando {len(notifications_data)} lembretes para o usuário {user_id}")
+        return [
+            notification_id
+            for notification_id in NotificationService.create_notifications(db, notifications_data)
+            if notification_id is not None
+        ]
     
     @staticmethod
-    def create_low_stock_alerts(db: Session, user_id: int) -> List[Notification]:
+    def create_low_stock_alerts(db: Session, user_id: int) -> List[int]:
         """Cria alertas de estoque baixo"""
         medications = db.query(Medication).filter(
             and_(
                 Medication.user_id == user_id,
-                Medication.stock <= 7
+                Medication.stock > 0
             )
         ).all()
+        today = utcnow().date()
         
-        notifications = []
+        notifications_data = []
         for medication in medications:
-            print(f"CRIANDO NOTIFICAÇÃO: {medication.name} para user {user_id}")
-            notification = NotificationService.create_notification(
-                db=db,
-                notification_data=NotificationCreate(
-                    title=f"Estoque Baixo: {medication.name}",
-                    message=f"O medicamento {medication.name} está com estoque baixo ({medication.stock} unidades restantes). Considere fazer reposição.",
-                    notification_type=NotificationType.LOW_STOCK_ALERT,
-                    user_id=user_id,
-                    medication_id=medication.id,
-                    medication_name=medication.name,
-                    medication_dosage=str(medication.dosage)
+            needs_alert, days_until_empty = needs_low_stock_alert(
+                medication.frequency, medication.stock, medication.pills_per_box
+            )
+            if needs_alert:
+                notifications_data.append(
+                    NotificationService.build_low_stock_alert(medication, days_until_empty, today)
                 )
+        
+        logger.info(f"Criando {len(notifications_data)} alertas de estoque baixo para o usuário {user_id}")
+        return [
+            notification_id
+            for notification_id in NotificationService.create_notifications(db, notifications_data)
+            if notification_id is not None
+        ]
+    
+    @staticmethod
+    def retry_delay(attempts: int) -> timedelta:
+        """
+        Espera antes da próxima tentativa: exponencial (base * 2^(tentativas-1)),
+        limitada a NOTIFICATION_RETRY_MAX_SECONDS, com jitter para que falhas
+        simultâneas não voltem todas no mesmo ciclo.
+        """
+        delay = min(
+            settings.NOTIFICATION_RETRY_MAX_SECONDS,
+            settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1)
+        )
+        return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+    
+    @staticmethod
+    def record_delivery_failure(notification: Notification, error: str):
+        """Registra uma falha de envio: agenda nova tentativa ou move para DEAD_LETTER"""
+        notification.attempts = (notification.attempts or 0) + 1
+        notification.last_error = error[:1000]
+        notification.sent_at = None
+        if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            notification.status = NotificationStatus.DEAD_LETTER
+            notification.next_attempt_at = None
+        else:
+            notification.status = NotificationStatus.FAILED
+            notification.next_attempt_at = utcnow() + NotificationService.retry_delay(notification.attempts)
+    
+    @staticmethod
+    def get_dead_letters(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Notification]:
+        """Busca notificações do usuário que esgotaram as tentativas de envio"""
+        return db.query(Notification).filter(
+            and_(
+                Notification.user_id == user_id,
+                Notification.status == NotificationStatus.DEAD_LETTER
             )
-            notifications.append(notification)
+        ).order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def requeue_notification(db: Session, notification_id: int, user_id: int) -> Optional[Notification]:
+        """Devolve uma notificação com falha para a fila de envio"""
+        notification = NotificationService.get_notification(db, notification_id, user_id)
+        if not notification or notification.status not in (NotificationStatus.DEAD_LETTER, NotificationStatus.FAILED):
+            return None
         
-        return notifications
+        notification.status = NotificationStatus.PENDING
+        notification.attempts = 0
+        notification.next_attempt_at = None
+        notification.last_error = None
+        read_cache.invalidate(db, [user_id], NOTIFICATIONS)
+        db.commit()
+        db.refresh(notification)
+        return notification
+    
+    @staticmethod
+    def requeue_dead_letters(db: Session, user_id: int) -> int:
+        """Devolve todas as notificações do usuário em DEAD_LETTER para a fila de envio"""
+        count = db.query(Notification).filter(
+            and_(
+                Notification.user_id == user_id,
+                Notification.status == NotificationStatus.DEAD_LETTER
+            )
+        ).update({
+            Notification.status: NotificationStatus.PENDING,
+            Notification.attempts: 0,
+            Notification.next_attempt_at: None,
+            Notification.last_error: None
+        }, synchronize_session=False)
+        if count:
+            read_cache.invalidate(db, [user_id], NOTIFICATIONS)
+        db.commit()
+        return count
     
     @staticmethod
     def mark_notification_as_sent(db: Session, notification_id: int) -> bool:
@@ -174,10 +375,17 @@ class NotificationService:
             return False
         
         notification.status = NotificationStatus.SENT
-        notification.sent_at = datetime.utcnow()
+        notification.sent_at = utcnow()
+        read_cache.invalidate(db, [notification.user_id], NOTIFICATIONS)
         db.commit()
         return True
     
+    @staticmethod
+    def count_by_status(db: Session) -> Dict[str, int]:
+        """Quantidade de notificações por status (profundidade da fila), em uma consulta"""
+        rows = db.query(Notification.status, func.count(Notification.id)).group_by(Notification.status).all()
+        return {status.value: count for status, count in rows}
+    
     @staticmethod
     def get_unread_count(db: Session, user_id: int) -> int:
         """Conta notificações não lidas do usuário"""
@@ -0,0 +1,116 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session
+from app.db.extensions import search_key
+from app.models.medication import Medication
+
+def normalize_search_term(term: str) -> str:
+    """Normaliza o termo como o índice: minúsculas e sem acentos ("Dipirona Sódica" -> "dipirona sodica")."""
+    decomposed = unicodedata.normalize("NFKD", term.strip().lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def medication_search_filter(term: str):
+    """
+    Filtro por nome que usa o índice trigram (ix_medications_name_trgm).
+    Casa substrings e nomes parecidos (erros de digitação).
+    """
+    normalized = normalize_search_term(term)
+    key = search_key(Medication.name)
+    return or_(
+        key.contains(normalized, autoescape=True),
+        key.op("%")(normalized)
+    )
+
+def medication_search_rank(term: str) -> list:
+    """Ordenação por relevância: prefixo primeiro, depois similaridade e nome."""
+    normalized = normalize_search_term(term)
+    key = search_key(Medication.name)
+    return [
+        case((key.startswith(normalized, autoescape=True), 0), else_=1),
+        func.similarity(key, normalized).desc(),
+        Medication.name,
+    ]
+
+def search_medications(db: Session, user_id: int, term: str, limit: int = 10) -> List[Tuple[int, str, float]]:
+    """Busca medicamentos do usuário por nome, ordenados por relevância."""
+    return db.query(Medication.id, Medication.name, Medication.dosage).filter(
+        Medication.user_id == user_id,
+        medication_search_filter(term)
+    ).order_by(*medication_search_rank(term)).limit(limit).all()
+
+class TypeaheadCache:
+    """
+    Cache LRU pequeno por usuário para o autocomplete.
+    Cada tecla gera uma busca; prefixos repetidos (apagar e redigitar)
+    são respondidos da memória até o TTL expirar ou o usuário alterar
+    seus medicamentos.
+    """
+
+    def __init__(self, max_users: int = 1024, max_prefixes_per_user: int = 32, ttl_seconds: float = 60):
+        self.max_users = max_users
+        self.max_prefixes_per_user = max_prefixes_per_user
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, OrderedDict[Tuple[str, int], Tuple[float, list]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, prefix: str, limit: int) -> Optional[list]:
+        """Retorna o resultado em cache ou None"""
+        with self._lock:
+            user_entries = self._entries.get(user_id)
+            if user_entries is None:
+                return None
+            entry = user_entries.get((prefix, limit))
+            if entry is None:
+                return None
+            stored_at, results = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del user_entries[(prefix, limit)]
+                return None
+            user_entries.move_to_end((prefix, limit))
+            self._entries.move_to_end(user_id)
+            return results
+
+    def put(self, user_id: int, prefix: str, limit: int, results: list):
+        """Guarda o resultado de um prefixo"""
+        with self._lock:
+            user_entries = self._entries.setdefault(user_id, OrderedDict())
+            self._entries.move_to_end(user_id)
+            user_entries[(prefix, limit)] = (time.monotonic(), results)
+            user_entries.move_to_end((prefix, limit))
+            while len(user_entries) > self.max_prefixes_per_user:
+                user_entries.popitem(last=False)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """Descarta o cache de um usuário (chamado após escritas em medicamentos)"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Instância global do cache de autocomplete
+typeahead_cache = TypeaheadCache()
+
+def typeahead_medications(db: Session, user_id: int, term: str, limit: int = 10) -> List[Dict]:
+    """Sugestões de autocomplete para o usuário, servidas do cache quando possível."""
+    prefix = normalize_search_term(term)
+    if not prefix:
+        return []
+
+    cached = typeahead_cache.get(user_id, prefix, limit)
+    if cached is not None:
+        return cached
+
+    results = [
+        {"id": medication_id, "name": name, "dosage": dosage}
+        for medication_id, name, dosage in search_medications(db, user_id, prefix, limit)
+    ]
+    typeahead_cache.put(user_id, prefix, limit, results)
+    return results
@@ -1,11 +1,30 @@
 # app/services/shopping.py
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Integer, delete, exists, func, literal, literal_column, null, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from app.core.clock import utcnow
+from app.core.config import settings
+from app.models.medication import Medication
+from app.models.notification import Notification, NotificationType
 from app.models.shopping import ShoppingItem
-from app.schemas.shopping import ShoppingItemCreate
+from app.schemas.shopping import ShoppingBatchCreate, ShoppingItemCreate
+from app.services.stock_policy import is_low_stock_sql, refill_boxes_sql
+from app.services.sync import get_changes
+from app.utils.cache import read_cache, SHOPPING
 
 def create_shopping_item(db: Session, item: ShoppingItemCreate, user_id: int):
+    # Um item por nome por usuário: adicionar de novo devolve o existente
+    existing = db.query(ShoppingItem).filter(
+        ShoppingItem.user_id == user_id,
+        func.lower(ShoppingItem.name) == item.name.lower()
+    ).first()
+    if existing:
+        return existing
     db_item = ShoppingItem(**item.dict(), user_id=user_id)
     db.add(db_item)
+    read_cache.invalidate(db, [user_id], SHOPPING)
     db.commit()
     db.refresh(db_item)
     return db_item
@@ -13,10 +32,14 @@ def create_shopping_item(db: Session, item: ShoppingItemCreate, user_id: int):
 def get_shopping_list(db: Session, user_id: int):
     return db.query(ShoppingItem).filter(ShoppingItem.user_id == user_id).all()
 
+def get_shopping_changes(db: Session, user_id: int, since: Optional[int]) -> Tuple[int, List[ShoppingItem], List[int]]:
+    return get_changes(db, ShoppingItem, "shopping_item", user_id, since)
+
 def delete_shopping_item(db: Session, item_id: int, user_id: int):
     item = db.query(ShoppingItem).filter_by(id=item_id, user_id=user_id).first()
     if item:
         db.delete(item)
+        read_cache.invalidate(db, [user_id], SHOPPING)
         db.commit()
     return item
 
@@ -24,6 +47,179 @@ def update_shopping_item(db: Session, item_id: int, user_id: int, checked: bool)
     item = db.query(ShoppingItem).filter_by(id=item_id, user_id=user_id).first()
     if item:
         item.checked = checked
+        read_cache.invalidate(db, [user_id], SHOPPING)
         db.commit()
         db.refresh(item)
-    return item
\ No newline at end of file
+    return item
+
+ITEM_COLUMNS = [
+    ShoppingItem.id, ShoppingItem.name, ShoppingItem.checked,
+    ShoppingItem.medication_id, ShoppingItem.suggested_boxes
+]
+
+def _create_items(db: Session, user_id: int, names: List[str]) -> Dict[str, Tuple[str, dict]]:
+    """Cria os nomes que não existem (um INSERT ... ON CONFLICT DO NOTHING); retorna {nome minúsculo: (status, item)}"""
+    created = db.execute(
+        pg_insert(ShoppingItem).values([
+            {"name": name, "user_id": user_id, "checked": False} for name in names
+        ]).on_conflict_do_nothing(
+            index_elements=[ShoppingItem.user_id, func.lower(ShoppingItem.name)]
+        ).returning(*ITEM_COLUMNS)
+    ).mappings().all()
+    items = {item["name"].lower(): ("ok", dict(item)) for item in created}
+    
+    existing = [name.lower() for name in names if name.lower() not in items]
+    if existing:
+        for item in db.execute(
+            select(*ITEM_COLUMNS).where(
+                ShoppingItem.user_id == user_id,
+                func.lower(ShoppingItem.name).in_(existing)
+            )
+        ).mappings():
+            items[item["name"].lower()] = ("exists", dict(item))
+    return items
+
+def apply_shopping_batch(db: Session, user_id: int, operations: list) -> List[dict]:
+    """
+    Aplica criações, marcações e exclusões em uma transação, com comandos
+    por conjunto: um INSERT para as criações, um SELECT dos itens citados e
+    no máximo um UPDATE por valor de "checked" e um DELETE, com um único commit.
+    
+    As criações vêm primeiro; check/uncheck/delete seguem a ordem enviada
+    (o último check/uncheck de um item vale; depois do delete, o item não existe).
+    Retorna um resultado por operação, na mesma ordem.
+    """
+    # Nomes repetidos (sem diferenciar maiúsculas) viram uma criação, com a primeira grafia
+    spellings: Dict[str, str] = {}
+    for operation in operations:
+        if isinstance(operation, ShoppingBatchCreate):
+            spellings.setdefault(operation.name.lower(), operation.name)
+    names = list(spellings.values())
+    created = _create_items(db, user_id, names) if names else {}
+    
+    item_ids = {operation.id for operation in operations if not isinstance(operation, ShoppingBatchCreate)}
+    items = {
+        item["id"]: dict(item) for item in db.execute(
+            select(*ITEM_COLUMNS).where(ShoppingItem.user_id == user_id, ShoppingItem.id.in_(item_ids))
+        ).mappings()
+    } if item_ids else {}
+    
+    results = []
+    touched, deleted = set(), set()
+    for operation in operations:
+        if isinstance(operation, ShoppingBatchCreate):
+            status, item = created[operation.name.lower()]
+            results.append({"op": operation.op, "status": status, "id": item["id"], "item": item})
+            continue
+        item = items.get(operation.id)
+        if item is None or operation.id in deleted:
+            results.append({"op": operation.op, "status": "not_found", "id": operation.id})
+            continue
+        if operation.op == "delete":
+            deleted.add(operation.id)
+            results.append({"op": operation.op, "status": "ok", "id": operation.id})
+        else:
+            item["checked"] = operation.op == "check"
+            touched.add(operation.id)
+            results.append({"op": operation.op, "status": "ok", "id": operation.id, "item": dict(item)})
+    
+    for checked in (True, False):
+        ids = [item_id for item_id in touched - deleted if items[item_id]["checked"] is checked]
+        if ids:
+            # Só linhas que mudam: não gera versão nova (delta sync) para quem já estava assim
+            db.execute(
+                update(ShoppingItem).where(
+                    ShoppingItem.user_id == user_id,
+                    ShoppingItem.id.in_(ids),
+                    ShoppingItem.checked.is_distinct_from(checked)
+                ).values(checked=checked)
+            )
+    if deleted:
+        db.execute(delete(ShoppingItem).where(ShoppingItem.user_id == user_id, ShoppingItem.id.in_(deleted)))
+    
+    read_cache.invalidate(db, [user_id], SHOPPING)
+    db.commit()
+    return results
+
+def _refill_candidates(user_id: Optional[int]):
+    """
+    Itens de reposição, um por (usuário, nome):
+    - medicamentos com estoque baixo ou zerado (mesma regra de is_low_stock)
+    - medicamentos que acabaram e já foram removidos (alertas MEDICATION_EXPIRY
+      dos últimos SHOPPING_REFILL_EXPIRED_DAYS dias), se o usuário não cadastrou
+      outro com o mesmo nome
+    Quando as duas fontes têm o mesmo nome, vale o medicamento cadastrado.
+    """
+    low_stock = select(
+        Medication.user_id.label("user_id"),
+        Medication.name.label("name"),
+        Medication.id.label("medication_id"),
+        refill_boxes_sql(Medication.frequency, Medication.stock, Medication.pills_per_box).label("suggested_boxes"),
+        literal(0).label("priority"),
+    ).where(is_low_stock_sql(Medication.frequency, Medication.stock))
+
+    expired = select(
+        Notification.user_id,
+        Notification.medication_name,
+        null().cast(Integer),
+        literal(1),
+        literal(1),
+    ).where(
+        Notification.notification_type == NotificationType.MEDICATION_EXPIRY,
+        Notification.medication_name.isnot(None),
+        Notification.created_at >= utcnow() - timedelta(days=settings.SHOPPING_REFILL_EXPIRED_DAYS),
+        ~exists().where(
+            Medication.user_id == Notification.user_id,
+            func.lower(Medication.name) == func.lower(Notification.medication_name)
+        )
+    )
+
+    if user_id is not None:
+        low_stock = low_stock.where(Medication.user_id == user_id)
+        expired = expired.where(Notification.user_id == user_id)
+
+    refill = union_all(low_stock, expired).subquery("refill")
+    # DISTINCT ON: o upsert não pode tocar a mesma linha duas vezes no mesmo comando
+    return select(
+        refill.c.user_id, refill.c.name, refill.c.medication_id, refill.c.suggested_boxes
+    ).distinct(
+        refill.c.user_id, func.lower(refill.c.name)
+    ).order_by(
+        refill.c.user_id, func.lower(refill.c.name), refill.c.priority, refill.c.medication_id
+    )
+
+def refill_shopping_lists(db: Session, user_id: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Sincroniza a lista de compras com o estado dos medicamentos em um único
+    comando (INSERT ... SELECT ... ON CONFLICT): calcula o conjunto de reposição
+    no banco e faz o upsert por (usuário, nome). Itens existentes mantêm o
+    "checked"; só são atualizados se o medicamento ou as caixas sugeridas mudaram.
+    Sem user_id, sincroniza todos os usuários (job diário do worker).
+    Retorna (criados, atualizados).
+    """
+    statement = pg_insert(ShoppingItem).from_select(
+        ["user_id", "name", "medication_id", "suggested_boxes"],
+        _refill_candidates(user_id)
+    )
+    new_medication_id = func.coalesce(statement.excluded.medication_id, ShoppingItem.medication_id)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ShoppingItem.user_id, func.lower(ShoppingItem.name)],
+        set_={
+            "medication_id": new_medication_id,
+            "suggested_boxes": statement.excluded.suggested_boxes,
+        },
+        where=or_(
+            ShoppingItem.medication_id.is_distinct_from(new_medication_id),
+            ShoppingItem.suggested_boxes.is_distinct_from(statement.excluded.suggested_boxes),
+        )
+    ).returning(literal_column("xmax = 0").label("inserted"))
+
+    inserted = db.execute(statement).scalars().all()
+    if inserted:
+        if user_id is None:
+            read_cache.invalidate_all(db, SHOPPING)
+        else:
+            read_cache.invalidate(db, [user_id], SHOPPING)
+    db.commit()
+    created = sum(1 for flag in inserted if flag)
+    return created, len(inserted) - created
@@ -0,0 +1,87 @@
+import re
+from typing import Optional, Tuple
+from sqlalchemy import Integer, and_, cast, func, or_
+from app.core.config import settings
+
+def calculate_days_until_empty(frequency: str, stock: int, pills_per_box: int) -> Optional[int]:
+    """
+    Calcula quantos dias o medicamento vai durar baseado na frequência de uso.
+    
+    Args:
+        frequency: Frequência de uso (ex: "1x ao dia", "2x ao dia", "3x ao dia")
+        stock: Quantidade atual em estoque
+        pills_per_box: Quantidade de comprimidos por caixa
+    
+    Returns:
+        Número de dias até o medicamento acabar, ou None se não for possível calcular
+    """
+
+    match = re.search(r'(\d+)x', frequency.lower())
+    if not match:
+        return None
+    
+    times_per_day = int(match.group(1))
+    if times_per_day == 0:
+        return None
+    
+    pills_per_day = times_per_day
+    
+    if stock <= 0:
+        return 0
+    
+    days_until_empty = stock // pills_per_day
+    
+    return days_until_empty
+
+def is_low_stock(stock: int, days_until_empty: Optional[int]) -> bool:
+    """
+    Determina se o medicamento está com estoque baixo.
+    Esta é a única regra de estoque baixo: vale para a API, os alertas e o worker.
+    
+    Args:
+        stock: Quantidade atual em estoque
+        days_until_empty: Dias até o medicamento acabar, ou None se a frequência
+            não permite calcular
+    
+    Returns:
+        True se o estoque dura LOW_STOCK_DAYS_THRESHOLD dias ou menos; sem frequência
+        conhecida, se restam LOW_STOCK_UNITS_THRESHOLD unidades ou menos
+    """
+    if days_until_empty is None:
+        return stock <= settings.LOW_STOCK_UNITS_THRESHOLD
+    return days_until_empty <= settings.LOW_STOCK_DAYS_THRESHOLD
+
+def needs_low_stock_alert(frequency: str, stock: int, pills_per_box: int) -> Tuple[bool, Optional[int]]:
+    """
+    Avalia se um medicamento deve gerar alerta de estoque baixo.
+    Medicamentos zerados não geram alerta (são tratados como MEDICATION_EXPIRY).
+    
+    Returns:
+        (precisa de alerta, dias até acabar)
+    """
+    days_until_empty = calculate_days_until_empty(frequency, stock, pills_per_box)
+    return stock > 0 and is_low_stock(stock, days_until_empty), days_until_empty
+
+def times_per_day_sql(frequency):
+    """
+    Doses por dia ("Nx" da frequência) como expressão SQL, igual a
+    calculate_days_until_empty. NULL se a frequência não tem "Nx" (ou é 0x).
+    """
+    return func.nullif(cast(func.substring(func.lower(frequency), r"(\d+)x"), Integer), 0)
+
+def is_low_stock_sql(frequency, stock):
+    """A mesma regra de is_low_stock, em SQL, para filtrar no banco"""
+    times_per_day = times_per_day_sql(frequency)
+    return or_(
+        and_(times_per_day.is_(None), stock <= settings.LOW_STOCK_UNITS_THRESHOLD),
+        stock // times_per_day <= settings.LOW_STOCK_DAYS_THRESHOLD,
+    )
+
+def refill_boxes_sql(frequency, stock, pills_per_box):
+    """
+    Caixas sugeridas para cobrir SHOPPING_REFILL_TARGET_DAYS dias de uso,
+    descontando o estoque atual. Ao menos 1; 1 quando a frequência é desconhecida.
+    """
+    pills_per_box = func.greatest(pills_per_box, 1)
+    missing = times_per_day_sql(frequency) * settings.SHOPPING_REFILL_TARGET_DAYS - func.greatest(stock, 0)
+    return func.greatest(func.coalesce((missing + pills_per_box - 1) // pills_per_box, 1), 1)
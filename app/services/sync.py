@@ -0,0 +1,51 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import Session
+from app.db.sync import current_sync_version
+from app.models.sync import SyncTombstone
+
+def get_changes(
+    db: Session, model, entity: str, user_id: int, since: Optional[int]
+) -> Tuple[int, list, List[int]]:
+    """
+    Mudanças de `model` do usuário a partir do cursor `since`.
+    Retorna (novo cursor, linhas criadas/alteradas, ids excluídos).
+    Sem `since`, devolve a coleção inteira e nenhuma exclusão.
+    
+    O cursor é lido antes das consultas e o filtro usa >=: mudanças de
+    transações que ainda estavam abertas podem vir de novo na próxima
+    chamada (o cliente aplica como upsert), mas nunca se perdem.
+    """
+    version = current_sync_version(db)
+    query = db.query(model).filter(model.user_id == user_id)
+    if since is None:
+        return version, query.order_by(model.id).all(), []
+    
+    rows = query.filter(model.version >= since).order_by(model.version, model.id).all()
+    deleted = [
+        entity_id for (entity_id,) in db.query(SyncTombstone.entity_id).filter(
+            SyncTombstone.user_id == user_id,
+            SyncTombstone.entity == entity,
+            SyncTombstone.version >= since
+        )
+    ]
+    return version, rows, deleted
+
+def collection_version(db: Session, user_id: int, *models) -> tuple:
+    """
+    Versão das coleções do usuário em uma consulta (índice user_id + version):
+    quantidade de linhas e soma das versões de cada modelo. Toda gravação
+    troca a versão da linha por uma maior e exclusões mudam a quantidade,
+    então qualquer mudança muda o resultado, mesmo com commits fora de ordem
+    (o que não vale para max(version)).
+    """
+    subqueries = [
+        select(func.count(), func.coalesce(func.sum(model.version), 0)).where(model.user_id == user_id).subquery()
+        for model in models
+    ]
+    # Uma linha por subconsulta: o produto cartesiano é intencional
+    from_clause = subqueries[0]
+    for subquery in subqueries[1:]:
+        from_clause = from_clause.join(subquery, true())
+    statement = select(*[column for subquery in subqueries for column in subquery.c]).select_from(from_clause)
+    return tuple(db.execute(statement).one())
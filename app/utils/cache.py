@@ -0,0 +1,232 @@
+"""
+Cache de leitura por usuário para as listagens (medicamentos, notificações, lista de compras)
+
+As entradas são chaveadas por namespace, usuário, versão e parâmetros da consulta.
+Cada escrita nos services incrementa a versão do usuário naquele namespace
+(ao fim da transação): as entradas antigas deixam de ser encontradas e saem
+por LRU/TTL. O TTL também limita o atraso para escritas feitas em outro
+processo (worker separado) quando o backend é a memória local.
+
+O backend é plugável: MemoryBackend (padrão) guarda tudo neste processo; um
+backend compartilhado (ex.: store local usado por vários workers do uvicorn)
+implementa CacheBackend e é registrado com register_backend().
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.utils.metrics import registry
+
+# Namespaces invalidados pelos services
+MEDICATIONS = "medications"
+NOTIFICATIONS = "notifications"
+SHOPPING = "shopping"
+# "Usuário" da versão global de um namespace (invalidate_all)
+ALL_USERS = "*"
+PENDING_KEY = "read_cache_pending"
+
+read_cache_requests = registry.counter(
+    "read_cache_requests_total",
+    "Leituras do cache de listagens, por namespace e resultado (hit/miss)",
+    ["namespace", "result"]
+)
+read_cache_hit_ratio = registry.gauge(
+    "read_cache_hit_ratio",
+    "Fração de leituras do cache de listagens atendidas pelo cache",
+    ["namespace"]
+)
+
+class CacheBackend(ABC):
+    """
+    Interface dos backends. Valores são opacos (listas de dicts já serializáveis).
+    Versões não podem ser descartadas antes das entradas: uma versão que volta
+    a zero tornaria entradas antigas visíveis de novo.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        ...
+
+    @abstractmethod
+    def version(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def size(self) -> int:
+        """Número de entradas guardadas (para o gauge read_cache_entries)"""
+
+class MemoryBackend(CacheBackend):
+    """LRU com TTL neste processo; as versões ficam fora do LRU"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+_backends: Dict[str, Callable[[], CacheBackend]] = {
+    "memory": lambda: MemoryBackend(settings.READ_CACHE_MAX_ENTRIES),
+}
+
+def register_backend(name: str, factory: Callable[[], CacheBackend]):
+    """Registra um backend para READ_CACHE_BACKEND=<name> (registre antes do primeiro uso do cache)"""
+    _backends[name] = factory
+
+class ReadCache:
+    def __init__(self, backend_factory: Optional[Callable[[], CacheBackend]] = None):
+        self._backend_factory = backend_factory
+        self._backend: Optional[CacheBackend] = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def backend(self) -> CacheBackend:
+        # Criado no primeiro uso, para que register_backend() possa vir depois do import
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    factory = self._backend_factory or _backends[settings.READ_CACHE_BACKEND]
+                    self._backend = factory()
+        return self._backend
+
+    @staticmethod
+    def _version_key(namespace: str, user_id) -> str:
+        return f"v:{namespace}:{user_id}"
+
+    def _key(self, namespace: str, user_id: int, params: Hashable) -> str:
+        backend = self.backend
+        return ":".join((
+            namespace,
+            str(user_id),
+            str(backend.version(self._version_key(namespace, ALL_USERS))),
+            str(backend.version(self._version_key(namespace, user_id))),
+            repr(params),
+        ))
+
+    def _record(self, namespace: str, hit: bool):
+        result = "hit" if hit else "miss"
+        read_cache_requests.inc(namespace=namespace, result=result)
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {"hit": 0, "miss": 0})
+            stats[result] += 1
+            ratio = stats["hit"] / (stats["hit"] + stats["miss"])
+        read_cache_hit_ratio.set(ratio, namespace=namespace)
+
+    def get_or_load(self, namespace: str, user_id: int, params: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Devolve o valor em cache ou chama loader() e guarda o resultado.
+        O loader deve devolver dados serializáveis (dicts), não objetos ORM.
+        """
+        if not settings.READ_CACHE_ENABLED:
+            return loader()
+        # A chave (com a versão) é lida antes do loader: se uma escrita terminar
+        # durante a carga, o valor fica sob a versão antiga e nunca é servido
+        key = self._key(namespace, user_id, params)
+        value = self.backend.get(key)
+        self._record(namespace, value is not None)
+        if value is None:
+            value = loader()
+            self.backend.set(key, value, settings.READ_CACHE_TTL_SECONDS)
+        return value
+
+    def invalidate(self, db: Optional[Session], user_ids: Iterable, *namespaces: str):
+        """
+        Invalida os namespaces dos usuários quando a transação atual de `db`
+        terminar (commit ou rollback). Invalidar antes do commit deixaria outra
+        requisição guardar os dados antigos sob a versão nova.
+        """
+        pending = {(namespace, user_id) for namespace in namespaces for user_id in user_ids}
+        if db is None or not db.in_transaction():
+            self._apply(pending)
+            return
+        db.info.setdefault(PENDING_KEY, set()).update(pending)
+
+    def invalidate_all(self, db: Optional[Session], *namespaces: str):
+        """Invalida os namespaces para todos os usuários (ex.: job do worker)"""
+        self.invalidate(db, [ALL_USERS], *namespaces)
+
+    def _apply(self, pending: Set[Tuple[str, Any]]):
+        for namespace, user_id in pending:
+            self.backend.incr(self._version_key(namespace, user_id))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Acertos, faltas e taxa de acerto por namespace"""
+        with self._lock:
+            return {
+                namespace: {**counts, "hit_ratio": round(counts["hit"] / (counts["hit"] + counts["miss"]), 4)}
+                for namespace, counts in self._stats.items()
+            }
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._stats.clear()
+
+@event.listens_for(Session, "after_transaction_end")
+def _apply_pending_invalidations(session: Session, transaction):
+    # Só a transação externa: savepoints não confirmam nada sozinhos
+    if transaction.parent is not None:
+        return
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        read_cache._apply(pending)
+
+# Instância global do cache de listagens
+read_cache = ReadCache()
+read_cache_entries = registry.gauge(
+    "read_cache_entries",
+    "Entradas no cache de listagens",
+    callback=lambda: read_cache.backend.size()
+)
@@ -0,0 +1,40 @@
+"""
+ETags das listagens (GET /medication/, /notification/, /shopping/)
+
+A ETag sai da versão da coleção do usuário no banco (services.sync.collection_version),
+calculada antes de carregar as linhas: um If-None-Match igual responde 304 sem
+consultar nem serializar a listagem.
+"""
+
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+# Respostas por usuário: o cliente guarda, mas revalida sempre (If-None-Match)
+CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """ETag forte a partir das partes (namespace, usuário, versão, parâmetros)"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparação fraca do If-None-Match (RFC 9110): lista de ETags, W/ ou "*" """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def check_etag(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Responde 304 se o cliente já tem esta versão; senão anota a ETag na
+    resposta e devolve None (o endpoint segue e monta o corpo).
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,310 @@
+"""
+Métricas internas no formato texto do Prometheus
+Sem dependências externas: contadores, gauges e histogramas em memória
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric(ABC):
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera os labels {self.labelnames}, recebeu {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Linhas de amostra no formato de exposição do Prometheus"""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        if self._callback is not None:
+            return self._callback()
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            return [f"{self.name} {_format_value(self._callback())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco (também funciona com await dentro)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Conjunto de métricas de um processo"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrica {metric.name} já registrada")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto do Prometheus (versão 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Registro global do processo
+registry = MetricsRegistry()
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+worker_stage_duration = registry.histogram(
+    "worker_stage_duration_seconds",
+    "Duração de cada etapa do ciclo do worker de notificações",
+    DURATION_BUCKETS,
+    ["stage"]
+)
+worker_cycle_duration = registry.histogram(
+    "worker_cycle_duration_seconds",
+    "Duração de um ciclo completo do worker de notificações",
+    DURATION_BUCKETS
+)
+worker_notifications_claimed = registry.counter(
+    "worker_notifications_claimed_total",
+    "Notificações pendentes travadas pelo worker para envio"
+)
+worker_notifications_sent = registry.counter(
+    "worker_notifications_sent_total",
+    "Notificações marcadas como enviadas pelo worker"
+)
+worker_notifications_failed = registry.counter(
+    "worker_notifications_failed_total",
+    "Falhas de envio de notificações, por destino (retry ou dead_letter)",
+    ["outcome"]
+)
+worker_notifications_created = registry.counter(
+    "worker_notifications_created_total",
+    "Lembretes e alertas criados pelas varreduras do worker",
+    ["kind"]
+)
+notification_delivery_lag = registry.histogram(
+    "notification_delivery_lag_seconds",
+    "Atraso entre o horário agendado (ou a criação) e o envio da notificação",
+    LAG_BUCKETS
+)
+notification_queue_depth = registry.gauge(
+    "notification_queue_depth",
+    "Notificações por status",
+    ["status"]
+)
+websocket_messages = registry.counter(
+    "websocket_messages_total",
+    "Mensagens WebSocket por resultado (delivered, no_connection, failed)",
+    ["result"]
+)
+websocket_evictions = registry.counter(
+    "websocket_evictions_total",
+    "Conexões WebSocket encerradas pelo servidor, por motivo (dead, idle, limit, expired)",
+    ["reason"]
+)
+websocket_pings = registry.counter(
+    "websocket_pings_total",
+    "Pings de heartbeat enviados"
+)
+sse_evictions = registry.counter(
+    "sse_evictions_total",
+    "Streams SSE encerrados pelo servidor, por motivo (slow, limit, expired)",
+    ["reason"]
+)
+
+def observe_delivery_lag(sent_at: datetime, scheduled_for: Optional[datetime], created_at: Optional[datetime]):
+    """Registra o atraso de entrega (sent_at - scheduled_for, ou - created_at sem agendamento)"""
+    reference = scheduled_for or created_at
+    if reference is None or sent_at is None:
+        return
+    # Colunas com timezone voltam com tzinfo; os horários gerados no código são UTC sem tzinfo
+    if reference.tzinfo is not None:
+        reference = reference.astimezone(timezone.utc).replace(tzinfo=None)
+    if sent_at.tzinfo is not None:
+        sent_at = sent_at.astimezone(timezone.utc).replace(tzinfo=None)
+    notification_delivery_lag.observe(max(0.0, (sent_at - reference).total_seconds()))
+
+def set_queue_depth(counts: Dict[str, int], statuses: Sequence[str]):
+    """Atualiza o gauge de fila; status sem linhas ficam em zero"""
+    for status in statuses:
+        notification_queue_depth.set(counts.get(status, 0), status=status)
+
+async def _handle_metrics_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Descarta os cabeçalhos
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status_line, content_type, body = "200 OK", CONTENT_TYPE, registry.render().encode("utf-8")
+        else:
+            status_line, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status_line}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Erro ao responder /metrics: {str(e)}")
+    finally:
+        writer.close()
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """
+    Servidor HTTP mínimo que responde GET /metrics no loop atual.
+    Usado pelo worker, que roda fora do FastAPI.
+    """
+    server = await asyncio.start_server(_handle_metrics_request, host, port)
+    logger.info(f"Métricas do worker em http://{host}:{port}/metrics")
+    return server
@@ -1,25 +1,69 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
+import tracemalloc
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
+from app.core.clock import app_timezone, get_clock, to_local, to_utc
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.services.notification import NotificationService
+from app.services.medication import remove_empty_medications
+from app.services.shopping import refill_shopping_lists
 from app.models.notification import NotificationStatus, Notification
 from app.models.medication import Medication
-from app.schemas.notification import NotificationCreate, NotificationType
+from app.schemas.notification import NotificationType, SystemNotificationCreate
+from app.services.stock_policy import needs_low_stock_alert
+from app.utils import metrics
+from app.utils.cache import read_cache, NOTIFICATIONS
 from app.utils.websocket_manager import manager
+from app.utils.worker_coordination import ShardCoordinator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 logger = logging.getLogger(__name__)
 
+# Colunas carregadas em cada varredura (sem notes e demais campos não usados)
+REMINDER_COLUMNS = [
+    Medication.id, Medication.user_id, Medication.name, Medication.dosage, Medication.schedules
+]
+LOW_STOCK_COLUMNS = [
+    Medication.id, Medication.user_id, Medication.name, Medication.dosage,
+    Medication.frequency, Medication.stock, Medication.pills_per_box
+]
+
 class NotificationWorker:
     """
     Worker para processar notificações automaticamente
     Sistema interno com WebSockets para notificações em tempo real
     """
     
-    def __init__(self):
+    def __init__(self, clock=None):
+        # Sem relógio explícito usa o do processo (app.core.clock), que pode ser simulado
+        self._clock = clock
         self.running = False
+        self.last_low_stock_check = None
+        self.last_shopping_refill = None
+        self.last_cycle_memory = {}
+        self._coordinator: Optional[ShardCoordinator] = None
+        self.metrics_server = None
+        self._stop_event = None
+        self._task = None
+    
+    @property
+    def coordinator(self) -> ShardCoordinator:
+        # Criado no primeiro ciclo: a instância global nasce no import, antes das configurações
+        if self._coordinator is None:
+            self._coordinator = ShardCoordinator()
+        return self._coordinator
+    
+    @property
+    def clock(self):
+        return self._clock or get_clock()
     
     def get_db(self) -> Session:
         """Obtém uma sessão do banco de dados"""
@@ -30,171 +74,436 @@ class NotificationWorker:
             db.close()
             raise e
     
+    async def _run_db(self, function, *args):
+        """
+        Executa trabalho síncrono de banco em uma thread. No modo embutido o loop
+        é o mesmo da API, então consultas não podem bloqueá-lo.
+        """
+        return await asyncio.to_thread(function, *args)
+    
+    def _mark_sent(self, db: Session, notification: Notification):
+        # Cada notificação em um savepoint: uma linha com erro não
+        # invalida a transação do lote inteiro
+        with db.begin_nested():
+            notification.status = NotificationStatus.SENT
+            notification.sent_at = self.clock.now()
+            notification.next_attempt_at = None
+            db.flush()
+        read_cache.invalidate(db, [notification.user_id], NOTIFICATIONS)
+    
+    @staticmethod
+    def _record_failure(db: Session, notification: Notification, error: str):
+        # Agenda nova tentativa (backoff) ou move para DEAD_LETTER
+        with db.begin_nested():
+            NotificationService.record_delivery_failure(notification, error)
+        read_cache.invalidate(db, [notification.user_id], NOTIFICATIONS)
+    
+    async def _fail(self, db: Session, notification: Notification, error: str):
+        try:
+            await self._run_db(self._record_failure, db, notification, error)
+            metrics.worker_notifications_failed.inc(
+                outcome="dead_letter" if notification.status == NotificationStatus.DEAD_LETTER else "retry"
+            )
+        except Exception as record_error:
+            logger.error(f"Erro ao registrar falha da notificação {notification.id}: {str(record_error)}")
+    
+    async def _process_pending_batch(self, db: Session, after_id: int) -> list:
+        """
+        Trava (FOR UPDATE SKIP LOCKED) e envia um lote de notificações com id maior
+        que after_id, só dos usuários dos shards desta instância. O commit no final
+        grava o resultado do lote e solta as linhas. Retorna os ids do lote.
+        """
+        sent = []
+        pending_notifications = await self._run_db(lambda: NotificationService.get_pending_notifications(
+            db,
+            criteria=[*self.coordinator.user_filter(Notification.user_id), Notification.id > after_id],
+            limit=settings.WORKER_PENDING_BATCH_SIZE,
+            claim=True
+        ))
+        metrics.worker_notifications_claimed.inc(len(pending_notifications))
+        claimed_ids = [notification.id for notification in pending_notifications]
+        
+        for notification in pending_notifications:
+            try:
+                connected = manager.is_user_connected(notification.user_id)
+                delivered = await manager.send_notification(
+                    notification.user_id, manager.notification_payload(notification)
+                )
+                # Usuário sem conexão (e o worker separado, que não tem sockets) é o caso
+                # normal: a notificação é liberada e chega pela listagem e pela retomada.
+                # Backoff e dead letter só quando o envio para uma conexão aberta falhou
+                if connected and not delivered:
+                    await self._fail(db, notification, "Falha no envio para as conexões abertas")
+                    continue
+                
+                await self._run_db(self._mark_sent, db, notification)
+                sent.append((notification.sent_at, notification.scheduled_for, notification.created_at))
+                if delivered:
+                    logger.info(f"Notificação {notification.id} enviada via WebSocket: {notification.title}")
+                    
+            except Exception as e:
+                logger.error(f"Erro ao processar notificação {notification.id}: {str(e)}")
+                await self._fail(db, notification, str(e))
+        
+        await self._run_db(db.commit)
+        
+        # Métricas só depois do commit: até lá o envio ainda pode ser desfeito.
+        # Os horários foram copiados antes, pois o commit expira os objetos
+        metrics.worker_notifications_sent.inc(len(sent))
+        for sent_at, scheduled_for, created_at in sent:
+            metrics.observe_delivery_lag(sent_at, scheduled_for, created_at)
+        return claimed_ids
+    
     async def process_pending_notifications(self):
-        """Processa notificações pendentes"""
+        """
+        Processa notificações pendentes em lotes de WORKER_PENDING_BATCH_SIZE até
+        esvaziar a fila (lote incompleto) ou esgotar WORKER_PENDING_DRAIN_SECONDS.
+        Cada lote começa após o último id do anterior: uma linha que continua na
+        fila (ex.: erro ao registrar a falha) fica para o próximo ciclo em vez de
+        ser pega de novo.
+        """
         db = self.get_db()
+        deadline = asyncio.get_running_loop().time() + settings.WORKER_PENDING_DRAIN_SECONDS
+        after_id = 0
         try:
-            pending_notifications = NotificationService.get_pending_notifications(db)
-            
-            for notification in pending_notifications:
-                try:
-                    # Marca como enviada no banco
-                    success = NotificationService.mark_notification_as_sent(db, notification.id)
-                    
-                    if success:
-                        # Envia via WebSocket se o usuário estiver conectado
-                        notification_data = {
-                            "id": notification.id,
-                            "title": notification.title,
-                            "message": notification.message,
-                            "type": notification.notification_type.value,
-                            "medication_id": notification.medication_id,
-                            "created_at": notification.created_at.isoformat()
-                        }
-                        
-                        await manager.send_notification(notification.user_id, notification_data)
-                        logger.info(f"Notificação {notification.id} enviada via WebSocket: {notification.title}")
-                    else:
-                        logger.error(f"Erro ao processar notificação {notification.id}")
-                        
-                except Exception as e:
-                    logger.error(f"Erro ao processar notificação {notification.id}: {str(e)}")
-                    # Marca como falha
-                    notification.status = NotificationStatus.FAILED
-                    db.commit()
+            while True:
+                claimed_ids = await self._process_pending_batch(db, after_id)
+                if len(claimed_ids) < settings.WORKER_PENDING_BATCH_SIZE:
+                    break
+                if asyncio.get_running_loop().time() >= deadline:
+                    logger.warning("Tempo do ciclo esgotado com notificações pendentes na fila")
+                    break
+                after_id = claimed_ids[-1]
                     
         except Exception as e:
             logger.error(f"Erro ao processar notificações pendentes: {str(e)}")
         finally:
             db.close()
     
+    def _stream_medications(self, db: Session, columns: list, *criteria):
+        """
+        Lê medicamentos em blocos de WORKER_SCAN_CHUNK_SIZE com cursor no servidor
+        (yield_per), carregando só as colunas pedidas. Linhas de colunas não entram
+        no identity map, então a memória fica limitada a um bloco por vez.
+        
+        Use uma sessão só para a leitura: um commit na mesma conexão fecharia o cursor.
+        """
+        result = db.execute(
+            select(*columns).where(*criteria).execution_options(
+                yield_per=settings.WORKER_SCAN_CHUNK_SIZE
+            )
+        )
+        return result.partitions()
+    
+    async def _medication_chunks(self, db: Session, columns: list, *criteria):
+        """Blocos de _stream_medications, buscados fora do event loop"""
+        partitions = await self._run_db(self._stream_medications, db, columns, *criteria)
+        while (medications := await self._run_db(next, partitions, None)) is not None:
+            yield medications
+    
+    @staticmethod
+    def _reminder_slot(current_time: datetime, schedule: str) -> Optional[Tuple[datetime, date]]:
+        """
+        Lembrete de um horário ("HH:MM", no fuso APP_TIMEZONE) que já deve ser criado:
+        a partir de REMINDER_LEAD_MINUTES antes e até REMINDER_MAX_DELAY_MINUTES depois.
+        Retorna (horário em UTC, dia local do lembrete) ou None.
+        """
+        try:
+            hour, minute = (int(part) for part in schedule.split(":"))
+            scheduled_time = time(hour, minute)
+        except (TypeError, ValueError):
+            logger.debug(f"Horário de medicamento inválido: {schedule!r}")
+            return None
+        lead = timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+        delay = timedelta(minutes=settings.REMINDER_MAX_DELAY_MINUTES)
+        local_today = to_local(current_time).date()
+        # Perto da meia-noite local o horário pode ser o de ontem (atrasado) ou o de amanhã (antecedência)
+        for day in (local_today - timedelta(days=1), local_today, local_today + timedelta(days=1)):
+            slot = to_utc(datetime.combine(day, scheduled_time, app_timezone()))
+            if slot - lead <= current_time <= slot + delay:
+                return slot, day
+        return None
+    
     async def check_medication_schedules(self):
         """Verifica horários de medicamentos e cria lembretes"""
+        read_db = self.get_db()
         db = self.get_db()
         try:
-            # Busca todos os medicamentos ativos
-            medications = db.query(Medication).filter(Medication.stock > 0).all()
-            
-            current_time = datetime.utcnow()
+            current_time = self.clock.now()
+            created_count = 0
             
-            for medication in medications:
-                # Verifica se já existe notificação para este horário hoje
-                for schedule in medication.schedules:
-                    # Verifica se já foi criada notificação para este horário hoje
-                    existing_notification = db.query(Notification).filter(
-                        and_(
-                            Notification.medication_id == medication.id,
-                            Notification.notification_type == NotificationType.MEDICATION_REMINDER,
-                            Notification.created_at >= current_time.replace(hour=0, minute=0, second=0, microsecond=0)
-                        )
-                    ).first()
-                    
-                    if not existing_notification:
-                        # Cria nova notificação
-                        notification_data = NotificationCreate(
+            # Percorre os medicamentos ativos em blocos; cada bloco vira um INSERT e um envio em lote
+            async for medications in self._medication_chunks(
+                read_db,
+                REMINDER_COLUMNS,
+                Medication.stock > 0,
+                *self.coordinator.user_filter(Medication.user_id)
+            ):
+                reminders = []
+                messages = []
+                for medication in medications:
+                    # Um lembrete por medicamento, dia e horário, só quando o horário chega;
+                    # o banco descarta os que já existem
+                    for schedule in medication.schedules:
+                        reminder_slot = self._reminder_slot(current_time, schedule)
+                        if reminder_slot is None:
+                            continue
+                        slot, day = reminder_slot
+                        reminders.append(SystemNotificationCreate(
                             title=f"Lembrete: {medication.name}",
                             message=f"Horário de tomar {medication.name} - {medication.dosage}mg às {schedule}",
                             notification_type=NotificationType.MEDICATION_REMINDER,
                             user_id=medication.user_id,
                             medication_id=medication.id,
-                            scheduled_for=current_time + timedelta(minutes=5)  # 5 min no futuro
-                        )
-                        
-                        notification = NotificationService.create_notification(db, notification_data)
-                        
-                        # Envia lembrete via WebSocket se o usuário estiver conectado
-                        await manager.send_medication_reminder(
-                            medication.user_id, 
-                            medication.name, 
-                            f"{medication.dosage}mg", 
-                            schedule
-                        )
-                        
-                        logger.info(f"Criado e enviado lembrete para {medication.name} às {schedule}")
+                            scheduled_for=slot,
+                            dedup_key=NotificationService.reminder_dedup_key(medication.id, day, schedule)
+                        ))
+                        messages.append((
+                            medication.user_id,
+                            manager.medication_reminder_message(medication.name, f"{medication.dosage}mg", schedule)
+                        ))
+                
+                # INSERT ... ON CONFLICT DO NOTHING do bloco e envio, via WebSocket,
+                # apenas dos lembretes realmente criados
+                created = manager.attach_notification_ids(
+                    messages, await self._run_db(NotificationService.create_notifications, db, reminders)
+                )
+                await manager.send_batch(created)
+                created_count += len(created)
+            
+            metrics.worker_notifications_created.inc(created_count, kind="medication_reminder")
+            if created_count:
+                logger.info(f"Criados e enviados {created_count} lembretes de medicamentos")
                         
         except Exception as e:
             logger.error(f"Erro ao verificar horários de medicamentos: {str(e)}")
         finally:
+            read_db.close()
             db.close()
     
     async def check_low_stock(self):
-        """Verifica estoque baixo e cria alertas"""
+        """
+        Reconciliação diária de estoque baixo.
+        Os alertas são emitidos na hora pelo hook on_stock_changed; esta varredura
+        só relembra, uma vez por dia, os medicamentos que continuam com estoque baixo.
+        """
+        read_db = self.get_db()
         db = self.get_db()
         try:
-            # Busca medicamentos com estoque baixo
-            low_stock_medications = db.query(Medication).filter(Medication.stock <= 5).all()
+            today = self.clock.now().date()
+            created_count = 0
             
-            for medication in low_stock_medications:
-                # Verifica se já existe alerta recente (últimas 24h)
-                existing_alert = db.query(Notification).filter(
-                    and_(
-                        Notification.medication_id == medication.id,
-                        Notification.notification_type == NotificationType.LOW_STOCK_ALERT,
-                        Notification.created_at >= datetime.utcnow() - timedelta(days=1)
+            async for medications in self._medication_chunks(read_db, LOW_STOCK_COLUMNS, Medication.stock > 0):
+                alerts = []
+                messages = []
+                for medication in medications:
+                    needs_alert, days_until_empty = needs_low_stock_alert(
+                        medication.frequency, medication.stock, medication.pills_per_box
                     )
-                ).first()
+                    if not needs_alert:
+                        continue
+                    # Um alerta por medicamento por dia; o banco descarta os que já existem
+                    alerts.append(NotificationService.build_low_stock_alert(medication, days_until_empty, today))
+                    messages.append((
+                        medication.user_id,
+                        manager.low_stock_alert_message(medication.name, medication.stock)
+                    ))
                 
-                if not existing_alert:
-                    notification_data = NotificationCreate(
-                        title=f"Estoque Baixo: {medication.name}",
-                        message=f"O medicamento {medication.name} está com estoque baixo ({medication.stock} unidades restantes). Considere fazer reposição.",
-                        notification_type=NotificationType.LOW_STOCK_ALERT,
-                        user_id=medication.user_id,
-                        medication_id=medication.id
-                    )
-                    
-                    notification = NotificationService.create_notification(db, notification_data)
-                    
-                    # Envia alerta via WebSocket se o usuário estiver conectado
-                    await manager.send_low_stock_alert(
-                        medication.user_id, 
-                        medication.name, 
-                        medication.stock
-                    )
-                    
-                    logger.info(f"Criado e enviado alerta de estoque baixo para {medication.name}")
+                created = manager.attach_notification_ids(
+                    messages, await self._run_db(NotificationService.create_notifications, db, alerts)
+                )
+                await manager.send_batch(created)
+                created_count += len(created)
+            
+            metrics.worker_notifications_created.inc(created_count, kind="low_stock_alert")
+            if created_count:
+                logger.info(f"Criados e enviados {created_count} alertas de estoque baixo")
                     
         except Exception as e:
             logger.error(f"Erro ao verificar estoque baixo: {str(e)}")
         finally:
+            read_db.close()
             db.close()
     
-    async def run_worker(self, interval_seconds: int = 60):
-        """Executa o worker em loop"""
-        self.running = True
-        logger.info("Notification Worker iniciado (com WebSockets)")
-        
-        while self.running:
-            try:
-                # Processa notificações pendentes
+    async def remove_empty_medications(self):
+        """
+        Remove os medicamentos que zeraram (dos shards desta instância) e avisa os donos.
+        As leituras da API não fazem mais essa limpeza: a listagem só lê.
+        """
+        db = self.get_db()
+        try:
+            removed = await self._run_db(
+                remove_empty_medications, db, self.coordinator.user_filter(Medication.user_id)
+            )
+            if removed:
+                logger.info(f"Removidos {removed} medicamentos com estoque zerado")
+        except Exception as e:
+            logger.error(f"Erro ao remover medicamentos zerados: {str(e)}")
+        finally:
+            db.close()
+    
+    async def refill_shopping_lists(self):
+        """Sincroniza a lista de compras de todos os usuários com um único comando no banco"""
+        db = self.get_db()
+        try:
+            created, updated = await self._run_db(refill_shopping_lists, db)
+            if created or updated:
+                logger.info(f"Lista de compras: {created} itens criados e {updated} atualizados")
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar listas de compras: {str(e)}")
+        finally:
+            db.close()
+    
+    def update_queue_depth(self):
+        """Atualiza o gauge de notificações por status (uma consulta GROUP BY)"""
+        db = self.get_db()
+        try:
+            metrics.set_queue_depth(
+                NotificationService.count_by_status(db),
+                [status.value for status in NotificationStatus]
+            )
+        except Exception as e:
+            logger.error(f"Erro ao medir a fila de notificações: {str(e)}")
+        finally:
+            db.close()
+    
+    async def start_metrics_server(self):
+        """Expõe /metrics no formato Prometheus (WORKER_METRICS_PORT; 0 desativa)"""
+        if not settings.WORKER_METRICS_PORT or self.metrics_server is not None:
+            return
+        try:
+            self.metrics_server = await metrics.start_metrics_server(
+                settings.WORKER_METRICS_HOST, settings.WORKER_METRICS_PORT
+            )
+        except OSError as e:
+            logger.error(f"Não foi possível abrir o endpoint de métricas: {str(e)}")
+    
+    def _report_cycle_memory(self):
+        """Registra o pico de memória do ciclo (tracemalloc, se ativo) e o pico de RSS do processo"""
+        stats = {}
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            stats["peak_traced_bytes"] = peak
+        if resource is not None:
+            # ru_maxrss é em KB no Linux
+            stats["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.last_cycle_memory = stats
+        if stats:
+            logger.info(f"Memória do ciclo: {stats}")
+    
+    async def run_cycle(self):
+        """Executa um ciclo do worker (também usado pelo benchmark de replay)"""
+        with metrics.worker_cycle_duration.time():
+            # Atualiza os shards desta instância e a liderança
+            with metrics.worker_stage_duration.time(stage="rebalance"):
+                await self._run_db(self.coordinator.rebalance)
+            
+            # Medicamentos que zeraram (índice parcial de estoque zerado); os avisos
+            # criados aqui já saem no processamento logo abaixo
+            with metrics.worker_stage_duration.time(stage="remove_empty_medications"):
+                await self.remove_empty_medications()
+            
+            # Processa notificações pendentes
+            with metrics.worker_stage_duration.time(stage="process_pending_notifications"):
                 await self.process_pending_notifications()
-                
-                # Verifica horários de medicamentos (a cada 5 minutos)
-                if datetime.utcnow().minute % 5 == 0:
+            
+            # Verifica horários de medicamentos (a cada 5 minutos)
+            if self.running and self.clock.now().minute % 5 == 0:
+                with metrics.worker_stage_duration.time(stage="check_medication_schedules"):
                     await self.check_medication_schedules()
-                
-                # Verifica estoque baixo (a cada hora)
-                if datetime.utcnow().minute == 0:
+            
+            # Reconciliação de estoque baixo (uma vez por dia, só no líder);
+            # os alertas imediatos vêm do hook on_stock_changed
+            today = self.clock.now().date()
+            if self.running and self.coordinator.is_leader and self.last_low_stock_check != today:
+                with metrics.worker_stage_duration.time(stage="check_low_stock"):
                     await self.check_low_stock()
+                self.last_low_stock_check = today
+            
+            # Lista de compras: reposição automática (uma vez por dia, só no líder)
+            if (
+                self.running and settings.SHOPPING_AUTO_REFILL_ENABLED
+                and self.coordinator.is_leader and self.last_shopping_refill != today
+            ):
+                with metrics.worker_stage_duration.time(stage="refill_shopping_lists"):
+                    await self.refill_shopping_lists()
+                self.last_shopping_refill = today
+            
+            await self._run_db(self.update_queue_depth)
+        
+        self._report_cycle_memory()
+    
+    async def run_worker(self, interval_seconds: int = 60, serve_metrics: bool = True):
+        """
+        Executa o worker em loop.
+        serve_metrics=False quando embutido na API, que já expõe /metrics.
+        """
+        self.running = True
+        self._stop_event = asyncio.Event()
+        logger.info("Notification Worker iniciado (com WebSockets)")
+        if settings.WORKER_TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if serve_metrics:
+            await self.start_metrics_server()
+        
+        try:
+            while self.running:
+                try:
+                    await self.run_cycle()
+                except Exception as e:
+                    logger.error(f"Erro no worker: {str(e)}")
                 
-                # Aguarda próximo ciclo
-                await asyncio.sleep(interval_seconds)
-                
-            except Exception as e:
-                logger.error(f"Erro no worker: {str(e)}")
-                await asyncio.sleep(interval_seconds)
+                # Aguarda próximo ciclo (acorda na hora se o worker for parado)
+                await self.clock.sleep(interval_seconds, self._stop_event)
+        finally:
+            self.running = False
+            self.coordinator.release()
+            if self.metrics_server is not None:
+                self.metrics_server.close()
+                self.metrics_server = None
+            logger.info("Notification Worker parado")
+    
+    def start_background(self, interval_seconds: int = 60) -> asyncio.Task:
+        """Inicia o worker como tarefa no loop atual (modo embutido na API)"""
+        self._task = asyncio.create_task(
+            self.run_worker(interval_seconds, serve_metrics=False),
+            name="notification-worker"
+        )
+        return self._task
+    
+    async def shutdown(self, timeout: float = 30):
+        """
+        Para a tarefa em background: o ciclo atual termina (commit incluído)
+        e o worker sai; passado o timeout, a tarefa é cancelada.
+        """
+        if self._task is None:
+            return
+        self.stop_worker()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Notification Worker não terminou a tempo; cancelando")
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        finally:
+            self._task = None
     
     def stop_worker(self):
-        """Para o worker"""
+        """Para o worker (ao fim do ciclo atual)"""
         self.running = False
-        logger.info("Notification Worker parado")
+        if self._stop_event is not None:
+            self._stop_event.set()
 
 # Instância global do worker
 notification_worker = NotificationWorker()
 
 def start_notification_worker():
     """Função para iniciar o worker"""
-    asyncio.run(notification_worker.run_worker())
+    asyncio.run(notification_worker.run_worker(settings.WORKER_INTERVAL_SECONDS))
 
 def stop_notification_worker():
     """Função para parar o worker"""
@@ -0,0 +1,37 @@
+"""
+Classe de resposta JSON da API
+
+Com o orjson instalado (e FAST_JSON_ENABLED), as respostas são codificadas por ele;
+sem o pacote, vale o JSONResponse padrão (json da stdlib). A saída é a mesma: UTF-8
+compacto, sem escapar acentos.
+"""
+
+from typing import Any, Type
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # OPT_NON_STR_KEYS: chaves int (ex.: contagens por id) como no json da stdlib
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response_class() -> Type[JSONResponse]:
+    """Classe padrão do app: FastJSONResponse se o orjson estiver disponível e habilitado"""
+    if orjson is not None and settings.FAST_JSON_ENABLED:
+        return FastJSONResponse
+    return JSONResponse
+
+def cached_json_response(content: Any, response: Response) -> JSONResponse:
+    """
+    Resposta para dados já serializados pelo schema (cache de leitura): vai direto
+    para o encoder, sem nova validação pelo response_model. Mantém os cabeçalhos
+    definidos no `response` do endpoint (ETag, Cache-Control).
+    """
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return json_response_class()(content, headers=headers)
@@ -3,79 +3,509 @@ Gerenciador de WebSockets para notificações em tempo real
 Sistema gratuito e eficiente para notificações
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, List, Set
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+import anyio
 from fastapi import WebSocket, WebSocketDisconnect
-from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.clock import utcnow
+from app.core.config import settings
+from app.utils.metrics import registry, sse_evictions, websocket_evictions, websocket_messages, websocket_pings
 
 logger = logging.getLogger(__name__)
 
+# Códigos de fechamento enviados pelo servidor (faixa 4000-4999 é da aplicação)
+CLOSE_DEAD = 4000
+CLOSE_IDLE = 4001
+CLOSE_LIMIT = 4002
+CLOSE_TOKEN_EXPIRED = 4003
+
+# Tópico de avisos do sistema, que qualquer cliente pode assinar
+SYSTEM_TOPIC = "system"
+
+EPOCH = datetime(1970, 1, 1)
+
+# Envios aguardando o commit da sessão (ver ConnectionManager.after_commit)
+AFTER_COMMIT_KEY = "websocket_after_commit"
+
+def datetime_to_seq(value: datetime) -> int:
+    """Sequência baseada no horário (microssegundos UTC desde 1970)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def seq_to_datetime(seq: int) -> datetime:
+    """Horário (UTC sem tzinfo) correspondente a uma sequência"""
+    return EPOCH + timedelta(microseconds=seq)
+
+class ConnectionInfo:
+    """Estado de uma conexão; horários em time.monotonic()"""
+    
+    __slots__ = ("user_id", "connected_at", "last_seen", "last_activity", "pending", "expires_at", "topics")
+    
+    def __init__(self, user_id: int, resuming: bool = False, expires_at: Optional[float] = None):
+        now = time.monotonic()
+        self.user_id = user_id
+        # Expiração do token da conexão (epoch, segundos)
+        self.expires_at = expires_at
+        self.connected_at = now
+        # Qualquer frame do cliente (inclusive pong)
+        self.last_seen = now
+        # Mensagens do cliente que não são pong
+        self.last_activity = now
+        # Enquanto a retomada envia eventos antigos, os novos esperam aqui (mantém a ordem)
+        self.pending: Optional[List[str]] = [] if resuming else None
+        # Tópicos assinados, para a limpeza em disconnect()
+        self.topics: Set[str] = set()
+
+class StreamSubscriber:
+    """
+    Cliente de Server-Sent Events: recebe os mesmos eventos dos WebSockets
+    por uma fila limitada. Se a fila enche (cliente lento), a assinatura é
+    encerrada; o cliente reconecta com Last-Event-ID e recupera o que faltou.
+    """
+    
+    __slots__ = ("user_id", "queue", "closed")
+    
+    def __init__(self, user_id: int, size: int):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Optional[Tuple[int, str]]]" = asyncio.Queue(maxsize=size)
+        self.closed = False
+    
+    def offer(self, seq: int, text: str) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait((seq, text))
+            return True
+        except asyncio.QueueFull:
+            sse_evictions.inc(reason="slow")
+            self.close()
+            return False
+    
+    def close(self):
+        self.closed = True
+        try:
+            # Acorda o consumidor
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+class EventBuffer:
+    """
+    Últimos eventos enviados a um usuário, para retomada após reconexão.
+    `floor` é a maior sequência que não está mais no buffer: clientes com
+    last_seq >= floor podem ser atendidos só pela memória.
+    """
+    
+    __slots__ = ("events", "floor", "last_seq")
+    
+    def __init__(self, size: int, floor: int):
+        self.events: Deque[Tuple[int, dict]] = deque(maxlen=size)
+        self.floor = floor
+        self.last_seq = floor
+
 class ConnectionManager:
     """
     Gerencia conexões WebSocket para notificações em tempo real
+    
+    Registro indexado: conexões por usuário em dicts ordenados (conjunto com
+    ordem de chegada), socket -> usuário em connection_info e assinantes por
+    tópico em topics; conectar, desconectar e publicar custam O(1) por socket
+    afetado, sem varrer a tabela de conexões.
+    
+    Heartbeat: uma única tarefa envia {"type": "ping"} a cada
+    WS_HEARTBEAT_INTERVAL_SECONDS para todas as conexões; o cliente responde
+    {"type": "pong"}. Sockets sem nenhum frame há WS_HEARTBEAT_TIMEOUT_SECONDS
+    (conexões meio abertas de celulares) ou sem mensagens além do pong há
+    WS_IDLE_TIMEOUT_SECONDS são encerrados. Cada usuário pode ter até
+    WS_MAX_CONNECTIONS_PER_USER conexões; a mais antiga sai para a nova entrar.
     """
     
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.active_connections: Dict[int, Dict[WebSocket, None]] = {}
         self.all_connections: Set[WebSocket] = set()
+        self.connection_info: Dict[WebSocket, ConnectionInfo] = {}
+        self.topics: Dict[str, Set[WebSocket]] = {}
+        self.event_buffers: "OrderedDict[int, EventBuffer]" = OrderedDict()
+        # Eventos a partir daqui passam por record_event neste processo; sobe quando um buffer
+        # é descartado (LRU). Ver _memory_floor
+        self.floor_seq = datetime_to_seq(utcnow())
+        self.stream_subscribers: Dict[int, Dict[StreamSubscriber, None]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
     
-    async def connect(self, websocket: WebSocket, user_id: int):
-        """Conecta um usuário ao WebSocket"""
-        await websocket.accept()
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        resuming: bool = False,
+        subprotocol: Optional[str] = None,
+        expires_at: Optional[float] = None
+    ):
+        """
+        Conecta um usuário ao WebSocket.
+        Com resuming=True, chame resume() em seguida para enviar os eventos perdidos.
+        Com expires_at (expiração do token) a conexão é fechada quando o token expira.
+        """
+        await websocket.accept(subprotocol=subprotocol)
         
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
+        # Limite por usuário: encerra as conexões mais antigas
+        connections = self.active_connections.setdefault(user_id, {})
+        while len(connections) >= settings.WS_MAX_CONNECTIONS_PER_USER:
+            await self.evict(next(iter(connections)), "limit", CLOSE_LIMIT)
+            connections = self.active_connections.setdefault(user_id, {})
         
-        self.active_connections[user_id].append(websocket)
+        connections[websocket] = None
         self.all_connections.add(websocket)
+        self.connection_info[websocket] = ConnectionInfo(user_id, resuming, expires_at)
+        self._ensure_heartbeat()
         
         logger.info(f"Usuário {user_id} conectado. Total de conexões: {len(self.all_connections)}")
     
-    def disconnect(self, websocket: WebSocket, user_id: int):
-        """Desconecta um usuário do WebSocket"""
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            
-            # Remove lista vazia
-            if not self.active_connections[user_id]:
+    def _memory_floor(self, now_seq: int) -> int:
+        """
+        Floor de um buffer novo. Com o worker embutido, todo evento do processo passa
+        por record_event: usuário sem buffer não teve eventos desde floor_seq e a
+        retomada não precisa do banco. Com o worker em outro processo, os eventos
+        dele só existem no banco: a memória só cobre a partir de agora.
+        """
+        if settings.EMBEDDED_NOTIFICATION_WORKER:
+            return self.floor_seq
+        return now_seq - 1
+    
+    def record_event(self, user_id: int, message: dict) -> int:
+        """
+        Atribui a sequência do evento (monotônica por usuário, baseada no horário:
+        max(anterior + 1, agora em µs)) e guarda no buffer do usuário, mesmo sem
+        conexão aberta, para que uma reconexão possa recuperá-lo.
+        """
+        if "seq" in message:
+            return message["seq"]
+        now_seq = datetime_to_seq(utcnow())
+        buffer = self.event_buffers.get(user_id)
+        if buffer is None:
+            buffer = EventBuffer(settings.WS_RESUME_BUFFER_SIZE, floor=self._memory_floor(now_seq))
+            self.event_buffers[user_id] = buffer
+            while len(self.event_buffers) > settings.WS_RESUME_MAX_USERS:
+                _, evicted = self.event_buffers.popitem(last=False)
+                self.floor_seq = max(self.floor_seq, evicted.last_seq)
+        else:
+            self.event_buffers.move_to_end(user_id)
+        
+        seq = max(buffer.last_seq + 1, now_seq)
+        buffer.last_seq = seq
+        if len(buffer.events) == buffer.events.maxlen:
+            buffer.floor = buffer.events[0][0]
+        buffer.events.append((seq, message))
+        message["seq"] = seq
+        return seq
+    
+    def events_since(self, user_id: int, last_seq: int) -> Tuple[List[dict], bool]:
+        """Eventos em memória com seq > last_seq e se eles cobrem todo o intervalo"""
+        buffer = self.event_buffers.get(user_id)
+        if buffer is None:
+            return [], last_seq >= self._memory_floor(datetime_to_seq(utcnow()))
+        events = [message for seq, message in buffer.events if seq > last_seq]
+        return events, last_seq >= buffer.floor
+    
+    @staticmethod
+    def event_notification_id(message: dict) -> Optional[int]:
+        """
+        Id da notificação de um evento em memória: em "data" (notification,
+        lembretes e alertas do worker) ou em "notification" (new_notification)
+        """
+        data = message.get("data") or message.get("notification") or {}
+        return data.get("notification_id", data.get("id"))
+    
+    @staticmethod
+    def notification_payload(notification) -> dict:
+        """Dados de uma notificação do banco no formato enviado aos clientes"""
+        return {
+            "id": notification.id,
+            "title": notification.title,
+            "message": notification.message,
+            "type": notification.notification_type.value,
+            "medication_id": notification.medication_id,
+            "created_at": notification.created_at.isoformat()
+        }
+    
+    async def missed_events(
+        self,
+        user_id: int,
+        last_seq: int,
+        load_missed: Callable[[datetime], Awaitable[list]]
+    ) -> List[dict]:
+        """
+        Eventos que o cliente perdeu desde last_seq: da memória quando o buffer
+        cobre o intervalo; senão, as notificações gravadas no banco (load_missed
+        recebe o horário correspondente a last_seq) mais os eventos em memória
+        que não vieram do banco.
+        
+        Chame logo após registrar a conexão, sem await no meio: a foto do buffer
+        é tirada antes do primeiro await, e eventos posteriores vão para a fila
+        da conexão.
+        """
+        events, complete = self.events_since(user_id, last_seq)
+        if complete:
+            return events
+        
+        try:
+            missed = await load_missed(seq_to_datetime(last_seq))
+        except Exception as e:
+            # Sem o banco, envia ao menos o que está em memória
+            logger.error(f"Erro ao buscar notificações perdidas do usuário {user_id}: {str(e)}")
+            missed = []
+        
+        stored = []
+        for notification in missed:
+            message = self.notification_message(self.notification_payload(notification))
+            message["seq"] = datetime_to_seq(notification.created_at)
+            stored.append(message)
+        stored_ids = {message["data"]["id"] for message in stored}
+        return sorted(
+            stored + [
+                message for message in events
+                if self.event_notification_id(message) not in stored_ids
+            ],
+            key=lambda message: message["seq"]
+        )
+    
+    async def resume(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        last_seq: int,
+        load_missed: Callable[[datetime], Awaitable[list]]
+    ):
+        """
+        Envia ao socket os eventos perdidos desde last_seq (ver missed_events) e
+        depois os eventos novos que chegaram durante a retomada.
+        """
+        info = self.connection_info.get(websocket)
+        try:
+            for message in await self.missed_events(user_id, last_seq, load_missed):
+                await websocket.send_text(json.dumps(message))
+        except Exception as e:
+            logger.error(f"Erro ao retomar eventos do usuário {user_id}: {str(e)}")
+        finally:
+            while info is not None and info.pending:
+                try:
+                    await websocket.send_text(info.pending.pop(0))
+                except Exception:
+                    break
+            if info is not None:
+                info.pending = None
+    
+    def subscribe_stream(self, user_id: int) -> StreamSubscriber:
+        """Registra um cliente SSE; vale o mesmo limite de conexões por usuário dos WebSockets"""
+        subscribers = self.stream_subscribers.setdefault(user_id, {})
+        while len(subscribers) >= settings.WS_MAX_CONNECTIONS_PER_USER:
+            sse_evictions.inc(reason="limit")
+            oldest = next(iter(subscribers))
+            del subscribers[oldest]
+            oldest.close()
+        subscriber = StreamSubscriber(user_id, settings.SSE_QUEUE_SIZE)
+        subscribers[subscriber] = None
+        return subscriber
+    
+    def unsubscribe_stream(self, subscriber: StreamSubscriber):
+        subscriber.closed = True
+        subscribers = self.stream_subscribers.get(subscriber.user_id)
+        if subscribers is None:
+            return
+        subscribers.pop(subscriber, None)
+        if not subscribers:
+            del self.stream_subscribers[subscriber.user_id]
+    
+    def is_user_connected(self, user_id: int) -> bool:
+        """Usuário com WebSocket ou stream SSE aberto neste processo"""
+        return user_id in self.active_connections or user_id in self.stream_subscribers
+    
+    def record_message(self, websocket: WebSocket, data: str) -> Optional[dict]:
+        """Registra um frame recebido do cliente (pong ou mensagem); retorna o JSON, se for um objeto"""
+        info = self.connection_info.get(websocket)
+        if info is None:
+            return None
+        now = time.monotonic()
+        info.last_seen = now
+        try:
+            message = json.loads(data)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            message = None
+        if message is None or message.get("type") != "pong":
+            info.last_activity = now
+        return message
+    
+    async def evict(self, websocket: WebSocket, reason: str, code: int):
+        """Remove a conexão do registro e fecha o socket (ignorando erros de socket já morto)"""
+        info = self.connection_info.get(websocket)
+        if info is None:
+            return
+        websocket_evictions.inc(reason=reason)
+        self.disconnect(websocket, info.user_id)
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+        logger.info(f"Conexão do usuário {info.user_id} encerrada ({reason})")
+    
+    def _ensure_heartbeat(self):
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop(), name="websocket-heartbeat")
+    
+    async def _heartbeat_loop(self):
+        # Roda enquanto houver conexões; connect() reinicia quando necessário
+        while self.all_connections:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                await self.check_connections()
+            except Exception as e:
+                logger.error(f"Erro no heartbeat dos WebSockets: {str(e)}")
+    
+    async def check_connections(self):
+        """Encerra conexões mortas, ociosas ou com token expirado e envia ping para as demais"""
+        now = time.monotonic()
+        wall_now = time.time()
+        to_ping = []
+        for websocket, info in list(self.connection_info.items()):
+            if info.expires_at is not None and info.expires_at <= wall_now:
+                await self.evict(websocket, "expired", CLOSE_TOKEN_EXPIRED)
+            elif now - info.last_seen > settings.WS_HEARTBEAT_TIMEOUT_SECONDS:
+                await self.evict(websocket, "dead", CLOSE_DEAD)
+            elif settings.WS_IDLE_TIMEOUT_SECONDS and now - info.last_activity > settings.WS_IDLE_TIMEOUT_SECONDS:
+                await self.evict(websocket, "idle", CLOSE_IDLE)
+            else:
+                to_ping.append(websocket)
+        
+        ping = json.dumps({"type": "ping", "timestamp": utcnow().isoformat()})
+        
+        async def send_ping(websocket: WebSocket):
+            try:
+                await asyncio.wait_for(websocket.send_text(ping), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+                websocket_pings.inc()
+            except Exception:
+                await self.evict(websocket, "dead", CLOSE_DEAD)
+        
+        await asyncio.gather(*(send_ping(websocket) for websocket in to_ping))
+    
+    def disconnect(self, websocket: WebSocket, user_id: Optional[int] = None):
+        """Desconecta um socket do registro (o usuário vem do índice se não for informado)"""
+        info = self.connection_info.pop(websocket, None)
+        if info is not None:
+            user_id = info.user_id
+            for topic in info.topics:
+                self._remove_from_topic(websocket, topic)
+        
+        connections = self.active_connections.get(user_id)
+        if connections is not None:
+            connections.pop(websocket, None)
+            # Remove usuário sem conexões
+            if not connections:
                 del self.active_connections[user_id]
         
-        if websocket in self.all_connections:
-            self.all_connections.remove(websocket)
+        self.all_connections.discard(websocket)
         
         logger.info(f"Usuário {user_id} desconectado. Total de conexões: {len(self.all_connections)}")
     
-    async def send_personal_message(self, message: dict, user_id: int):
-        """Envia mensagem para um usuário específico"""
-        if user_id in self.active_connections:
-            disconnected_websockets = []
-            
-            for websocket in self.active_connections[user_id]:
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    logger.error(f"Erro ao enviar mensagem para usuário {user_id}: {str(e)}")
-                    disconnected_websockets.append(websocket)
-            
-            # Remove conexões que falharam
-            for websocket in disconnected_websockets:
-                self.disconnect(websocket, user_id)
-    
-    async def send_notification(self, user_id: int, notification_data: dict):
-        """Envia notificação para um usuário específico"""
-        message = {
+    async def send_personal_message(self, message: dict, user_id: int) -> bool:
+        """
+        Envia mensagem para um usuário específico. Retorna se alguma conexão
+        (WebSocket ou SSE) recebeu a mensagem; sem conexão ou com todos os
+        envios falhando, False (o evento fica no buffer para a retomada).
+        """
+        seq = self.record_event(user_id, message)
+        if not self.is_user_connected(user_id):
+            websocket_messages.inc(result="no_connection")
+            return False
+        
+        text = json.dumps(message)
+        delivered = False
+        
+        for subscriber in list(self.stream_subscribers.get(user_id, ())):
+            delivered = subscriber.offer(seq, text) or delivered
+        
+        websockets = []
+        for websocket in list(self.active_connections.get(user_id, ())):
+            info = self.connection_info.get(websocket)
+            if info is not None and info.pending is not None:
+                info.pending.append(text)
+                delivered = True
+            else:
+                websockets.append(websocket)
+        
+        # Com timeout: um socket meio aberto não trava quem envia (worker, endpoints)
+        if await self._send_to_sockets(websockets, text):
+            delivered = True
+        
+        websocket_messages.inc(result="delivered" if delivered else "failed")
+        return delivered
+    
+    async def send_batch(self, messages: List[Tuple[int, dict]]):
+        """
+        Envia um lote de mensagens (user_id, mensagem) de uma vez.
+        Mensagens de usuários sem conexão são descartadas antes de serializar,
+        e cada usuário recebe suas mensagens em ordem.
+        """
+        by_user: Dict[int, List[dict]] = {}
+        for user_id, message in messages:
+            if self.is_user_connected(user_id):
+                by_user.setdefault(user_id, []).append(message)
+            else:
+                # Sem conexão: só guarda para uma futura retomada
+                self.record_event(user_id, message)
+                websocket_messages.inc(result="no_connection")
+        
+        async def send_user_messages(user_id: int, user_messages: List[dict]):
+            for message in user_messages:
+                await self.send_personal_message(message, user_id)
+        
+        await asyncio.gather(*(
+            send_user_messages(user_id, user_messages)
+            for user_id, user_messages in by_user.items()
+        ))
+    
+    def send_batch_from_thread(self, messages: List[Tuple[int, dict]]):
+        """
+        Versão síncrona de send_batch para código rodando no threadpool do FastAPI
+        (endpoints síncronos). Fora desse contexto (scripts, worker) não envia nada:
+        as notificações pendentes são entregues pelo worker.
+        """
+        if not messages:
+            return
+        try:
+            anyio.from_thread.run(self.send_batch, messages)
+        except RuntimeError:
+            logger.debug("send_batch_from_thread chamado fora do threadpool; envio fica com o worker")
+    
+    @staticmethod
+    def attach_notification_ids(messages: List[Tuple[int, dict]], notification_ids: List[Optional[int]]) -> List[Tuple[int, dict]]:
+        """Associa os ids criados às mensagens e descarta as que eram duplicatas"""
+        created = []
+        for (user_id, message), notification_id in zip(messages, notification_ids):
+            if notification_id is not None:
+                message["data"]["notification_id"] = notification_id
+                created.append((user_id, message))
+        return created
+    
+    @staticmethod
+    def notification_message(notification_data: dict) -> dict:
+        return {
             "type": "notification",
             "data": notification_data,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utcnow().isoformat()
         }
-        
-        await self.send_personal_message(message, user_id)
     
-    async def send_medication_reminder(self, user_id: int, medication_name: str, dosage: str, time: str):
-        """Envia lembrete de medicamento"""
-        message = {
+    @staticmethod
+    def medication_reminder_message(medication_name: str, dosage: str, time: str) -> dict:
+        return {
             "type": "medication_reminder",
             "data": {
                 "medication_name": medication_name,
@@ -83,41 +513,137 @@ class ConnectionManager:
                 "time": time,
                 "message": f"Horário de tomar {medication_name} - {dosage} às {time}"
             },
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utcnow().isoformat()
         }
-        
-        await self.send_personal_message(message, user_id)
     
-    async def send_low_stock_alert(self, user_id: int, medication_name: str, stock_count: int):
-        """Envia alerta de estoque baixo"""
-        message = {
+    @staticmethod
+    def low_stock_alert_message(medication_name: str, stock_count: int) -> dict:
+        return {
             "type": "low_stock_alert",
             "data": {
                 "medication_name": medication_name,
                 "stock_count": stock_count,
                 "message": f"O medicamento {medication_name} está com estoque baixo ({stock_count} unidades restantes)"
             },
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": utcnow().isoformat()
         }
-        
-        await self.send_personal_message(message, user_id)
     
-    async def broadcast(self, message: dict):
-        """Envia mensagem para todos os usuários conectados"""
-        disconnected_websockets = []
-        
-        for websocket in self.all_connections:
+    async def send_notification(self, user_id: int, notification_data: dict) -> bool:
+        """Envia notificação para um usuário específico; retorna se foi entregue"""
+        return await self.send_personal_message(self.notification_message(notification_data), user_id)
+    
+    async def send_medication_reminder(self, user_id: int, medication_name: str, dosage: str, time: str) -> bool:
+        """Envia lembrete de medicamento"""
+        return await self.send_personal_message(
+            self.medication_reminder_message(medication_name, dosage, time), user_id
+        )
+    
+    async def send_low_stock_alert(self, user_id: int, medication_name: str, stock_count: int) -> bool:
+        """Envia alerta de estoque baixo"""
+        return await self.send_personal_message(
+            self.low_stock_alert_message(medication_name, stock_count), user_id
+        )
+    
+    async def _send_to_sockets(self, websockets, text: str) -> int:
+        """
+        Envia o mesmo texto a vários sockets em paralelo, cada um com
+        WS_SEND_TIMEOUT_SECONDS; os que falharem ou estourarem o tempo são
+        encerrados como mortos. Retorna quantos receberam.
+        """
+        async def send(websocket: WebSocket) -> bool:
             try:
-                await websocket.send_text(json.dumps(message))
+                await asyncio.wait_for(websocket.send_text(text), timeout=settings.WS_SEND_TIMEOUT_SECONDS)
+                return True
             except Exception as e:
-                logger.error(f"Erro ao enviar broadcast: {str(e)}")
-                disconnected_websockets.append(websocket)
+                logger.error(f"Erro ao enviar mensagem: {str(e) or type(e).__name__}")
+                await self.evict(websocket, "dead", CLOSE_DEAD)
+                return False
         
-        for websocket in disconnected_websockets:
-            for user_id, connections in self.active_connections.items():
-                if websocket in connections:
-                    self.disconnect(websocket, user_id)
-                    break
+        results = await asyncio.gather(*(send(websocket) for websocket in list(websockets)))
+        return sum(results)
+    
+    async def broadcast(self, message: dict):
+        """Envia mensagem para todos os usuários conectados"""
+        await self._send_to_sockets(self.all_connections, json.dumps(message))
+    
+    def _remove_from_topic(self, websocket: WebSocket, topic: str):
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self.topics[topic]
+    
+    def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """Inscreve o socket em um tópico (ex.: "medication:12", "system")"""
+        info = self.connection_info.get(websocket)
+        if info is None:
+            return False
+        if topic not in info.topics and len(info.topics) >= settings.WS_MAX_TOPICS_PER_CONNECTION:
+            return False
+        info.topics.add(topic)
+        self.topics.setdefault(topic, set()).add(websocket)
+        return True
+    
+    def unsubscribe(self, websocket: WebSocket, topic: str):
+        info = self.connection_info.get(websocket)
+        if info is not None:
+            info.topics.discard(topic)
+        self._remove_from_topic(websocket, topic)
+    
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self.topics
+    
+    async def publish(self, topic: str, message: dict) -> int:
+        """
+        Envia a mensagem só aos inscritos no tópico; retorna quantos sockets a
+        receberam. Mensagens de tópico não entram na retomada por seq.
+        """
+        subscribers = self.topics.get(topic)
+        if not subscribers:
+            return 0
+        return await self._send_to_sockets(subscribers, json.dumps({**message, "topic": topic}))
+    
+    async def publish_batch(self, messages: List[Tuple[str, dict]]):
+        """Publica vários (tópico, mensagem), ignorando tópicos sem inscritos"""
+        await asyncio.gather(*(
+            self.publish(topic, message) for topic, message in messages if topic in self.topics
+        ))
+    
+    @staticmethod
+    def after_commit(db: Session, send: Callable[[list], None], messages: list):
+        """
+        Chama send(messages) quando a transação atual de `db` for confirmada e
+        descarta em rollback: o cliente nunca vê um estado que não foi gravado.
+        Fora de transação, envia na hora.
+        """
+        if not messages:
+            return
+        if not db.in_transaction():
+            send(messages)
+            return
+        db.info.setdefault(AFTER_COMMIT_KEY, []).append((send, messages))
+    
+    def publish_batch_from_thread(self, messages: List[Tuple[str, dict]]):
+        """Versão síncrona de publish_batch para endpoints síncronos (ver send_batch_from_thread)"""
+        messages = [(topic, message) for topic, message in messages if topic in self.topics]
+        if not messages:
+            return
+        try:
+            anyio.from_thread.run(self.publish_batch, messages)
+        except RuntimeError:
+            logger.debug("publish_batch_from_thread chamado fora do threadpool; mensagens descartadas")
+    
+    @staticmethod
+    def medication_topic(medication_id: int) -> str:
+        return f"medication:{medication_id}"
+    
+    @staticmethod
+    def medication_stock_message(medication_id: int, stock: int) -> dict:
+        return {
+            "type": "medication_stock",
+            "data": {"medication_id": medication_id, "stock": stock},
+            "timestamp": utcnow().isoformat()
+        }
     
     def get_connection_count(self) -> int:
         """Retorna o número total de conexões ativas"""
@@ -130,4 +656,41 @@ class ConnectionManager:
         return 0
 
 # Instância global do gerenciador
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager()
+
+registry.gauge(
+    "websocket_connections",
+    "Conexões WebSocket abertas neste processo",
+    callback=manager.get_connection_count
+)
+registry.gauge(
+    "sse_streams",
+    "Streams Server-Sent Events abertos neste processo",
+    callback=lambda: sum(len(subscribers) for subscribers in manager.stream_subscribers.values())
+)
+registry.gauge(
+    "websocket_topics",
+    "Tópicos com ao menos um inscrito neste processo",
+    callback=lambda: len(manager.topics)
+)
+registry.gauge(
+    "websocket_connected_users",
+    "Usuários com ao menos uma conexão WebSocket neste processo",
+    callback=lambda: len(manager.active_connections)
+) 
+@event.listens_for(Session, "after_commit")
+def _send_after_commit(session: Session):
+    # Liberar um savepoint não confirma nada: espera o commit da transação externa
+    if session.in_nested_transaction():
+        return
+    for send, messages in session.info.pop(AFTER_COMMIT_KEY, ()):
+        try:
+            send(messages)
+        except Exception as e:
+            logger.error(f"Erro ao enviar mensagens após o commit: {str(e)}")
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction):
+    # Só a transação externa; o rollback de um savepoint não desfaz o resto
+    if previous_transaction.parent is None:
+        session.info.pop(AFTER_COMMIT_KEY, None)
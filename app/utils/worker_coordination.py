@@ -0,0 +1,142 @@
+"""
+Coordenação entre várias instâncias do worker de notificações
+Usuários são divididos em shards, distribuídos via advisory locks do Postgres
+"""
+
+import logging
+import math
+import random
+from typing import List, Optional, Set
+from sqlalchemy import false, text
+from sqlalchemy.engine import Connection
+from app.core.config import settings
+from app.db.session import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Classes dos advisory locks de dois inteiros (classid, objid)
+SHARD_LOCK_CLASS = 47101
+LEADER_LOCK_CLASS = 47102
+MEMBER_LOCK_CLASS = 47103
+
+HELD_LOCKS_SQL = """
+    SELECT objid FROM pg_locks
+    WHERE locktype = 'advisory' AND granted AND classid = :lock_class
+      AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+class ShardCoordinator:
+    """
+    Divide os usuários entre instâncias do worker.
+
+    - Cada usuário pertence ao shard user_id % WORKER_SHARD_COUNT.
+    - Uma instância é dona de um shard enquanto segura o advisory lock dele.
+      Os locks são de sessão, em uma conexão dedicada: se o processo morre,
+      a conexão cai e os shards ficam livres para as outras instâncias.
+    - Cada instância segura um lock compartilhado de "membro"; o número de
+      membros (via pg_locks) define a meta de ceil(shards / membros) por
+      instância. A cada ciclo a instância libera o excedente e pega shards
+      livres, então entrar ou sair uma instância rebalanceia sozinho.
+    - Quem segura o lock de líder executa as tarefas globais.
+
+    Com WORKER_SHARDING_ENABLED desligado a instância é dona de tudo e é a líder.
+    """
+
+    def __init__(self, shard_count: Optional[int] = None, enabled: Optional[bool] = None):
+        self.enabled = settings.WORKER_SHARDING_ENABLED if enabled is None else enabled
+        self.shard_count = shard_count or settings.WORKER_SHARD_COUNT
+        self._connection: Optional[Connection] = None
+        self._reset()
+
+    def _reset(self):
+        if self._connection is not None:
+            # Devolver a conexão ao pool não encerra a sessão no Postgres: sem o
+            # unlock, os locks continuariam presos a ela e os shards sem dono
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock_all()"))
+                self._connection.close()
+            except Exception:
+                # Conexão quebrada: sai do pool e a sessão no servidor cai com os locks
+                try:
+                    self._connection.invalidate()
+                except Exception:
+                    pass
+            self._connection = None
+        self.owned_shards: Set[int] = set() if self.enabled else set(range(self.shard_count))
+        self.is_leader = not self.enabled
+        self.member_count = 1
+
+    def _connect(self) -> Connection:
+        if self._connection is None or self._connection.closed or self._connection.invalidated:
+            self._reset()
+            self._connection = get_engine().connect().execution_options(isolation_level="AUTOCOMMIT")
+            self._connection.execute(
+                text("SELECT pg_advisory_lock_shared(:lock_class, 0)"),
+                {"lock_class": MEMBER_LOCK_CLASS}
+            )
+        return self._connection
+
+    def _held(self, connection: Connection, lock_class: int) -> List[int]:
+        return list(connection.execute(text(HELD_LOCKS_SQL), {"lock_class": lock_class}).scalars())
+
+    def _try_lock(self, connection: Connection, lock_class: int, key: int) -> bool:
+        return bool(connection.execute(
+            text("SELECT pg_try_advisory_lock(:lock_class, :key)"),
+            {"lock_class": lock_class, "key": key}
+        ).scalar())
+
+    def _unlock(self, connection: Connection, lock_class: int, key: int):
+        connection.execute(
+            text("SELECT pg_advisory_unlock(:lock_class, :key)"),
+            {"lock_class": lock_class, "key": key}
+        )
+
+    def rebalance(self):
+        """Atualiza a liderança e os shards desta instância; chamado no início de cada ciclo"""
+        if not self.enabled:
+            return
+        try:
+            connection = self._connect()
+            self.member_count = max(1, len(self._held(connection, MEMBER_LOCK_CLASS)))
+            target = math.ceil(self.shard_count / self.member_count)
+
+            # Libera o excedente (ex.: uma nova instância entrou)
+            excess = len(self.owned_shards) - target
+            for shard in sorted(self.owned_shards)[:max(0, excess)]:
+                self._unlock(connection, SHARD_LOCK_CLASS, shard)
+                self.owned_shards.discard(shard)
+
+            # Pega shards livres até a meta (ex.: uma instância saiu)
+            if len(self.owned_shards) < target:
+                taken = set(self._held(connection, SHARD_LOCK_CLASS))
+                free = [shard for shard in range(self.shard_count) if shard not in taken]
+                random.shuffle(free)
+                for shard in free:
+                    if len(self.owned_shards) >= target:
+                        break
+                    if self._try_lock(connection, SHARD_LOCK_CLASS, shard):
+                        self.owned_shards.add(shard)
+
+            if not self.is_leader:
+                self.is_leader = self._try_lock(connection, LEADER_LOCK_CLASS, 0)
+
+            logger.debug(
+                f"Shards: {len(self.owned_shards)}/{self.shard_count} "
+                f"(membros: {self.member_count}, líder: {self.is_leader})"
+            )
+        except Exception as e:
+            logger.error(f"Erro ao rebalancear shards: {str(e)}")
+            self._reset()
+
+    def user_filter(self, user_id_column) -> list:
+        """Critérios SQL que restringem uma consulta aos usuários dos shards desta instância"""
+        if not self.enabled:
+            return []
+        if not self.owned_shards:
+            return [false()]
+        return [(user_id_column % self.shard_count).in_(sorted(self.owned_shards))]
+
+    def release(self):
+        """Libera todos os shards e a liderança (ao parar o worker)"""
+        if self.enabled:
+            self._reset()
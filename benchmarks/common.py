@@ -0,0 +1,165 @@
+"""
+Utilitários compartilhados pelos benchmarks: dados sintéticos, percentis e
+contagem de consultas
+
+Os imports do app ficam dentro das funções: cada script define as variáveis de
+ambiente (DATABASE_URL etc.) antes de importar o app.
+"""
+
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SCHEDULE_SLOTS = [f"{hour:02d}:{minute:02d}" for hour in range(6, 23) for minute in (0, 30)]
+MEDICATION_NAMES = [
+    "Dipirona", "Paracetamol", "Losartana", "Metformina", "Omeprazol",
+    "Sinvastatina", "Amoxicilina", "Ibuprofeno", "Levotiroxina", "Atenolol",
+]
+INSERT_BATCH_SIZE = 1000
+
+def percentiles(values, digits: int = 6):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "total": round(sum(ordered), digits),
+        "p50": round(rank(0.50), digits),
+        "p95": round(rank(0.95), digits),
+        "p99": round(rank(0.99), digits),
+        "max": round(ordered[-1], digits),
+    }
+
+class QueryCounter:
+    """
+    Conta comandos SQL enviados ao banco (de qualquer thread). Com
+    exclude_savepoints, SAVEPOINT/RELEASE/ROLLBACK TO (de isolated_session) não contam.
+    """
+
+    SAVEPOINT_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+    def __init__(self, engine, exclude_savepoints: bool = False):
+        from sqlalchemy import event
+
+        self.total = 0
+        self.exclude_savepoints = exclude_savepoints
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        if self.exclude_savepoints and statement.startswith(self.SAVEPOINT_PREFIXES):
+            return
+        with self._lock:
+            self.total += 1
+
+@contextmanager
+def isolated_session(engine):
+    """
+    Sessão cujas escritas são desfeitas ao sair, inclusive as confirmadas com
+    db.commit() (que vira um savepoint): cada medição parte dos mesmos dados.
+    """
+    from sqlalchemy.orm import Session
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+def seed(db, tag: str, users: int, medications: int, rng: random.Random, stock_range=(0, 90)):
+    """Insere usuários e medicamentos sintéticos; retorna os ids dos usuários"""
+    from sqlalchemy import insert
+    from app.models.medication import Medication
+    from app.models.user import User
+
+    user_ids = []
+    for start in range(0, users, INSERT_BATCH_SIZE):
+        rows = [
+            {"username": f"{tag}-{index}", "email": f"{tag}-{index}@bench.local", "hashed_password": "!"}
+            for index in range(start, min(users, start + INSERT_BATCH_SIZE))
+        ]
+        user_ids.extend(db.execute(insert(User).returning(User.id), rows).scalars())
+
+    for start in range(0, medications, INSERT_BATCH_SIZE):
+        rows = []
+        for index in range(start, min(medications, start + INSERT_BATCH_SIZE)):
+            times_per_day = rng.choice((1, 1, 2, 2, 3))
+            rows.append({
+                "user_id": rng.choice(user_ids),
+                "name": f"{rng.choice(MEDICATION_NAMES)} {index}",
+                "dosage": rng.choice((5, 10, 20, 50, 500)),
+                "category": "Benchmark",
+                "frequency": f"{times_per_day}x ao dia",
+                "schedules": sorted(rng.sample(SCHEDULE_SLOTS, times_per_day)),
+                "stock": rng.randint(*stock_range),
+                "pills_per_box": 30,
+            })
+        db.execute(insert(Medication), rows)
+
+    db.commit()
+    return user_ids
+
+NOTIFICATION_TYPES = ["MEDICATION_REMINDER", "LOW_STOCK_ALERT", "MEDICATION_EXPIRY", "REFILL_REMINDER", "GENERAL"]
+NOTIFICATION_STATUSES = ["PENDING", "SENT", "READ", "SENT", "READ"]
+
+def seed_notifications(db, user_id: int, count: int, seed_value: int, distinct_medications: int = 200):
+    """
+    Insere `count` notificações para o usuário com um único INSERT ... SELECT
+    (generate_series), para chegar a milhões de linhas em segundos. Tipos,
+    status e medicamentos saem de uma sequência pseudoaleatória determinada
+    pela semente; created_at avança um minuto por notificação.
+    """
+    from sqlalchemy import text
+    from app.models.notification import Notification
+
+    columns = Notification.__table__.c
+    db.execute(text(f"""
+        INSERT INTO notifications (
+            title, message, notification_type, status, scheduled_for, sent_at,
+            created_at, attempts, user_id, medication_name, medication_dosage
+        )
+        SELECT
+            'Hora do medicamento: ' || name,
+            'Está na hora de tomar ' || name || '.',
+            (:types)[1 + (r % {len(NOTIFICATION_TYPES)})]::{columns.notification_type.type.name},
+            (:statuses)[1 + (r / 7 % {len(NOTIFICATION_STATUSES)})]::{columns.status.type.name},
+            at, at, at, 0, :user_id, name, (:dosages)[1 + (r / 35 % 5)]
+        FROM (
+            SELECT
+                i,
+                (i * 7919 + :seed * 104729) % 1000003 AS r,
+                :start + i * interval '1 minute' AS at,
+                (:names)[1 + (i * 31 + :seed) % {len(MEDICATION_NAMES)}] || ' ' || ((i * 17 + :seed) % :distinct) AS name
+            FROM generate_series(1::bigint, :count) AS i
+        ) AS rows
+    """), {
+        "types": NOTIFICATION_TYPES,
+        "statuses": NOTIFICATION_STATUSES,
+        "names": MEDICATION_NAMES,
+        "dosages": ["5", "10", "20", "50", "500"],
+        "user_id": user_id,
+        "seed": seed_value,
+        "distinct": distinct_medications,
+        "start": datetime(2024, 1, 1),
+        "count": count,
+    })
+    db.commit()
+
+def cleanup(db, user_ids):
+    from app.models.medication import Medication
+    from app.models.notification import Notification
+    from app.models.user import User
+
+    for model in (Notification, Medication):
+        db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.query(User).filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Codificação e compressão das respostas JSON das listagens
+
+Gera listas sintéticas no formato de GET /medication/, /notification/ e
+/shopping/ e mede, por endpoint e tamanho:
+
+- stdlib: caminho padrão do FastAPI (validação pelo response_model,
+  jsonable_encoder e json.dumps)
+- orjson: mesmo caminho com FastJSONResponse
+- orjson_cached: dados já serializados (cache de leitura) direto no encoder
+- bytes sem compressão, com gzip e com brotli (se instalado), o tempo de
+  compressão e a economia
+
+Não usa banco nem rede.
+
+    python -m benchmarks.encode_responses --sizes 10 100 1000 --repeat 50
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# O app lê as configurações no import; nada aqui abre conexão com o banco
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from benchmarks.common import MEDICATION_NAMES, SCHEDULE_SLOTS
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Codificação e compressão das respostas das listagens")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Itens por resposta")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetições de cada medição (vale a mediana)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    return parser.parse_args()
+
+def medication_rows(count: int, rng: random.Random):
+    rows = []
+    for index in range(count):
+        times_per_day = rng.choice((1, 2, 3))
+        stock = rng.randint(0, 90)
+        rows.append({
+            "id": index + 1,
+            "name": f"{rng.choice(MEDICATION_NAMES)} {index}",
+            "dosage": rng.choice((5, 10, 20, 50, 500)),
+            "category": "Benchmark",
+            "frequency": f"{times_per_day}x ao dia",
+            "schedules": sorted(rng.sample(SCHEDULE_SLOTS, times_per_day)),
+            "stock": stock,
+            "duration": None,
+            "notes": "Tomar após as refeições" if rng.random() < 0.3 else None,
+            "pills_per_box": 30,
+            "user_id": 1,
+            "created_at": datetime(2024, 1, 1).isoformat(),
+            "days_until_empty": stock // times_per_day,
+            "is_low_stock": stock // times_per_day <= 7,
+        })
+    return rows
+
+def notification_rows(count: int, rng: random.Random):
+    start = datetime(2024, 1, 1, 8, 0)
+    rows = []
+    for index in range(count):
+        name = rng.choice(MEDICATION_NAMES)
+        created_at = start + timedelta(minutes=30 * index)
+        rows.append({
+            "id": index + 1,
+            "title": f"Hora do medicamento: {name}",
+            "message": f"Está na hora de tomar {name} 500mg.",
+            "notification_type": "MEDICATION_REMINDER",
+            "status": rng.choice(("PENDING", "SENT", "READ")),
+            "scheduled_for": created_at.isoformat(),
+            "sent_at": created_at.isoformat(),
+            "read_at": None,
+            "created_at": created_at.isoformat(),
+            "medication_name": name,
+            "medication_dosage": "500",
+        })
+    return rows
+
+def shopping_rows(count: int, rng: random.Random):
+    return [
+        {
+            "id": index + 1,
+            "name": f"{rng.choice(MEDICATION_NAMES)} {index}",
+            "checked": rng.random() < 0.5,
+            "medication_id": index + 1 if rng.random() < 0.7 else None,
+            "suggested_boxes": rng.randint(1, 4),
+        }
+        for index in range(count)
+    ]
+
+def endpoints():
+    from typing import List
+    from app.schemas.medication import Medication
+    from app.schemas.notification import NotificationResponse
+    from app.schemas.shopping import ShoppingItemOut
+
+    return {
+        "GET /medication/": (List[Medication], medication_rows),
+        "GET /notification/": (List[NotificationResponse], notification_rows),
+        "GET /shopping/": (List[ShoppingItemOut], shopping_rows),
+    }
+
+def median_ms(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 4)
+
+def measure(schema, rows, repeat: int, settings):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from app.utils.responses import FastJSONResponse, orjson
+    from app.utils.compression import _Compressor, brotli
+
+    adapter = TypeAdapter(schema)
+
+    def full_path(response_class):
+        # O que o FastAPI faz com o retorno de um endpoint com response_model
+        return lambda: response_class(jsonable_encoder(adapter.validate_python(rows)))
+
+    body = JSONResponse(rows).body
+    result = {
+        "encode_ms": {"stdlib": median_ms(full_path(JSONResponse), repeat)},
+        "bytes": {"identity": len(body)},
+        "compress_ms": {},
+    }
+    if orjson is not None:
+        result["encode_ms"]["orjson"] = median_ms(full_path(FastJSONResponse), repeat)
+        result["encode_ms"]["orjson_cached"] = median_ms(lambda: FastJSONResponse(rows), repeat)
+        # Quanto o caminho do cache (sem revalidar) ganha sobre o padrão anterior
+        result["cached_speedup"] = round(result["encode_ms"]["stdlib"] / max(result["encode_ms"]["orjson_cached"], 1e-6), 1)
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        compress = lambda: _Compressor(
+            encoding, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY
+        ).compress(body, final=True)
+        compressed = compress()
+        if encoding == "gzip":
+            assert gzip.decompress(compressed) == body
+        result["bytes"][encoding] = len(compressed)
+        result["compress_ms"][encoding] = median_ms(compress, repeat)
+        result.setdefault("saved_percent", {})[encoding] = round(100 * (1 - len(compressed) / len(body)), 1)
+    result["compressed"] = len(body) >= settings.COMPRESSION_MINIMUM_SIZE
+    return result
+
+def main():
+    args = parse_args()
+    from app.core.config import settings
+    from app.utils.compression import brotli
+    from app.utils.responses import orjson
+
+    rng = random.Random(args.seed)
+    results = {}
+    for name, (schema, generator) in endpoints().items():
+        results[name] = {
+            str(size): measure(schema, generator(size, rng), args.repeat, settings)
+            for size in args.sizes
+        }
+
+    report = {
+        "config": {
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "gzip_level": settings.COMPRESSION_GZIP_LEVEL,
+            "brotli_quality": settings.COMPRESSION_BROTLI_QUALITY,
+            "minimum_size": settings.COMPRESSION_MINIMUM_SIZE,
+        },
+        "environment": {
+            "python": sys.version.split()[0],
+            "orjson": getattr(orjson, "__version__", None),
+            "brotli": getattr(brotli, "__version__", None) if brotli is not None else None,
+        },
+        "endpoints": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
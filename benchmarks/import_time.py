@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tempo de inicialização da API (cold start)
+
+Importa app.main em um subprocesso limpo com `python -X importtime` e mede:
+
+- tempo total do import de app.main (que não monta a API) e de create_app()
+- imports diretos mais caros pelo tempo acumulado (com dependências) e
+  módulos mais caros pelo tempo próprio
+- módulos do app (`app.*`) pelo tempo próprio
+- com --database-url, as etapas do aquecimento (app.core.warmup) e a
+  primeira e segunda requisição autenticadas a GET /medication/
+
+    python -m benchmarks.import_time --top 15 --output import.json
+    python -m benchmarks.import_time --database-url postgresql://localhost/farmacinha_bench
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Executado no subprocesso: imprime as medições em JSON na última linha do stdout
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+application = app.main.create_app()
+result = {
+    "import_ms": round((imported - started) * 1000, 1),
+    "create_app_ms": round((time.perf_counter() - imported) * 1000, 1),
+}
+if "--warmup" in sys.argv:
+    from fastapi.testclient import TestClient
+    from app.core.security import create_access_token
+    from app.core.warmup import warm_up
+    result["warmup_ms"] = warm_up()
+    client = TestClient(application)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "0"})}
+    for label in ("first_request_ms", "second_request_ms"):
+        requested = time.perf_counter()
+        client.get("/api/v1/medication/", headers=headers)
+        result[label] = round((time.perf_counter() - requested) * 1000, 1)
+print(json.dumps(result))
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tempo de import e aquecimento da API")
+    parser.add_argument("--top", type=int, default=15, help="Módulos listados em cada ranking")
+    parser.add_argument("--database-url", help="Banco para medir o aquecimento e as primeiras requisições")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: stdout)")
+    return parser.parse_args()
+
+def parse_importtime(stderr: str):
+    """Linhas `import time: self [us] | cumulative | imported package` -> lista de dicts (ms)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": round(int(self_us) / 1000, 2),
+            "cumulative_ms": round(int(cumulative_us) / 1000, 2),
+        })
+    return modules
+
+def run_probe(database_url):
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "benchmark")
+    # create_engine não conecta: sem --database-url, o banco não é usado
+    env["DATABASE_URL"] = database_url or env.get("DATABASE_URL", "postgresql://localhost/unused")
+    command = [sys.executable, "-X", "importtime", "-c", PROBE] + (["--warmup"] if database_url else [])
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), parse_importtime(completed.stderr)
+
+def main():
+    args = parse_args()
+    probe, modules = run_probe(args.database_url)
+    # Só os imports de primeiro nível somam o total sem contar nada duas vezes;
+    # o ranking acumulado lista o que eles importam diretamente (fastapi, app.api...)
+    top_level = [module for module in modules if module["depth"] == 0]
+    direct = [module for module in modules if module["depth"] == 1]
+    app_modules = [module for module in modules if module["module"].split(".")[0] == "app"]
+
+    report = {
+        "environment": {"python": sys.version.split()[0]},
+        **probe,
+        "importtime_total_ms": round(sum(module["cumulative_ms"] for module in top_level), 1),
+        "modules": len(modules),
+        "top_cumulative": sorted(direct, key=lambda module: module["cumulative_ms"], reverse=True)[:args.top],
+        "top_self": sorted(modules, key=lambda module: module["self_ms"], reverse=True)[:args.top],
+        "app_modules": sorted(app_modules, key=lambda module: module["self_ms"], reverse=True)[:args.top],
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ setup(
     name="minha_farmacinha",
     version="0.1.0",
     packages=find_packages(),
+    python_requires=">=3.10",
     install_requires=[
         "fastapi==0.104.1",
         "uvicorn==0.24.0",
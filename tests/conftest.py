@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+# Testes que usam o banco (fixture db) rodam com TEST_DATABASE_URL apontando para um
+# PostgreSQL descartável: as tabelas são recriadas na sessão e esvaziadas a cada teste.
+# Sem ela, esses testes são pulados e os demais não abrem conexão.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+# As configurações são lidas no primeiro uso
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("SECRET_KEY", "test")
+
+@pytest.fixture(scope="session")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL não definida")
+    from app.db.base_class import Base
+    from app.db.session import get_engine
+    from app.models import user, medication, shopping, notification, sync  # noqa: F401
+
+    engine = get_engine()
+    # Recria o schema: os triggers de delta sync só são criados junto com as tabelas
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy import text
+    from app.db.base_class import Base
+    from app.db.session import SessionLocal
+    from app.services.search import typeahead_cache
+    from app.utils.cache import read_cache
+
+    session = SessionLocal()
+    yield session
+    session.close()
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    read_cache.clear()
+    typeahead_cache.clear()
+
+@pytest.fixture
+def make_user(db):
+    """Cria usuários (commitados) e devolve o id"""
+    from app.models.user import User
+
+    def make(username: str = "maria") -> int:
+        user = User(username=username, email=f"{username}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        return user.id
+
+    return make
+
+@pytest.fixture
+def client_for(db):
+    """TestClient da API autenticado como o usuário (sem lifespan: nem warmup nem worker)"""
+    from fastapi.testclient import TestClient
+    from app.core.security import create_access_token
+    from app.main import create_app
+
+    app = create_app()
+
+    def make(user_id: int) -> TestClient:
+        token = create_access_token({"sub": str(user_id)})
+        return TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    return make
@@ -0,0 +1,117 @@
+"""Compressão negociada das respostas (CompressionMiddleware)"""
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.utils import compression
+from app.utils.compression import CompressionMiddleware, choose_encoding
+from app.utils.etag import etag_matches
+
+BODY = b'{"name": "Dipirona"}' * 100
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+@app.get("/large")
+def large():
+    return Response(BODY, media_type="application/json", headers={"ETag": '"v1"'})
+
+@app.get("/small")
+def small():
+    return Response(b"{}", media_type="application/json", headers={"ETag": '"v1"'})
+
+@app.get("/not-modified")
+def not_modified():
+    return Response(status_code=304, headers={"ETag": '"v1"'})
+
+@app.get("/encoded")
+def encoded():
+    return Response(BODY, media_type="application/json", headers={"Content-Encoding": "identity"})
+
+@app.get("/export")
+def export():
+    return StreamingResponse(iter([BODY, BODY]), media_type="application/x-ndjson")
+
+@app.get("/events")
+def events():
+    return StreamingResponse(iter([b"data: 1\n\n" * 100]), media_type="text/event-stream")
+
+client = TestClient(app)
+
+# brotli é opcional: sem ele, só gzip
+requires_brotli = pytest.mark.skipif(compression.brotli is None, reason="brotli não instalado")
+
+def get(path: str, accept_encoding: str = "gzip, br"):
+    return client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    pytest.param("gzip, br", "br", marks=requires_brotli),
+    ("br;q=0.5, gzip", "gzip"),
+    pytest.param("*", "br", marks=requires_brotli),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_encoding_negotiation(accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+def test_without_brotli_only_gzip_is_offered(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip;q=0.1") == "gzip"
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("gzip", "gzip"),
+    pytest.param("br", "br", marks=requires_brotli),
+])
+def test_large_response_is_compressed(accept_encoding, encoding):
+    response = get("/large", accept_encoding)
+
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    # httpx descomprime: o corpo é o original
+    assert response.content == BODY
+
+def test_compressed_response_gets_a_weak_etag():
+    assert get("/large").headers["etag"] == 'W/"v1"'
+    assert get("/large", "identity").headers["etag"] == '"v1"'
+    # A revalidação com a ETag fraca ainda casa com a forte do endpoint
+    assert etag_matches('W/"v1"', '"v1"')
+
+def test_small_response_passes_through():
+    response = get("/small")
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+    assert response.content == b"{}"
+
+def test_not_modified_passes_through():
+    response = get("/not-modified")
+
+    assert response.status_code == 304
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+def test_already_encoded_response_passes_through():
+    response = get("/encoded")
+
+    assert response.headers["content-encoding"] == "identity"
+    assert response.content == BODY
+
+def test_event_stream_passes_through():
+    response = get("/events")
+
+    assert "content-encoding" not in response.headers
+    assert response.text.startswith("data: 1\n\n")
+
+def test_stream_is_compressed_per_chunk():
+    response = get("/export", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == BODY * 2
@@ -0,0 +1,91 @@
+"""Delta sync: cursor (?since=), linhas alteradas e tombstones das exclusões"""
+
+from app.db.session import SessionLocal
+from app.models.medication import Medication
+from app.models.shopping import ShoppingItem
+from app.schemas.shopping import ShoppingItemCreate
+from app.services.shopping import (
+    create_shopping_item, delete_shopping_item, get_shopping_changes, update_shopping_item
+)
+from app.services.sync import get_changes
+
+def add_item(db, user_id: int, name: str) -> int:
+    return create_shopping_item(db, ShoppingItemCreate(name=name), user_id).id
+
+def test_without_cursor_returns_everything(db, make_user):
+    user_id = make_user()
+    first, second = add_item(db, user_id, "Dipirona"), add_item(db, user_id, "Losartana")
+    delete_shopping_item(db, first, user_id)
+
+    version, upserts, deleted = get_shopping_changes(db, user_id, None)
+
+    assert version > 0
+    assert [item.id for item in upserts] == [second]
+    assert deleted == []
+
+def test_changes_since_cursor(db, make_user):
+    user_id = make_user()
+    unchanged, updated, removed = (add_item(db, user_id, name) for name in ("Dipirona", "Losartana", "Insulina"))
+    cursor, _, _ = get_shopping_changes(db, user_id, None)
+    db.commit()
+
+    update_shopping_item(db, updated, user_id, True)
+    delete_shopping_item(db, removed, user_id)
+    created = add_item(db, user_id, "Omeprazol")
+    version, upserts, deleted = get_shopping_changes(db, user_id, cursor)
+    db.commit()
+
+    assert version >= cursor
+    assert {item.id for item in upserts} == {updated, created}
+    assert unchanged not in {item.id for item in upserts}
+    assert deleted == [removed]
+
+def test_changes_are_scoped_by_user_and_entity(db, make_user):
+    owner, other = make_user("maria"), make_user("joao")
+    cursor, _, _ = get_shopping_changes(db, owner, None)
+    db.commit()
+
+    delete_shopping_item(db, add_item(db, other, "Dipirona"), other)
+    medication = Medication(
+        name="Dipirona", dosage=500, category="comprimido", frequency="diária",
+        schedules=["08:00"], stock=0, user_id=owner
+    )
+    db.add(medication)
+    db.commit()
+    db.delete(medication)
+    db.commit()
+
+    assert get_shopping_changes(db, owner, cursor)[1:] == ([], [])
+    assert get_changes(db, Medication, "medication", owner, cursor)[2] == [medication.id]
+
+def test_write_in_flight_at_the_cursor_is_returned_later(db, make_user):
+    user_id = make_user()
+    writer = SessionLocal()
+    try:
+        item = ShoppingItem(name="Dipirona", checked=False, user_id=user_id)
+        writer.add(item)
+        writer.flush()
+        # O cursor é lido com a escrita ainda aberta...
+        cursor, upserts, _ = get_shopping_changes(db, user_id, None)
+        db.commit()
+        assert upserts == []
+        writer.commit()
+    finally:
+        writer.close()
+
+    # ...e a próxima chamada ainda a devolve
+    assert [row.name for row in get_shopping_changes(db, user_id, cursor)[1]] == ["Dipirona"]
+
+def test_changes_endpoints(db, make_user, client_for):
+    user_id = make_user()
+    client = client_for(user_id)
+    item_id = add_item(db, user_id, "Dipirona")
+
+    first = client.get("/api/v1/shopping/changes").json()
+    delete_shopping_item(db, item_id, user_id)
+    second = client.get("/api/v1/shopping/changes", params={"since": first["version"]}).json()
+
+    assert [item["id"] for item in first["upserts"]] == [item_id]
+    assert second["upserts"] == [] and second["deleted"] == [item_id]
+    assert client.get("/api/v1/medication/changes").json()["upserts"] == []
+    assert client.get("/api/v1/shopping/changes", params={"since": -1}).status_code == 422
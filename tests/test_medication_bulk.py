@@ -0,0 +1,50 @@
+"""Leitura dos arquivos de importação (CSV e NDJSON) a partir do upload"""
+
+import tempfile
+
+import pytest
+
+from app.services.medication_bulk import iter_csv_rows, iter_ndjson_rows
+
+@pytest.fixture
+def upload():
+    # Mesmo tipo de arquivo que o Starlette entrega em UploadFile.file
+    files = []
+
+    def make(content: bytes):
+        file = tempfile.SpooledTemporaryFile()
+        file.write(content)
+        file.seek(0)
+        files.append(file)
+        return file
+
+    yield make
+    for file in files:
+        file.close()
+
+def test_csv_rows_from_upload_with_bom_and_multiline_notes(upload):
+    rows = list(iter_csv_rows(upload(
+        "﻿name,dosage,schedules,duration,notes\r\n"
+        "Dipirona,500,08:00; 20:00,,\"tomar\r\ncom água\"\r\n"
+        "Losartana,50,08:00,30,\r\n".encode("utf-8")
+    )))
+
+    assert [row_number for row_number, _, _ in rows] == [3, 4]
+    first, second = rows[0][1], rows[1][1]
+    assert first["name"] == "Dipirona"
+    assert first["schedules"] == ["08:00", "20:00"]
+    assert first["duration"] is None
+    assert first["notes"] == "tomar\r\ncom água"
+    assert second["duration"] == "30"
+    assert second["notes"] is None
+
+def test_ndjson_rows_report_invalid_lines(upload):
+    rows = list(iter_ndjson_rows(upload(b'\n{"name": "Dipirona"}\nnao json\n[1]\n')))
+
+    assert rows[0] == (2, {"name": "Dipirona"}, None)
+    assert rows[1][0] == 3 and rows[1][2].startswith("JSON inválido")
+    assert rows[2] == (4, None, "Cada linha deve ser um objeto JSON")
+
+def test_invalid_utf8_raises_decode_error(upload):
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_csv_rows(upload(b"name,dosage\n\xff,1\n")))
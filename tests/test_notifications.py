@@ -0,0 +1,92 @@
+"""Criação de notificações em lote (NotificationService.create_notifications) e dedup_key"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from app.db.session import SessionLocal
+from app.models.notification import Notification
+from app.schemas.notification import NotificationCreate, NotificationType, SystemNotificationCreate
+from app.services.notification import NotificationService
+
+def notification(user_id: int, title: str) -> NotificationCreate:
+    return NotificationCreate(
+        title=title, message=f"{title}.", notification_type=NotificationType.GENERAL, user_id=user_id
+    )
+
+def reminder(user_id: int, title: str, medication_id: int = 1) -> SystemNotificationCreate:
+    return SystemNotificationCreate(
+        title=title, message=f"{title}.", notification_type=NotificationType.MEDICATION_REMINDER, user_id=user_id,
+        dedup_key=NotificationService.reminder_dedup_key(medication_id, date(2024, 1, 1), "08:00")
+    )
+
+def titles(db) -> dict:
+    db.expire_all()
+    return {row.id: row.title for row in db.query(Notification)}
+
+def test_ids_follow_the_input_order(db, make_user):
+    first, second = make_user("maria"), make_user("joao")
+
+    ids = NotificationService.create_notifications(db, [
+        notification(first, "A"), notification(second, "B"), notification(first, "C")
+    ])
+
+    assert len(set(ids)) == 3
+    assert [titles(db)[notification_id] for notification_id in ids] == ["A", "B", "C"]
+
+def test_empty_batch_creates_nothing(db):
+    assert NotificationService.create_notifications(db, []) == []
+
+def test_without_commit_the_caller_owns_the_transaction(db, make_user):
+    user_id = make_user()
+
+    ids = NotificationService.create_notifications(db, [notification(user_id, "A")], commit=False)
+    assert db.in_transaction()
+    db.rollback()
+
+    assert ids[0] is not None
+    assert titles(db) == {}
+
+def test_repeated_dedup_key_is_skipped(db, make_user):
+    user_id = make_user()
+    existing = NotificationService.create_notifications(db, [reminder(user_id, "A")])
+
+    ids = NotificationService.create_notifications(db, [
+        reminder(user_id, "B"), reminder(user_id, "C", medication_id=2), reminder(user_id, "D", medication_id=2)
+    ])
+
+    assert ids[0] is None and ids[1] is not None and ids[2] is None
+    assert sorted(titles(db).values()) == ["A", "C"]
+    assert existing[0] in titles(db)
+
+def test_dedup_key_is_scoped_per_user(db, make_user):
+    first, second = make_user("maria"), make_user("joao")
+
+    ids = NotificationService.create_notifications(db, [reminder(first, "A"), reminder(second, "B")])
+
+    assert None not in ids
+    assert sorted(titles(db).values()) == ["A", "B"]
+
+def test_notifications_without_key_are_never_deduplicated(db, make_user):
+    user_id = make_user()
+
+    ids = NotificationService.create_notifications(db, [notification(user_id, "A"), notification(user_id, "A")])
+
+    assert None not in ids and ids[0] != ids[1]
+
+def test_concurrent_workers_create_the_key_once(db, make_user):
+    user_id = make_user()
+    other = SessionLocal()
+    try:
+        first = NotificationService.create_notifications(db, [reminder(user_id, "A")], commit=False)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            second = executor.submit(NotificationService.create_notifications, other, [reminder(user_id, "B")])
+            # O INSERT do outro worker espera a transação que já gravou a chave
+            time.sleep(0.2)
+            assert not second.done()
+            db.commit()
+            assert second.result(timeout=5) == [None]
+    finally:
+        other.close()
+
+    assert list(titles(db).items()) == [(first[0], "A")]
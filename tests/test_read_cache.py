@@ -0,0 +1,108 @@
+"""Cache de leitura das listagens: acertos/faltas e invalidação no fim da transação"""
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.shopping import ShoppingItemCreate
+from app.services.shopping import create_shopping_item
+from app.utils.cache import MEDICATIONS, SHOPPING, MemoryBackend, ReadCache, read_cache
+
+USER_ID = 1
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [{"call": self.calls}]
+
+@pytest.fixture
+def cache():
+    return ReadCache(lambda: MemoryBackend(max_entries=2))
+
+def test_second_read_is_a_hit(cache):
+    loader = Loader()
+
+    assert cache.get_or_load(SHOPPING, USER_ID, ("etag",), loader) == [{"call": 1}]
+    assert cache.get_or_load(SHOPPING, USER_ID, ("etag",), loader) == [{"call": 1}]
+    assert cache.get_or_load(SHOPPING, USER_ID, ("other",), loader) == [{"call": 2}]
+
+    assert cache.stats() == {SHOPPING: {"hit": 1, "miss": 2, "hit_ratio": 0.3333}}
+
+def test_invalidation_is_per_user_and_namespace(cache):
+    loader = Loader()
+    for namespace, user_id in ((SHOPPING, 1), (SHOPPING, 2)):
+        cache.get_or_load(namespace, user_id, (), loader)
+
+    cache.invalidate(None, [1], SHOPPING, MEDICATIONS)
+
+    assert cache.get_or_load(SHOPPING, 1, (), loader) == [{"call": 3}]
+    assert cache.get_or_load(SHOPPING, 2, (), loader) == [{"call": 2}]
+
+def test_invalidate_all_reaches_every_user(cache):
+    loader = Loader()
+    cache.get_or_load(SHOPPING, USER_ID, (), loader)
+
+    cache.invalidate_all(None, SHOPPING)
+
+    assert cache.get_or_load(SHOPPING, USER_ID, (), loader) == [{"call": 2}]
+
+def test_disabled_cache_always_loads(cache, monkeypatch):
+    monkeypatch.setattr(settings, "READ_CACHE_ENABLED", False)
+    loader = Loader()
+
+    cache.get_or_load(SHOPPING, USER_ID, (), loader)
+    cache.get_or_load(SHOPPING, USER_ID, (), loader)
+
+    assert loader.calls == 2
+    assert cache.stats() == {}
+
+def test_memory_backend_evicts_least_recent_and_expired():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, 60)
+    backend.set("b", 2, 60)
+    backend.get("a")
+    backend.set("c", 3, 60)
+    backend.set("expired", 4, 0)
+
+    assert backend.get("b") is None
+    assert backend.get("expired") is None
+    assert backend.get("c") == 3
+    assert backend.size() == 1
+
+def test_invalidation_waits_for_commit(db, make_user):
+    user_id = make_user()
+    loader = Loader()
+    read_cache.get_or_load(SHOPPING, user_id, (), loader)
+
+    db.connection()
+    read_cache.invalidate(db, [user_id], SHOPPING)
+    # Ainda dentro da transação: outra requisição continua vendo a entrada antiga
+    assert read_cache.get_or_load(SHOPPING, user_id, (), loader) == [{"call": 1}]
+
+    db.commit()
+    assert read_cache.get_or_load(SHOPPING, user_id, (), loader) == [{"call": 2}]
+
+def test_invalidation_applies_on_rollback_but_not_on_savepoint(db, make_user):
+    user_id = make_user()
+    loader = Loader()
+    read_cache.get_or_load(SHOPPING, user_id, (), loader)
+
+    savepoint = db.begin_nested()
+    read_cache.invalidate(db, [user_id], SHOPPING)
+    savepoint.commit()
+    assert read_cache.get_or_load(SHOPPING, user_id, (), loader) == [{"call": 1}]
+
+    db.rollback()
+    assert read_cache.get_or_load(SHOPPING, user_id, (), loader) == [{"call": 2}]
+
+def test_listing_reflects_writes(db, make_user, client_for):
+    user_id = make_user()
+    client = client_for(user_id)
+
+    assert client.get("/api/v1/shopping/").json() == []
+    create_shopping_item(db, ShoppingItemCreate(name="Dipirona"), user_id)
+
+    assert [item["name"] for item in client.get("/api/v1/shopping/").json()] == ["Dipirona"]
+    assert read_cache.stats()[SHOPPING]["miss"] == 2
@@ -0,0 +1,46 @@
+"""Horários dos lembretes: "HH:MM" no fuso da aplicação, comparados com o relógio em UTC"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.core.clock import to_local, to_utc
+from app.core.config import settings
+from app.utils.notification_worker import NotificationWorker
+
+slot = NotificationWorker._reminder_slot
+
+@pytest.fixture(autouse=True)
+def sao_paulo(monkeypatch):
+    monkeypatch.setattr(settings, "APP_TIMEZONE", "America/Sao_Paulo")
+    monkeypatch.setattr(settings, "REMINDER_LEAD_MINUTES", 5)
+    monkeypatch.setattr(settings, "REMINDER_MAX_DELAY_MINUTES", 60)
+
+def test_conversion_between_utc_and_local():
+    local = to_local(datetime(2024, 1, 1, 11, 0))
+
+    assert (local.hour, local.minute) == (8, 0)
+    assert to_utc(local) == datetime(2024, 1, 1, 11, 0)
+
+def test_schedule_is_local_time():
+    # 08:00 em São Paulo (UTC-3) são 11:00 UTC
+    assert slot(datetime(2024, 1, 1, 8, 0), "08:00") is None
+    assert slot(datetime(2024, 1, 1, 10, 56), "08:00") == (datetime(2024, 1, 1, 11, 0), date(2024, 1, 1))
+    assert slot(datetime(2024, 1, 1, 12, 0), "08:00") == (datetime(2024, 1, 1, 11, 0), date(2024, 1, 1))
+    assert slot(datetime(2024, 1, 1, 12, 1), "08:00") is None
+
+def test_late_evening_slot_keeps_the_local_day():
+    # 23:30 do dia 1 em São Paulo já é dia 2 em UTC
+    assert slot(datetime(2024, 1, 2, 2, 30), "23:00") == (datetime(2024, 1, 2, 2, 0), date(2024, 1, 1))
+
+def test_midnight_slot_created_ahead_belongs_to_the_next_local_day():
+    # 23:57 do dia 1 em São Paulo: o horário 00:00 é o do dia 2
+    assert slot(datetime(2024, 1, 2, 2, 57), "00:00") == (datetime(2024, 1, 2, 3, 0), date(2024, 1, 2))
+
+def test_utc_timezone_keeps_schedules_in_utc(monkeypatch):
+    monkeypatch.setattr(settings, "APP_TIMEZONE", "UTC")
+
+    assert slot(datetime(2024, 1, 1, 8, 0), "08:00") == (datetime(2024, 1, 1, 8, 0), date(2024, 1, 1))
+
+def test_invalid_schedule_is_skipped():
+    assert slot(datetime(2024, 1, 1, 11, 0), "8h") is None
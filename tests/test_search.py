@@ -0,0 +1,79 @@
+"""Busca de medicamentos por nome: normalização, trigram e ordenação"""
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.medication import Medication
+from app.services.search import (
+    medication_search_filter, normalize_search_term, search_medications, typeahead_cache, typeahead_medications
+)
+
+def add_medications(db, user_id: int, *names: str):
+    db.add_all([
+        Medication(
+            name=name, dosage=500, category="comprimido", frequency="diária",
+            schedules=["08:00"], stock=10, user_id=user_id
+        )
+        for name in names
+    ])
+    db.commit()
+
+def names(results) -> list:
+    return [name for _, name, _ in results]
+
+def test_normalization_matches_the_index_expression():
+    assert normalize_search_term("  Dipirona Sódica ") == "dipirona sodica"
+    assert normalize_search_term("ÁCIDO ACETILSALICÍLICO") == "acido acetilsalicilico"
+
+def test_trigram_operator_is_escaped_for_the_driver():
+    # Com o psycopg2 (paramstyle pyformat) o operador % precisa sair como %%
+    sql = str(medication_search_filter("dip").compile(dialect=postgresql.psycopg2.dialect()))
+
+    assert "f_unaccent(lower(medications.name)) %% %(f_unaccent_2)s" in sql
+
+def test_search_ignores_case_and_accents(db, make_user):
+    user_id = make_user()
+    add_medications(db, user_id, "Dipirona Sódica", "Losartana")
+
+    assert names(search_medications(db, user_id, "SODICA")) == ["Dipirona Sódica"]
+    assert names(search_medications(db, user_id, "dipirona sódica")) == ["Dipirona Sódica"]
+
+def test_search_tolerates_typos(db, make_user):
+    user_id = make_user()
+    add_medications(db, user_id, "Dipirona", "Losartana")
+
+    assert names(search_medications(db, user_id, "dipirna")) == ["Dipirona"]
+
+def test_prefix_matches_rank_first(db, make_user):
+    user_id = make_user()
+    add_medications(db, user_id, "Paracetamol com Dipirona", "Dipirona", "Dipirona Sódica")
+
+    assert names(search_medications(db, user_id, "dipirona")) == [
+        "Dipirona", "Dipirona Sódica", "Paracetamol com Dipirona"
+    ]
+    assert names(search_medications(db, user_id, "dipirona", limit=1)) == ["Dipirona"]
+
+def test_like_wildcards_in_the_term_are_literal(db, make_user):
+    user_id = make_user()
+    add_medications(db, user_id, "Dipirona", "Vitamina C 100%")
+
+    assert names(search_medications(db, user_id, "100%")) == ["Vitamina C 100%"]
+    assert names(search_medications(db, user_id, "%")) == ["Vitamina C 100%"]
+
+def test_search_is_scoped_to_the_user(db, make_user):
+    owner, other = make_user("maria"), make_user("joao")
+    add_medications(db, owner, "Dipirona")
+
+    assert search_medications(db, other, "dipirona") == []
+
+def test_typeahead_is_cached_until_invalidated(db, make_user):
+    user_id = make_user()
+    add_medications(db, user_id, "Dipirona")
+
+    assert [item["name"] for item in typeahead_medications(db, user_id, "Dipi")] == ["Dipirona"]
+    add_medications(db, user_id, "Dipirona Sódica")
+    # Mesmo prefixo normalizado: vem do cache
+    assert [item["name"] for item in typeahead_medications(db, user_id, "dipi ")] == ["Dipirona"]
+
+    typeahead_cache.invalidate_user(user_id)
+    assert [item["name"] for item in typeahead_medications(db, user_id, "dipi")] == ["Dipirona", "Dipirona Sódica"]
+    assert typeahead_medications(db, user_id, "   ") == []
@@ -0,0 +1,93 @@
+"""Lote de operações da lista de compras (POST /shopping/batch)"""
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.shopping import ShoppingItem
+from app.schemas.shopping import ShoppingBatchRequest, ShoppingItemCreate
+from app.services.shopping import apply_shopping_batch, create_shopping_item
+
+def batch(*operations) -> list:
+    return ShoppingBatchRequest(operations=list(operations)).operations
+
+def items_of(db, user_id: int) -> dict:
+    db.expire_all()
+    return {item.name: item.checked for item in db.query(ShoppingItem).filter_by(user_id=user_id)}
+
+def test_create_reuses_existing_names_case_insensitively(db, make_user):
+    user_id = make_user()
+    existing = create_shopping_item(db, ShoppingItemCreate(name="Losartana"), user_id)
+
+    results = apply_shopping_batch(db, user_id, batch(
+        {"op": "create", "name": "Dipirona"},
+        {"op": "create", "name": "dipirona"},
+        {"op": "create", "name": "LOSARTANA"},
+    ))
+
+    assert [result["status"] for result in results] == ["ok", "ok", "exists"]
+    assert results[0]["id"] == results[1]["id"]
+    assert results[2]["id"] == existing.id
+    assert items_of(db, user_id) == {"Losartana": False, "Dipirona": False}
+
+def test_operations_follow_the_sent_order(db, make_user):
+    user_id = make_user()
+    first = create_shopping_item(db, ShoppingItemCreate(name="Dipirona"), user_id).id
+    second = create_shopping_item(db, ShoppingItemCreate(name="Losartana"), user_id).id
+
+    results = apply_shopping_batch(db, user_id, batch(
+        {"op": "check", "id": first},
+        {"op": "uncheck", "id": first},
+        {"op": "check", "id": first},
+        {"op": "delete", "id": second},
+        {"op": "check", "id": second},
+    ))
+
+    assert [result["status"] for result in results] == ["ok", "ok", "ok", "ok", "not_found"]
+    assert results[2]["item"]["checked"] is True
+    assert items_of(db, user_id) == {"Dipirona": True}
+
+def test_items_of_other_users_are_not_found(db, make_user):
+    owner, other = make_user("maria"), make_user("joao")
+    item_id = create_shopping_item(db, ShoppingItemCreate(name="Dipirona"), owner).id
+
+    results = apply_shopping_batch(db, other, batch(
+        {"op": "delete", "id": item_id},
+        {"op": "check", "id": 999},
+    ))
+
+    assert [result["status"] for result in results] == ["not_found", "not_found"]
+    assert items_of(db, owner) == {"Dipirona": False}
+
+def test_unchanged_items_keep_their_version(db, make_user):
+    user_id = make_user()
+    item_id = create_shopping_item(db, ShoppingItemCreate(name="Dipirona"), user_id).id
+    version = db.get(ShoppingItem, item_id).version
+
+    apply_shopping_batch(db, user_id, batch({"op": "uncheck", "id": item_id}))
+
+    db.expire_all()
+    assert db.get(ShoppingItem, item_id).version == version
+
+def test_batch_size_is_limited(monkeypatch):
+    monkeypatch.setattr(settings, "SHOPPING_BATCH_MAX_OPERATIONS", 2)
+
+    with pytest.raises(ValidationError):
+        batch(*[{"op": "check", "id": item_id} for item_id in range(3)])
+    with pytest.raises(ValidationError):
+        batch()
+
+def test_batch_endpoint(db, make_user, client_for):
+    user_id = make_user()
+    client = client_for(user_id)
+
+    response = client.post("/api/v1/shopping/batch", json={"operations": [
+        {"op": "create", "name": "Dipirona"},
+        {"op": "check", "id": 999},
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status"] == "ok" and results[0]["item"]["name"] == "Dipirona"
+    assert results[1] == {"op": "check", "status": "not_found", "id": 999, "item": None}
+    assert client.post("/api/v1/shopping/batch", json={"operations": [{"op": "rename", "id": 1}]}).status_code == 422
@@ -0,0 +1,104 @@
+"""Retomada de eventos (WebSocket last_seq / SSE Last-Event-ID) com mensagens de tipos variados"""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.core.config import settings
+from app.models.notification import NotificationType
+from app.utils.websocket_manager import ConnectionManager
+
+USER_ID = 1
+
+def stored_notification(notification_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=notification_id,
+        title="Notificação",
+        message="Mensagem",
+        notification_type=NotificationType.GENERAL,
+        medication_id=None,
+        created_at=datetime(2024, 1, 1, 8, 0),
+    )
+
+def loader(notifications, calls):
+    async def load_missed(since):
+        calls.append(since)
+        return notifications
+    return load_missed
+
+def record_mixed_events(manager: ConnectionManager):
+    # POST /notification/: payload em "notification", sem "data"
+    manager.record_event(USER_ID, {"type": "new_notification", "notification": {"id": 10, "title": "Nova"}})
+    manager.record_event(USER_ID, manager.notification_message({"id": 11, "title": "Geral"}))
+    reminder = manager.medication_reminder_message("Dipirona", "500mg", "08:00")
+    reminder["data"]["notification_id"] = 12
+    manager.record_event(USER_ID, reminder)
+    manager.record_event(USER_ID, manager.low_stock_alert_message("Losartana", 3))
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+def test_missed_events_merges_database_with_every_message_type():
+    manager = ConnectionManager()
+    record_mixed_events(manager)
+    calls = []
+
+    # last_seq anterior à subida do processo: vai ao banco
+    events = asyncio.run(manager.missed_events(
+        USER_ID, 0, loader([stored_notification(10), stored_notification(13)], calls)
+    ))
+
+    assert len(calls) == 1
+    assert [event["type"] for event in events] == [
+        "notification", "notification", "notification", "medication_reminder", "low_stock_alert"
+    ]
+    # O new_notification (id 10) já veio do banco e não se repete
+    assert [manager.event_notification_id(event) for event in events] == [10, 13, 11, 12, None]
+
+def test_resume_sends_mixed_events():
+    manager = ConnectionManager()
+    record_mixed_events(manager)
+    websocket = FakeWebSocket()
+
+    asyncio.run(manager.resume(websocket, USER_ID, 0, loader([stored_notification(13)], [])))
+
+    assert len(websocket.sent) == 5
+
+def test_user_without_buffer_is_covered_by_memory(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDED_NOTIFICATION_WORKER", True)
+    manager = ConnectionManager()
+    calls = []
+
+    events = asyncio.run(manager.missed_events(USER_ID, manager.floor_seq, loader([stored_notification(1)], calls)))
+
+    assert events == []
+    assert calls == []
+
+def test_user_without_buffer_uses_database_with_separate_worker(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDED_NOTIFICATION_WORKER", False)
+    manager = ConnectionManager()
+    calls = []
+
+    events = asyncio.run(manager.missed_events(USER_ID, manager.floor_seq, loader([stored_notification(1)], calls)))
+
+    assert len(calls) == 1
+    assert [manager.event_notification_id(event) for event in events] == [1]
+
+def test_evicted_buffer_falls_back_to_database(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDED_NOTIFICATION_WORKER", True)
+    monkeypatch.setattr(settings, "WS_RESUME_MAX_USERS", 1)
+    manager = ConnectionManager()
+    last_seq = manager.floor_seq
+    manager.record_event(USER_ID, manager.notification_message({"id": 1}))
+    # O buffer do usuário 1 sai do LRU com um evento que a memória não tem mais
+    manager.record_event(USER_ID + 1, manager.notification_message({"id": 2}))
+    calls = []
+
+    events = asyncio.run(manager.missed_events(USER_ID, last_seq, loader([stored_notification(1)], calls)))
+
+    assert len(calls) == 1
+    assert [manager.event_notification_id(event) for event in events] == [1]
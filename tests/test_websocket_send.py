@@ -0,0 +1,71 @@
+"""Envio para WebSockets: timeout por socket e encerramento dos sockets mortos"""
+
+import asyncio
+import time
+
+from app.core.config import settings
+from app.utils.websocket_manager import CLOSE_DEAD, ConnectionManager
+
+USER_ID = 1
+
+class FakeWebSocket:
+    def __init__(self, hang: bool = False, fail: bool = False):
+        self.hang = hang
+        self.fail = fail
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, text: str):
+        if self.hang:
+            # Socket meio aberto: o envio nunca termina
+            await asyncio.sleep(3600)
+        if self.fail:
+            raise RuntimeError("conexão perdida")
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+def send_to(*websockets):
+    manager = ConnectionManager()
+
+    async def run():
+        for websocket in websockets:
+            await manager.connect(websocket, USER_ID)
+        started = time.monotonic()
+        delivered = await manager.send_notification(USER_ID, {"id": 1})
+        return delivered, time.monotonic() - started
+
+    delivered, elapsed = asyncio.run(run())
+    return manager, delivered, elapsed
+
+def test_half_open_socket_times_out_and_is_evicted(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+    healthy, stuck = FakeWebSocket(), FakeWebSocket(hang=True)
+
+    manager, delivered, elapsed = send_to(healthy, stuck)
+
+    assert delivered
+    assert elapsed < 1
+    assert len(healthy.sent) == 1
+    assert stuck.closed_with == CLOSE_DEAD
+    assert stuck not in manager.all_connections
+
+def test_failed_sends_report_not_delivered(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_TIMEOUT_SECONDS", 0.05)
+    broken = FakeWebSocket(fail=True)
+
+    manager, delivered, _ = send_to(broken)
+
+    assert not delivered
+    assert broken.closed_with == CLOSE_DEAD
+    assert not manager.is_user_connected(USER_ID)
+
+def test_user_without_connection_is_not_delivered():
+    manager, delivered, _ = send_to()
+
+    assert not delivered
+    assert len(manager.event_buffers[USER_ID].events) == 1
@@ -0,0 +1,75 @@
+"""Divisão dos usuários entre instâncias do worker (ShardCoordinator)"""
+
+import pytest
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql
+
+from app.utils.worker_coordination import ShardCoordinator
+
+SHARDS = 4
+
+@pytest.fixture
+def coordinator(engine):
+    """Cria instâncias do worker (cada uma com sua conexão); todas são liberadas no fim"""
+    coordinators = []
+
+    def make() -> ShardCoordinator:
+        coordinators.append(ShardCoordinator(shard_count=SHARDS, enabled=True))
+        return coordinators[-1]
+
+    yield make
+    for instance in coordinators:
+        instance.release()
+
+def rebalance(*coordinators: ShardCoordinator):
+    for instance in coordinators:
+        instance.rebalance()
+
+def sql(criteria: list) -> str:
+    return " AND ".join(
+        str(criterion.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for criterion in criteria
+    )
+
+def test_disabled_coordinator_owns_every_user():
+    instance = ShardCoordinator(shard_count=SHARDS, enabled=False)
+    instance.rebalance()
+
+    assert instance.owned_shards == set(range(SHARDS))
+    assert instance.is_leader
+    assert instance.user_filter(column("user_id")) == []
+
+def test_user_filter_restricts_to_owned_shards():
+    instance = ShardCoordinator(shard_count=SHARDS, enabled=True)
+
+    assert sql(instance.user_filter(column("user_id"))) == "false"
+    instance.owned_shards = {3, 1}
+    assert sql(instance.user_filter(column("user_id"))) == "user_id %% 4 IN (1, 3)"
+
+def test_single_instance_takes_every_shard_and_leads(coordinator):
+    instance = coordinator()
+    instance.rebalance()
+
+    assert instance.owned_shards == set(range(SHARDS))
+    assert instance.is_leader
+
+def test_new_instance_gets_half_after_rebalance(coordinator):
+    first, second = coordinator(), coordinator()
+    first.rebalance()
+
+    # O segundo entra: o primeiro libera o excedente no próximo ciclo
+    rebalance(second, first, second)
+
+    assert len(first.owned_shards) == len(second.owned_shards) == SHARDS // 2
+    assert first.owned_shards.isdisjoint(second.owned_shards)
+    assert first.is_leader and not second.is_leader
+
+def test_shards_of_a_stopped_instance_are_taken_over(coordinator):
+    first, second = coordinator(), coordinator()
+    rebalance(first, second, first, second)
+
+    first.release()
+    second.rebalance()
+
+    assert second.owned_shards == set(range(SHARDS))
+    assert second.is_leader